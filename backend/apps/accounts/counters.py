@@ -0,0 +1,58 @@
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from apps.core.search_indexing import IndexQueue
+from .models import User, Follow
+
+
+def adjust_counters(user_id, **deltas):
+    """
+    Atomically apply deltas to a user's denormalized counters, e.g.
+    ``adjust_counters(user.id, followers_count=1)``. Counters never go
+    below zero; reconcile_user_counters repairs any drift.
+    """
+    updates = {
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items() if delta
+    }
+    if updates:
+        User.objects.filter(pk=user_id).update(**updates, updated_at=timezone.now())
+        IndexQueue.mark(User, [user_id], partial=True)
+
+
+def adjust_follow_counters(follower_id, following_id, delta):
+    """
+    Apply a follow (``delta=1``) or unfollow (``delta=-1``) to both users'
+    counters in one UPDATE, so concurrent follows between the same pair
+    never lock the two rows in opposite orders.
+    """
+    def counter(field, user_id):
+        return Case(
+            When(pk=user_id, then=Greatest(F(field) + delta, Value(0))),
+            default=F(field),
+        )
+
+    User.objects.filter(pk__in=[follower_id, following_id]).update(
+        followers_count=counter('followers_count', following_id),
+        following_count=counter('following_count', follower_id),
+        updated_at=timezone.now(),
+    )
+    IndexQueue.mark(User, [follower_id, following_id], partial=True)
+
+
+def _count_of(model, field, **filters):
+    rows = model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by().values(field)
+    return Coalesce(
+        Subquery(rows.annotate(total=Count('pk')).values('total'), output_field=IntegerField()),
+        Value(0),
+    )
+
+
+def actual_counters():
+    """Annotations with the true counts, used to reconcile the stored ones"""
+    from apps.posts.models import Post
+    return {
+        'actual_followers': _count_of(Follow, 'following'),
+        'actual_following': _count_of(Follow, 'follower'),
+        'actual_posts': _count_of(Post, 'user', is_archived=False),
+    }
@@ -13,6 +13,9 @@ class UserDocument(Document):
             'number_of_replicas': 1,
         }
 
+    # Saves touching only these fields are sent as partial updates
+    partial_update_fields = ('followers_count', 'following_count', 'posts_count')
+
     class Django:
         model = User
         fields = [
@@ -23,5 +26,10 @@ class UserDocument(Document):
             'email',
             'bio',
             'profile_picture',
+            'website',
             'is_private',
+            'followers_count',
+            'following_count',
+            'posts_count',
+            'created_at',
         ]
\ No newline at end of file
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:32
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field, **filters):
+    rows = model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by().values(field)
+    return Coalesce(
+        Subquery(rows.annotate(total=Count('pk')).values('total'), output_field=IntegerField()),
+        Value(0),
+    )
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Follow = apps.get_model('accounts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    User.objects.update(
+        followers_count=count_of(Follow, 'following'),
+        following_count=count_of(Follow, 'follower'),
+        posts_count=count_of(Post, 'user', is_archived=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -9,6 +9,10 @@ class User(AbstractUser):
     phone = models.CharField(max_length=20, blank=True)
     gender = models.CharField(max_length=20, blank=True)
     is_private = models.BooleanField(default=False)
+    # Denormalized counters, maintained by apps.accounts.signals
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1,8 +1,15 @@
+from types import SimpleNamespace
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core.pagination import SearchAfterPagination
+from apps.core.viewer_state import get_viewer_state
 from .documents import UserDocument
-from .serializers import UserSerializer
+from .serializers import UserSerializer, prefetch_following
+
+SOURCE_FIELDS = [field for field in UserSerializer.Meta.fields if field != 'is_following']
 
 class UserSearchView(APIView):
     permission_classes = [IsAuthenticated]
@@ -19,19 +26,33 @@ class UserSearchView(APIView):
             query=query,
             fields=['username^3', 'first_name', 'last_name'],
             fuzziness='AUTO'
-        )
+        ).source(SOURCE_FIELDS)
+        
+        # Execute one page of the search
+        paginator = SearchAfterPagination()
+        response = paginator.paginate_search(search, request)
         
-        # Execute search
-        response = search[:20].execute()
+        # Build results from the stored documents, in relevance order
+        users = [self.to_representation(hit.to_dict(), request) for hit in response]
         
-        # Get actual User objects
-        user_ids = [hit.meta.id for hit in response]
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        users = User.objects.filter(id__in=user_ids)
+        # Resolve is_following for the whole page in one query
+        context = {'request': request}
+        prefetch_following([SimpleNamespace(id=user['id']) for user in users], context)
+        state = get_viewer_state(context)
+        for user in users:
+            user['is_following'] = bool(state.lookup('following_users', user['id']))
         
-        serializer = UserSerializer(users, many=True, context={'request': request})
-        return Response({
-            'count': response.hits.total.value,
-            'results': serializer.data
-        })
\ No newline at end of file
+        return paginator.get_paginated_response(users, response.hits.total.value)
+
+    def to_representation(self, source, request):
+        """Shape a user document like UserSerializer output"""
+        data = {field: source.get(field) for field in SOURCE_FIELDS}
+        if data['profile_picture']:
+            data['profile_picture'] = request.build_absolute_uri(data['profile_picture'])
+        else:
+            data['profile_picture'] = None
+        if data['created_at']:
+            data['created_at'] = serializers.DateTimeField().to_representation(
+                parse_datetime(data['created_at'])
+            )
+        return data
@@ -1,14 +1,24 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from apps.core.viewer_state import (
+    ViewerStateListSerializer, get_viewer, get_viewer_state, viewer_flag
+)
 from .models import Follow
 
 User = get_user_model()
 
+
+def prefetch_following(users, context):
+    """Resolve is_following for a set of users in one query"""
+    user_ids = {user.id for user in users}
+    followed = Follow.objects.filter(
+        follower=get_viewer(context), following_id__in=user_ids
+    ).values_list('following_id', flat=True)
+    get_viewer_state(context).update('following_users', user_ids, followed)
+
+
 class UserSerializer(serializers.ModelSerializer):
     profile_picture = serializers.SerializerMethodField()
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
-    posts_count = serializers.SerializerMethodField()
     is_following = serializers.SerializerMethodField()
     
     class Meta:
@@ -17,7 +27,12 @@ class UserSerializer(serializers.ModelSerializer):
                   'bio', 'profile_picture', 'website', 'is_private', 
                   'followers_count', 'following_count', 'posts_count', 
                   'is_following', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'followers_count', 'following_count', 
+                            'posts_count', 'created_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def prefetch_viewer_state(self, instances, context):
+        prefetch_following(instances, context)
     
     def get_profile_picture(self, obj):
         if not obj.profile_picture:
@@ -25,20 +40,11 @@ class UserSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         return request.build_absolute_uri(obj.profile_picture.url) if request else obj.profile_picture.url
 
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-
-    def get_following_count(self, obj):
-        return obj.following.count()
-
-    def get_posts_count(self, obj):
-        return obj.posts.filter(is_archived=False).count()
-
     def get_is_following(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Follow.objects.filter(follower=request.user, following=obj).exists()
-        return False
+        return viewer_flag(
+            self.context, 'following_users', obj.id,
+            lambda: Follow.objects.filter(follower=self.context['request'].user, following=obj).exists()
+        )
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.posts.models import Post
+from .counters import adjust_counters, adjust_follow_counters
+from .models import Follow
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counters(sender, instance, created, **kwargs):
+    if created:
+        adjust_follow_counters(instance.follower_id, instance.following_id, 1)
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counters(sender, instance, **kwargs):
+    adjust_follow_counters(instance.follower_id, instance.following_id, -1)
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    if created and not instance.is_archived:
+        adjust_counters(instance.user_id, posts_count=1)
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    if not instance.is_archived:
+        adjust_counters(instance.user_id, posts_count=-1)
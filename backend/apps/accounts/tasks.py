@@ -0,0 +1,39 @@
+from celery import shared_task
+from django.db.models import Q, F
+from django.utils import timezone
+from apps.core.search_indexing import IndexQueue
+from .counters import actual_counters
+from .models import User
+
+RECONCILE_BATCH_SIZE = 1000
+
+@shared_task
+def reconcile_user_counters():
+    """Repair drift in the denormalized follower/following/post counters"""
+    last_id = 0
+    repaired = 0
+    while True:
+        batch = list(User.objects.filter(id__gt=last_id).order_by('id').values_list(
+            'id', flat=True
+        )[:RECONCILE_BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1]
+
+        drifted = User.objects.filter(id__in=batch).annotate(**actual_counters()).filter(
+            ~Q(followers_count=F('actual_followers')) |
+            ~Q(following_count=F('actual_following')) |
+            ~Q(posts_count=F('actual_posts'))
+        ).values_list('id', 'actual_followers', 'actual_following', 'actual_posts')
+
+        for user_id, followers, following, posts in drifted:
+            User.objects.filter(id=user_id).update(
+                followers_count=followers,
+                following_count=following,
+                posts_count=posts,
+                updated_at=timezone.now(),
+            )
+            IndexQueue.mark(User, [user_id], partial=True)
+            repaired += 1
+
+    return f'Reconciled counters for {repaired} users'
@@ -0,0 +1,55 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.accounts.counters import adjust_counters
+from apps.accounts.models import Follow
+from apps.accounts.tasks import reconcile_user_counters
+from apps.posts.models import Post
+
+User = get_user_model()
+
+class UserCountersTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='testpass123')
+
+    def test_follow_updates_both_counters(self):
+        """Test a follow and unfollow move both users' counters together"""
+        follow = Follow.objects.create(follower=self.alice, following=self.bob)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.alice.followers_count), (1, 0))
+        self.assertEqual((self.bob.following_count, self.bob.followers_count), (0, 1))
+        
+        follow.delete()
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 0)
+        self.assertEqual(self.bob.followers_count, 0)
+
+    def test_posts_count_skips_archived_posts(self):
+        """Test only live posts count towards posts_count"""
+        post = Post.objects.create(user=self.alice, caption='Live')
+        Post.objects.create(user=self.alice, caption='Archived', is_archived=True)
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.posts_count, 1)
+        
+        post.delete()
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.posts_count, 0)
+
+    def test_adjust_counters_never_goes_negative(self):
+        """Test a decrement below zero floors at zero"""
+        adjust_counters(self.alice.id, followers_count=-1, posts_count=2)
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.followers_count, 0)
+        self.assertEqual(self.alice.posts_count, 2)
+
+    def test_reconcile_repairs_drift(self):
+        """Test reconciliation rewrites counters that drifted from the rows"""
+        Follow.objects.create(follower=self.alice, following=self.bob)
+        Post.objects.create(user=self.bob, caption='Live')
+        User.objects.filter(pk=self.bob.pk).update(followers_count=7, posts_count=0)
+        
+        self.assertEqual(reconcile_user_counters(), 'Reconciled counters for 1 users')
+        self.bob.refresh_from_db()
+        self.assertEqual((self.bob.followers_count, self.bob.posts_count), (1, 1))
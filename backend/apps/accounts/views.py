@@ -5,6 +5,10 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import get_user_model
 from .models import Follow
 from .serializers import UserSerializer, UserRegistrationSerializer
+from apps.posts.timeline import TimelineStore
+import logging
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
@@ -39,6 +43,14 @@ class UserViewSet(viewsets.ModelViewSet):
         )
         
         if created:
+            # Pull authors are merged at read time; anyone else needs a rebuild
+            try:
+                if TimelineStore.is_pull_author(user_to_follow.followers_count):
+                    TimelineStore.add_pull_author(request.user.id, user_to_follow.id)
+                else:
+                    TimelineStore.invalidate(request.user.id)
+            except Exception as e:
+                logger.error(f"Timeline error: {e}")
             return Response({'message': 'Followed successfully'})
         return Response({'message': 'Already following'}, 
                        status=status.HTTP_400_BAD_REQUEST)
@@ -52,6 +64,10 @@ class UserViewSet(viewsets.ModelViewSet):
         ).delete()
         
         if deleted[0] > 0:
+            try:
+                TimelineStore.invalidate(request.user.id)
+            except Exception as e:
+                logger.error(f"Timeline error: {e}")
             return Response({'message': 'Unfollowed successfully'})
         return Response({'message': 'Not following'}, 
                        status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
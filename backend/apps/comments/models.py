@@ -13,6 +13,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'parent', '-created_at', '-id'], name='comment_post_created_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.user.username} on Post {self.post.id}"
@@ -1,6 +1,26 @@
 from rest_framework import serializers
 from .models import Comment, CommentLike
-from apps.accounts.serializers import UserSerializer
+from apps.accounts.serializers import UserSerializer, prefetch_following
+from apps.core.viewer_state import (
+    ViewerStateListSerializer, get_viewer, get_viewer_state, viewer_flag
+)
+
+
+def prefetch_comment_flags(instances, context):
+    """Resolve is_liked for a page of comments in one query"""
+    comment_ids = {comment.id for comment in instances}
+    liked = CommentLike.objects.filter(
+        user=get_viewer(context), comment_id__in=comment_ids
+    ).values_list('comment_id', flat=True)
+    get_viewer_state(context).update('liked_comments', comment_ids, liked)
+    prefetch_following([comment.user for comment in instances], context)
+
+
+def comment_is_liked(context, obj):
+    return viewer_flag(
+        context, 'liked_comments', obj.id,
+        lambda: CommentLike.objects.filter(user=context['request'].user, comment=obj).exists()
+    )
 
 class CommentSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -12,15 +32,16 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'post', 'parent', 'content', 'likes_count',
                   'replies_count', 'is_liked', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'likes_count', 'created_at', 'updated_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def prefetch_viewer_state(self, instances, context):
+        prefetch_comment_flags(instances, context)
 
     def get_replies_count(self, obj):
         return obj.replies.count()
 
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return CommentLike.objects.filter(user=request.user, comment=obj).exists()
-        return False
+        return comment_is_liked(self.context, obj)
 
 class CommentCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -52,7 +73,4 @@ class CommentDetailSerializer(serializers.ModelSerializer):
         return []
 
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return CommentLike.objects.filter(user=request.user, comment=obj).exists()
-        return False
\ No newline at end of file
+        return comment_is_liked(self.context, obj)
\ No newline at end of file
@@ -10,9 +10,16 @@ from .serializers import (
     CommentDetailSerializer
 )
 from apps.posts.models import Post
+from apps.posts.trending import TrendingEngine
+from apps.core.cache_utils import CacheManager
+from apps.core.pagination import KeysetPagination
+import logging
+
+logger = logging.getLogger(__name__)
 
 class CommentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         post_id = self.request.query_params.get('post_id')
@@ -21,7 +28,7 @@ class CommentViewSet(viewsets.ModelViewSet):
             return Comment.objects.filter(
                 post_id=post_id, 
                 parent=None
-            ).select_related('user').prefetch_related('replies__user').order_by('-created_at')
+            ).select_related('user').prefetch_related('replies__user')
         return Comment.objects.none()
 
     def get_serializer_class(self):
@@ -54,7 +61,15 @@ class CommentViewSet(viewsets.ModelViewSet):
         
         # Update post comments count
         post.comments_count += 1
-        post.save(update_fields=['comments_count'])
+        post.save(update_fields=['comments_count', 'updated_at'])
+        try:
+            CacheManager.invalidate_post_detail(post.id)
+        except Exception as e:
+            logger.error(f"Cache error: {e}")
+        try:
+            TrendingEngine.record(post.id, 'comment')
+        except Exception as e:
+            logger.error(f"Trending error: {e}")
         
         return Response(
             CommentSerializer(comment, context={'request': request}).data,
@@ -80,7 +95,15 @@ class CommentViewSet(viewsets.ModelViewSet):
         
         # Update post comments count
         post.comments_count = max(0, post.comments_count - total_count)
-        post.save(update_fields=['comments_count'])
+        post.save(update_fields=['comments_count', 'updated_at'])
+        try:
+            CacheManager.invalidate_post_detail(post.id)
+        except Exception as e:
+            logger.error(f"Cache error: {e}")
+        try:
+            TrendingEngine.record(post.id, 'comment', count=-total_count)
+        except Exception as e:
+            logger.error(f"Trending error: {e}")
         
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -131,10 +154,8 @@ class CommentViewSet(viewsets.ModelViewSet):
         comment = self.get_object()
         replies = comment.replies.all().select_related('user')
         
-        page = self.paginate_queryset(replies)
-        if page is not None:
-            serializer = CommentSerializer(page, many=True, context={'request': request})
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = CommentSerializer(replies, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        # Replies read oldest first, like a conversation
+        paginator = KeysetPagination(ordering=('created_at', 'id'))
+        page = paginator.paginate_queryset(replies, request, view=self)
+        serializer = CommentSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.admin import AdminSite
 from django.utils.translation import gettext_lazy as _
+from .models import EventOutbox
 
 class InstagramAdminSite(AdminSite):
     site_header = _('Instagram Clone Administration')
@@ -46,4 +47,21 @@ class InstagramAdminSite(AdminSite):
         return super().index(request, extra_context)
 
 # You can use this custom admin site if needed
-# instagram_admin_site = InstagramAdminSite(name='instagram_admin')
\ No newline at end of file
+# instagram_admin_site = InstagramAdminSite(name='instagram_admin')
+
+
+@admin.register(EventOutbox)
+class EventOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'aggregate', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'topic']
+    search_fields = ['aggregate']
+    readonly_fields = ['topic', 'aggregate', 'shard', 'payload', 'attempts', 'last_error', 'created_at']
+    actions = ['requeue']
+
+    def requeue(self, request, queryset):
+        """Admin action to give dead events a fresh set of attempts"""
+        count = queryset.filter(status=EventOutbox.DEAD).update(
+            status=EventOutbox.PENDING, attempts=0, next_attempt_at=None
+        )
+        self.message_user(request, f'{count} events requeued.')
+    requeue.short_description = 'Requeue selected dead events'
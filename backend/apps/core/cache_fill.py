@@ -0,0 +1,204 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from .near_cache import tiered_cache
+import logging
+import math
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+_refresh_pool = None
+
+
+def wrap(value, delta, timeout):
+    """Cache entry with what XFetch needs: the recompute time and the logical expiry"""
+    return {'value': value, 'delta': delta, 'expires_at': time.time() + timeout}
+
+
+def as_entry(cached):
+    """The cached envelope, or None for values written before envelopes existed"""
+    if isinstance(cached, dict) and 'expires_at' in cached:
+        return cached
+    return None
+
+
+def is_expired(entry):
+    return time.time() >= entry['expires_at']
+
+
+def should_refresh(entry, beta):
+    """
+    XFetch: refresh early with a probability that grows as the expiry
+    nears, sooner for values that take longer to compute. ``beta`` above
+    1 favours earlier refreshes.
+    """
+    return time.time() - entry['delta'] * beta * math.log(1 - random.random()) >= entry['expires_at']
+
+
+def acquire_fill_lock(key):
+    """Claim the right to recompute ``key``; only one caller gets it per lock timeout"""
+    try:
+        return cache.add(f'fill_lock:{key}', 1, settings.CACHE_FILL_LOCK_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Cache fill lock error for {key}: {e}")
+        return True
+
+
+def acquire_fill_locks(keys):
+    """
+    Claim the fill locks of several keys in one round trip (a pipeline of
+    SET NX) and return the keys claimed. Caches without a Redis client
+    fall back to ``acquire_fill_lock`` per key.
+    """
+    keys = list(keys)
+    if not keys:
+        return []
+    try:
+        client = getattr(cache, 'client', None)
+        if not hasattr(client, 'get_client'):
+            return [key for key in keys if acquire_fill_lock(key)]
+        pipe = client.get_client(write=True).pipeline(transaction=False)
+        for key in keys:
+            pipe.set(
+                client.make_key(f'fill_lock:{key}'), client.encode(1),
+                nx=True, ex=settings.CACHE_FILL_LOCK_TIMEOUT
+            )
+        return [key for key, claimed in zip(keys, pipe.execute()) if claimed]
+    except Exception as e:
+        logger.error(f"Cache fill lock error for {len(keys)} keys: {e}")
+        return keys
+
+
+def release_fill_lock(key):
+    try:
+        cache.delete(f'fill_lock:{key}')
+    except Exception as e:
+        logger.error(f"Cache fill lock error for {key}: {e}")
+
+
+def fill(key, compute, timeout, stale_timeout=0, locked=True):
+    """Compute and store ``key``, then release its lock if we hold it"""
+    try:
+        began = time.monotonic()
+        value = compute()
+        tiered_cache.set(key, wrap(value, time.monotonic() - began, timeout), timeout + stale_timeout)
+        return value
+    finally:
+        if locked:
+            release_fill_lock(key)
+
+
+def _refresh_in_background(key, compute, timeout, stale_timeout):
+    try:
+        fill(key, compute, timeout, stale_timeout)
+    except Exception as e:
+        logger.error(f"Background cache refresh of {key} failed: {e}")
+    finally:
+        # The pool thread must not keep its own database connections
+        connections.close_all()
+
+
+def refresh_in_background(key, compute, timeout, stale_timeout):
+    global _refresh_pool
+    if _refresh_pool is None:
+        _refresh_pool = ThreadPoolExecutor(
+            max_workers=settings.CACHE_REFRESH_WORKERS, thread_name_prefix='cache-refresh'
+        )
+    _refresh_pool.submit(_refresh_in_background, key, compute, timeout, stale_timeout)
+
+
+def wait_for_fill(keys):
+    """Poll for keys another worker is filling; returns the entries that appeared"""
+    found = {}
+    deadline = time.monotonic() + settings.CACHE_FILL_WAIT
+    pending = list(keys)
+    while pending and time.monotonic() < deadline:
+        time.sleep(settings.CACHE_FILL_POLL_INTERVAL)
+        found.update(tiered_cache.get_many(pending))
+        pending = [key for key in pending if key not in found]
+    return found
+
+
+def read_through(key, compute, timeout, stale_timeout=0, beta=None):
+    """
+    Return the cached value of ``key``, computing it on a miss.
+
+    Only the caller holding the key's fill lock recomputes; concurrent
+    callers wait briefly for its result instead of all hitting the
+    database, and compute it themselves only if the wait runs out. Fresh
+    entries are refreshed early by one caller (XFetch). With
+    ``stale_timeout`` an expired entry is kept that much longer and served
+    while one worker refreshes it in the background.
+    """
+    beta = settings.CACHE_XFETCH_BETA if beta is None else beta
+    entry = as_entry(tiered_cache.get(key))
+    if entry is not None:
+        expired = is_expired(entry)
+        if not expired and not should_refresh(entry, beta):
+            return entry['value']
+        if acquire_fill_lock(key):
+            if expired and stale_timeout:
+                refresh_in_background(key, compute, timeout, stale_timeout)
+                return entry['value']
+            return fill(key, compute, timeout, stale_timeout)
+        if not expired or stale_timeout:
+            return entry['value']
+    elif acquire_fill_lock(key):
+        return fill(key, compute, timeout, stale_timeout)
+
+    entry = as_entry(wait_for_fill([key]).get(key))
+    if entry is not None:
+        return entry['value']
+    return fill(key, compute, timeout, stale_timeout, locked=False)
+
+
+def read_through_many(keys, load, timeout, beta=None):
+    """
+    Batch form of ``read_through`` for ``{cache key: id}``. ``load(ids)``
+    computes the values for several ids at once and returns ``{id: value}``;
+    ids it leaves out are not cached. Returns ``{id: value}``.
+    """
+    beta = settings.CACHE_XFETCH_BETA if beta is None else beta
+    entries = tiered_cache.get_many(keys)
+    values = {}
+    missing = []
+    due = []
+    for key, ident in keys.items():
+        entry = as_entry(entries.get(key))
+        if entry is None:
+            missing.append(key)
+        else:
+            values[ident] = entry['value']
+            if should_refresh(entry, beta):
+                due.append(key)
+
+    claimed = acquire_fill_locks(missing + due)
+    locked = set(claimed)
+    waiting = [key for key in missing if key not in locked]
+
+    unclaimed = []
+    if waiting:
+        for key, entry in wait_for_fill(waiting).items():
+            if as_entry(entry) is not None:
+                values[keys[key]] = entry['value']
+        # Whoever holds the lock is taking too long; load the rest ourselves
+        unclaimed = [key for key in waiting if keys[key] not in values]
+
+    if claimed or unclaimed:
+        try:
+            began = time.monotonic()
+            loaded = load([keys[key] for key in claimed + unclaimed])
+            delta = time.monotonic() - began
+            ids = {ident: key for key, ident in keys.items()}
+            tiered_cache.set_many(
+                {ids[ident]: wrap(value, delta, timeout) for ident, value in loaded.items()},
+                timeout
+            )
+            values.update(loaded)
+        finally:
+            for key in claimed:
+                release_fill_lock(key)
+    return values
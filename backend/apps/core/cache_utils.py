@@ -1,14 +1,27 @@
-from django.core.cache import cache
 from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from .cache_fill import as_entry, read_through, read_through_many, wrap
+from .near_cache import tiered_cache
 import hashlib
+import inspect
 import json
+import uuid
 
-def cache_result(timeout=300, key_prefix=''):
+def cache_result(timeout=300, key_prefix='', stale_timeout=0, beta=None, tags=()):
     """
     Decorator to cache function results
-    Usage: @cache_result(timeout=600, key_prefix='user_profile')
+    Usage: @cache_result(timeout=600, key_prefix='user_profile', tags=['user:{user_id}'])
+
+    Concurrent misses compute the result once (see cache_fill.read_through).
+    With ``stale_timeout`` an expired result is served for up to that many
+    more seconds while it is refreshed in the background. ``tags`` are
+    formatted with the call's arguments; invalidate_tags() on any of them
+    drops every result cached under it.
     """
     def decorator(func):
+        signature = inspect.signature(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key
@@ -20,87 +33,142 @@ def cache_result(timeout=300, key_prefix=''):
             if kwargs:
                 cache_key += f":{hashlib.md5(json.dumps(kwargs, sort_keys=True).encode()).hexdigest()}"
             
-            # Try to get from cache
-            result = cache.get(cache_key)
-            if result is not None:
-                return result
+            # Add tag versions, so invalidating a tag moves the key
+            if tags:
+                arguments = signature.bind(*args, **kwargs)
+                arguments.apply_defaults()
+                versions = tag_versions(
+                    [tag.format(**arguments.arguments) for tag in tags],
+                    timeout + stale_timeout
+                )
+                cache_key += f":{hashlib.md5('.'.join(versions).encode()).hexdigest()}"
             
-            # Execute function
-            result = func(*args, **kwargs)
-            
-            # Cache result
-            cache.set(cache_key, result, timeout)
-            return result
+            return read_through(
+                cache_key, lambda: func(*args, **kwargs), timeout, stale_timeout, beta
+            )
         
         return wrapper
     return decorator
 
-def invalidate_cache(key_pattern):
+def tag_versions(tags, timeout=0):
+    """
+    Current version of each tag, in order, starting missing ones. Versions
+    are random rather than counters, so a tag whose key expired or was
+    deleted never comes back with a version some old entry was cached
+    under. A new version lives at least as long as ``timeout``, the
+    lifetime of the entry being cached.
+    """
+    keys = [f'tag:{tag}' for tag in tags]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        ttl = max(settings.CACHE_TAG_TTL, timeout)
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, ttl)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, '') for key in keys]
+
+def invalidate_tags(tags):
     """
-    Invalidate cache keys matching pattern
+    Invalidate every cache_result entry registered under any of ``tags``
+    (e.g. ``user:{id}``, ``post:{id}``) by deleting its version; the next
+    read starts a new one. The old entries are never read again and expire
+    on their own, and tags nobody reads leave no keys behind.
     """
-    from django_redis import get_redis_connection
-    conn = get_redis_connection("default")
-    keys = conn.keys(f"*{key_pattern}*")
-    if keys:
-        conn.delete(*keys)
+    tags = list(tags)
+    if tags:
+        cache.delete_many([f'tag:{tag}' for tag in tags])
 
 class CacheManager:
     """
-    Centralized cache management
+    Centralized cache management. Reads and writes go through the tiered
+    cache, so hot keys are also served from the per-process near cache.
     """
     
     @staticmethod
     def get_user_feed(user_id):
         """Get cached user feed"""
-        return cache.get(f'user_feed:{user_id}')
+        return tiered_cache.get(f'user_feed:{user_id}')
     
     @staticmethod
     def set_user_feed(user_id, feed_data, timeout=600):
         """Cache user feed"""
-        cache.set(f'user_feed:{user_id}', feed_data, timeout)
+        tiered_cache.set(f'user_feed:{user_id}', feed_data, timeout)
     
     @staticmethod
     def invalidate_user_feed(user_id):
         """Invalidate user feed cache"""
-        cache.delete(f'user_feed:{user_id}')
+        tiered_cache.delete(f'user_feed:{user_id}')
     
     @staticmethod
     def get_trending_posts():
         """Get cached trending posts"""
-        return cache.get('trending_posts')
+        return tiered_cache.get('trending_posts')
     
     @staticmethod
     def set_trending_posts(post_ids, timeout=1800):
         """Cache trending posts"""
-        cache.set('trending_posts', post_ids, timeout)
+        tiered_cache.set('trending_posts', post_ids, timeout)
     
     @staticmethod
     def get_user_profile(user_id):
         """Get cached user profile"""
-        return cache.get(f'user_profile:{user_id}')
+        return tiered_cache.get(f'user_profile:{user_id}')
     
     @staticmethod
     def set_user_profile(user_id, profile_data, timeout=3600):
         """Cache user profile"""
-        cache.set(f'user_profile:{user_id}', profile_data, timeout)
+        tiered_cache.set(f'user_profile:{user_id}', profile_data, timeout)
     
     @staticmethod
     def invalidate_user_profile(user_id):
-        """Invalidate user profile cache"""
-        cache.delete(f'user_profile:{user_id}')
+        """Invalidate user profile cache and results tagged with the user"""
+        tiered_cache.delete(f'user_profile:{user_id}')
+        invalidate_tags([f'user:{user_id}'])
     
     @staticmethod
     def get_post_detail(post_id):
         """Get cached post detail"""
-        return cache.get(f'post:{post_id}')
+        entry = as_entry(tiered_cache.get(f'post:{post_id}'))
+        return entry['value'] if entry else None
     
     @staticmethod
     def set_post_detail(post_id, post_data, timeout=600):
         """Cache post detail"""
-        cache.set(f'post:{post_id}', post_data, timeout)
+        tiered_cache.set(f'post:{post_id}', wrap(post_data, 0, timeout), timeout)
+    
+    @staticmethod
+    def get_post_details(post_ids):
+        """Get several cached posts with one MGET, keyed by post id"""
+        cached = tiered_cache.get_many([f'post:{post_id}' for post_id in post_ids])
+        entries = {post_id: as_entry(cached.get(f'post:{post_id}')) for post_id in post_ids}
+        return {post_id: entry['value'] for post_id, entry in entries.items() if entry}
+    
+    @staticmethod
+    def set_post_details(posts_data, timeout=600):
+        """Cache several posts, given as {post_id: post_data}"""
+        tiered_cache.set_many(
+            {f'post:{post_id}': wrap(data, 0, timeout) for post_id, data in posts_data.items()},
+            timeout
+        )
+    
+    @staticmethod
+    def read_post_details(post_ids, load, timeout=600):
+        """
+        Cached posts for ``post_ids``, calling ``load(missing_ids)`` at most
+        once per post across concurrent requests (see read_through_many)
+        """
+        return read_through_many({f'post:{post_id}': post_id for post_id in post_ids}, load, timeout)
     
     @staticmethod
     def invalidate_post_detail(post_id):
-        """Invalidate post cache"""
-        cache.delete(f'post:{post_id}')
\ No newline at end of file
+        """Invalidate post cache and results tagged with the post"""
+        tiered_cache.delete(f'post:{post_id}')
+        invalidate_tags([f'post:{post_id}'])
+    
+    @staticmethod
+    def invalidate_post_details(post_ids):
+        """Invalidate several post caches in one round trip"""
+        if post_ids:
+            tiered_cache.delete_many([f'post:{post_id}' for post_id in post_ids])
+            invalidate_tags(f'post:{post_id}' for post_id in post_ids)
\ No newline at end of file
@@ -1,37 +1,188 @@
-from kafka import KafkaConsumer
+from kafka import KafkaConsumer, TopicPartition
 from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+from prometheus_client import Counter, Gauge, Histogram
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-class EventConsumer:
-    def __init__(self, topic, group_id):
+MESSAGES = Counter(
+    'kafka_consumer_messages_total',
+    'Messages handled by batch consumers, by outcome',
+    ['group', 'topic', 'result']
+)
+BATCH_SECONDS = Histogram(
+    'kafka_consumer_batch_seconds',
+    'Time spent handling one polled batch',
+    ['group']
+)
+LAG = Gauge(
+    'kafka_consumer_lag',
+    'Messages between the committed position and the end of the partition',
+    ['group', 'topic', 'partition']
+)
+
+
+def decode_value(data):
+    """Deserialize a JSON message; undecodable messages become None"""
+    try:
+        return json.loads(data.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+class BatchConsumer:
+    """
+    Kafka consumer that hands messages to ``handler`` a batch at a time.
+
+    Offsets are committed manually, only after the handler returned for the
+    whole batch, so delivery is at least once. Each call of the handler runs
+    in a transaction, so a failed attempt leaves nothing behind for its
+    retry to apply again. A failing batch is retried with backoff; once retries are exhausted its messages are handled one by
+    one and the ones that still fail are logged and skipped, so one bad
+    message cannot stall a partition or stop the consumer. When the database
+    itself is unreachable the batch is rewound and polled again instead,
+    waiting longer after each consecutive outage.
+    ``consumer_class`` lets tests run against a stand-in for the broker.
+    """
+
+    def __init__(self, topics, group_id, handler, batch_size=None, consumer_class=KafkaConsumer):
+        self.topics = list(topics)
+        self.group_id = group_id
+        self.handler = handler
+        self.batch_size = batch_size or settings.KAFKA_CONSUMER_BATCH_SIZE
+        self.consumer_class = consumer_class
+        self.consumer = None
+        self.running = False
+        self._lag_checked_at = 0
+        self._outages = 0
+
+    def connect(self):
+        self.consumer = self.consumer_class(
+            *self.topics,
+            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+            group_id=self.group_id,
+            value_deserializer=decode_value,
+            auto_offset_reset='earliest',
+            enable_auto_commit=False,
+            max_poll_records=self.batch_size,
+        )
+
+    def run(self):
+        """Poll and handle batches until ``stop`` is called"""
+        if self.consumer is None:
+            self.connect()
+        self.running = True
         try:
-            self.consumer = KafkaConsumer(
-                topic,
-                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-                group_id=group_id,
-                value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                auto_offset_reset='earliest',
-                enable_auto_commit=True
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Kafka consumer: {e}")
-            self.consumer = None
+            while self.running:
+                self.poll_once()
+        finally:
+            self.consumer.close()
 
-    def consume_events(self, callback):
-        """Consume events from Kafka topic"""
-        if not self.consumer:
-            logger.warning("Kafka consumer not initialized")
+    def stop(self):
+        self.running = False
+
+    def poll_once(self):
+        """Poll one batch and handle it; returns the number of messages"""
+        records = self.consumer.poll(
+            timeout_ms=settings.KAFKA_CONSUMER_POLL_TIMEOUT_MS,
+            max_records=self.batch_size
+        )
+        messages = [message for batch in records.values() for message in batch]
+        if messages:
+            # Long-lived workers must not hold on to dropped connections
+            close_old_connections()
+            began = time.monotonic()
+            self.handle(messages)
+            BATCH_SECONDS.labels(self.group_id).observe(time.monotonic() - began)
+        self.update_lag()
+        return len(messages)
+
+    def backoff(self, attempt):
+        return min(
+            settings.KAFKA_CONSUMER_RETRY_BACKOFF * 2 ** attempt,
+            settings.KAFKA_CONSUMER_MAX_BACKOFF
+        )
+
+    def run_handler(self, values):
+        with transaction.atomic():
+            self.handler(values)
+
+    def handle(self, messages):
+        values = [message.value for message in messages if message.value is not None]
+        failed = set()
+        retries = settings.KAFKA_CONSUMER_MAX_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                if values:
+                    self.run_handler(values)
+                break
+            except OperationalError as e:
+                logger.error(f"Consumer {self.group_id} cannot reach the database, rewinding: {e}")
+                time.sleep(self.backoff(self._outages))
+                self._outages += 1
+                self.rewind(messages)
+                return
+            except Exception as e:
+                logger.error(
+                    f"Consumer {self.group_id} failed a batch of {len(values)} "
+                    f"(attempt {attempt + 1}): {e}"
+                )
+                if attempt < retries:
+                    time.sleep(self.backoff(attempt))
+        else:
+            failed = self.handle_one_by_one(messages)
+        self._outages = 0
+
+        for message in messages:
+            if message.value is None:
+                result = 'undecodable'
+            elif (message.topic, message.partition, message.offset) in failed:
+                result = 'failed'
+            else:
+                result = 'handled'
+            MESSAGES.labels(self.group_id, message.topic, result).inc()
+        self.consumer.commit()
+
+    def rewind(self, messages):
+        """Seek back to the first message of the batch in each partition"""
+        first = {}
+        for message in messages:
+            partition = TopicPartition(message.topic, message.partition)
+            first[partition] = min(first.get(partition, message.offset), message.offset)
+        for partition, offset in first.items():
+            self.consumer.seek(partition, offset)
+
+    def handle_one_by_one(self, messages):
+        """Isolate the messages that fail on their own; returns their positions"""
+        failed = set()
+        for message in messages:
+            if message.value is None:
+                continue
+            try:
+                self.run_handler([message.value])
+            except Exception as e:
+                failed.add((message.topic, message.partition, message.offset))
+                logger.error(
+                    f"Consumer {self.group_id} skipped {message.topic}[{message.partition}]"
+                    f"@{message.offset}: {e}"
+                )
+        return failed
+
+    def update_lag(self):
+        """Refresh the lag gauges, at most every KAFKA_CONSUMER_LAG_INTERVAL seconds"""
+        if time.monotonic() - self._lag_checked_at < settings.KAFKA_CONSUMER_LAG_INTERVAL:
             return
-        
+        self._lag_checked_at = time.monotonic()
         try:
-            for message in self.consumer:
-                callback(message.value)
+            partitions = self.consumer.assignment()
+            if not partitions:
+                return
+            end_offsets = self.consumer.end_offsets(list(partitions))
+            for partition in partitions:
+                lag = max(0, end_offsets[partition] - self.consumer.position(partition))
+                LAG.labels(self.group_id, partition.topic, partition.partition).set(lag)
         except Exception as e:
-            logger.error(f"Error consuming Kafka events: {e}")
-
-    def close(self):
-        if self.consumer:
-            self.consumer.close()
\ No newline at end of file
+            logger.error(f"Consumer {self.group_id} could not measure lag: {e}")
@@ -1,41 +1,141 @@
 from kafka import KafkaProducer
+from kafka.errors import NoBrokersAvailable
 from django.conf import settings
+from prometheus_client import Counter, Histogram
 import json
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+MESSAGES = Counter(
+    'kafka_producer_messages_total',
+    'Events handed to the Kafka producer, by outcome',
+    ['topic', 'result']
+)
+DELIVERY_SECONDS = Histogram(
+    'kafka_producer_delivery_seconds',
+    'Time from send to broker acknowledgement',
+    ['topic']
+)
+
+
 class EventProducer:
-    def __init__(self):
+    """
+    Fire-and-forget Kafka producer for the request path.
+
+    ``send_event`` only appends to the client's local buffer; records are
+    batched for ``linger_ms``, compressed and sent by the client's I/O
+    thread, and the outcome is recorded by delivery callbacks. ``send``
+    blocks for at most ``max_block_ms`` when the buffer is full or metadata
+    is missing, after which the event is dropped. The client is created on
+    first use, in the process that uses it, and connects in the background,
+    so neither importing this module nor the first send waits on the
+    broker, and forked workers get their own client.
+    """
+
+    def __init__(self, producer_class=KafkaProducer):
+        self.producer_class = producer_class
+        self._producer = None
+        self._pid = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def producer(self):
+        if self._producer is not None and self._pid == os.getpid():
+            return self._producer
+        with self._lock:
+            if self._producer is not None and self._pid == os.getpid():
+                return self._producer
+            # Don't retry a broker that just failed on every request
+            if self._failed_at and time.monotonic() - self._failed_at < settings.KAFKA_PRODUCER_RETRY_SECONDS:
+                return None
+            try:
+                self._producer = self.producer_class(
+                    bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+                    # A known version skips the blocking broker probe, so
+                    # creating the client never waits on the network
+                    api_version=settings.KAFKA_API_VERSION,
+                    value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                    key_serializer=lambda k: None if k is None else str(k).encode('utf-8'),
+                    acks='all',
+                    retries=3,
+                    # One request in flight keeps retried batches in order
+                    max_in_flight_requests_per_connection=1,
+                    linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+                    compression_type=settings.KAFKA_PRODUCER_COMPRESSION or None,
+                    buffer_memory=settings.KAFKA_PRODUCER_BUFFER_MEMORY,
+                    max_block_ms=settings.KAFKA_PRODUCER_MAX_BLOCK_MS,
+                )
+                self._pid = os.getpid()
+                self._failed_at = None
+            except Exception as e:
+                logger.error(f"Failed to initialize Kafka producer: {e}")
+                self._producer = None
+                self._failed_at = time.monotonic()
+        return self._producer
+
+    def send(self, topic, event_data, key=None):
+        """Queue an event and return its delivery future; raises if it cannot be queued"""
+        producer = self.producer
+        if not producer:
+            MESSAGES.labels(topic, 'dropped').inc()
+            raise NoBrokersAvailable('Kafka producer not initialized')
         try:
-            self.producer = KafkaProducer(
-                bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
-                acks='all',
-                retries=3,
-                max_in_flight_requests_per_connection=1
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Kafka producer: {e}")
-            self.producer = None
+            future = producer.send(topic, event_data, key=key)
+        except Exception:
+            MESSAGES.labels(topic, 'dropped').inc()
+            raise
+        future.add_callback(self._on_delivery, topic, time.monotonic())
+        future.add_errback(self._on_error, topic)
+        return future
 
-    def send_event(self, topic, event_data):
-        """Send event to Kafka topic"""
-        if not self.producer:
-            logger.warning("Kafka producer not initialized")
+    def send_event(self, topic, event_data, key=None, timeout=None):
+        """
+        Queue an event for ``topic``. Returns False if it could not be queued.
+        With ``timeout`` the call waits for the broker's acknowledgement and
+        returns False if it does not arrive in time.
+        """
+        try:
+            future = self.send(topic, event_data, key=key)
+        except Exception as e:
+            logger.error(f"Failed to queue event for Kafka: {e}")
             return False
-        
+        if timeout is None:
+            return True
         try:
-            future = self.producer.send(topic, event_data)
-            future.get(timeout=10)
+            future.get(timeout=timeout)
             return True
         except Exception as e:
             logger.error(f"Failed to send event to Kafka: {e}")
             return False
 
+    @staticmethod
+    def _on_delivery(topic, sent_at, metadata):
+        MESSAGES.labels(topic, 'delivered').inc()
+        DELIVERY_SECONDS.labels(topic).observe(time.monotonic() - sent_at)
+
+    @staticmethod
+    def _on_error(topic, exc):
+        MESSAGES.labels(topic, 'failed').inc()
+        logger.error(f"Kafka delivery to {topic} failed: {exc}")
+
+    def flush(self, timeout=None):
+        """Wait for buffered events to be sent, e.g. before a worker exits"""
+        if self._producer is None or self._pid != os.getpid():
+            return
+        try:
+            self._producer.flush(timeout=timeout or settings.KAFKA_PRODUCER_FLUSH_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Failed to flush Kafka producer: {e}")
+
     def close(self):
-        if self.producer:
-            self.producer.close()
+        if self._producer is not None and self._pid == os.getpid():
+            self._producer.close(timeout=settings.KAFKA_PRODUCER_FLUSH_TIMEOUT)
+        self._producer = None
 
-# Global producer instance
-event_producer = EventProducer()
\ No newline at end of file
+# Global producer instance; connects on first use
+event_producer = EventProducer()
@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+from django.conf import settings
+from django_redis import get_redis_connection
+import uuid
+
+# Delete a lock only if it still holds our token, so an expired lock taken
+# over by another process is not released by its previous holder
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@contextmanager
+def redis_lock(name, timeout=None):
+    """
+    Hold ``lock:{name}`` for the duration of the block without waiting for
+    it; yields False when another process already holds it. The lock
+    expires after ``timeout`` seconds (FLUSH_LOCK_TIMEOUT by default) in
+    case its holder dies.
+    """
+    conn = get_redis_connection("default")
+    key = f'lock:{name}'
+    token = uuid.uuid4().hex
+    acquired = conn.set(key, token, nx=True, ex=timeout or settings.FLUSH_LOCK_TIMEOUT)
+    try:
+        yield bool(acquired)
+    finally:
+        if acquired:
+            conn.eval(RELEASE_SCRIPT, 1, key, token)
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.module_loading import import_string
+from prometheus_client import start_http_server
+from apps.core.kafka_consumer import BatchConsumer
+import multiprocessing
+import signal
+import time
+
+
+def run_consumer(name, worker, batch_size, metrics_port):
+    """Worker process: run one member of the consumer group until signalled"""
+    options = settings.KAFKA_CONSUMERS[name]
+    consumer = BatchConsumer(
+        options['topics'], options['group_id'],
+        import_string(options['handler']), batch_size
+    )
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: consumer.stop())
+    if metrics_port:
+        start_http_server(metrics_port + worker)
+    consumer.run()
+
+
+class Command(BaseCommand):
+    help = 'Run a batch Kafka consumer from KAFKA_CONSUMERS with one or more processes in its group'
+
+    def add_arguments(self, parser):
+        parser.add_argument('consumer', help='Name of the consumer in KAFKA_CONSUMERS')
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--metrics-port', type=int, default=settings.KAFKA_CONSUMER_METRICS_PORT,
+            help='First port for Prometheus metrics, one per process (0 disables)'
+        )
+
+    def handle(self, *args, **options):
+        name = options['consumer']
+        if name not in settings.KAFKA_CONSUMERS:
+            raise CommandError(
+                f'Unknown consumer "{name}"; choose from {", ".join(sorted(settings.KAFKA_CONSUMERS))}'
+            )
+        task = (name, options['batch_size'], options['metrics_port'])
+
+        self.stdout.write(f'Starting {options["processes"]} {name} consumer process(es)')
+        if options['processes'] <= 1:
+            run_consumer(name, 0, *task[1:])
+            return
+        self.supervise(task, options['processes'])
+
+    def supervise(self, task, count):
+        """Run ``count`` worker processes, restarting any that die"""
+        name, batch_size, metrics_port = task
+        context = multiprocessing.get_context('fork')
+        stopping = False
+
+        def start(worker):
+            # Forked workers must open their own database connections
+            connections.close_all()
+            process = context.Process(target=run_consumer, args=(name, worker, batch_size, metrics_port))
+            process.start()
+            return process
+
+        def stop(*args):
+            nonlocal stopping
+            stopping = True
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+
+        processes = {worker: start(worker) for worker in range(count)}
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping:
+            time.sleep(1)
+            for worker, process in list(processes.items()):
+                if not process.is_alive() and not stopping:
+                    self.stderr.write(f'Consumer process {worker} exited with {process.exitcode}, restarting')
+                    processes[worker] = start(worker)
+
+        for process in processes.values():
+            process.join()
+        self.stdout.write(f'Stopped {name} consumers')
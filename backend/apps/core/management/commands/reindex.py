@@ -0,0 +1,278 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_elasticsearch_dsl.registries import registry
+from django_redis import get_redis_connection
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk, scan
+import json
+import multiprocessing
+import os
+import time
+
+RANGES_PER_WORKER = 4
+
+
+def get_document(alias):
+    for document in registry.get_documents():
+        if document._index._name == alias:
+            return document
+    raise CommandError(f'No search document is registered for "{alias}"')
+
+
+class Checkpoint:
+    """
+    Progress of a rebuild, kept in the Redis hash ``reindex:{alias}`` so an
+    interrupted run resumes into the same index from the last indexed id of
+    each primary key range.
+    """
+
+    def __init__(self, alias):
+        self.key = f'reindex:{alias}'
+
+    def _conn(self):
+        return get_redis_connection("default")
+
+    def load(self):
+        state = self._conn().hgetall(self.key)
+        if not state:
+            return None
+        state = {key.decode(): value.decode() for key, value in state.items()}
+        return {
+            'index': state['index'],
+            'started_at': parse_datetime(state['started_at']),
+            'ranges': json.loads(state['ranges']),
+            'progress': {
+                int(key.split(':')[1]): int(value)
+                for key, value in state.items() if key.startswith('range:')
+            },
+        }
+
+    def start(self, index_name, started_at, ranges):
+        pipe = self._conn().pipeline(transaction=True)
+        pipe.delete(self.key)
+        pipe.hset(self.key, mapping={
+            'index': index_name,
+            'started_at': started_at.isoformat(),
+            'ranges': json.dumps(ranges),
+        })
+        pipe.execute()
+
+    def advance(self, range_no, last_id):
+        self._conn().hset(self.key, f'range:{range_no}', last_id)
+
+    def clear(self):
+        self._conn().delete(self.key)
+
+
+def send_batch(client, doc, index_name, instances):
+    """Bulk index model instances into ``index_name``; returns the count"""
+    actions = []
+    for action in doc.get_actions(instances, 'index'):
+        action['_index'] = index_name
+        actions.append(action)
+    if actions:
+        bulk(client, actions)
+    return len(actions)
+
+
+def index_range(alias, index_name, range_no, start, end, batch_size):
+    """
+    Worker process: stream one primary key range with a server-side cursor
+    and index it in batches, checkpointing after each batch.
+    """
+    doc = get_document(alias)()
+    client = Elasticsearch(**settings.ELASTICSEARCH_DSL['default'])
+    checkpoint = Checkpoint(alias)
+    queryset = doc.get_queryset().filter(pk__gte=start, pk__lte=end).order_by('pk')
+
+    began = time.monotonic()
+    count = 0
+    batch = []
+    for instance in queryset.iterator(chunk_size=batch_size):
+        batch.append(instance)
+        if len(batch) >= batch_size:
+            count += send_batch(client, doc, index_name, batch)
+            checkpoint.advance(range_no, batch[-1].pk)
+            batch = []
+    count += send_batch(client, doc, index_name, batch)
+    checkpoint.advance(range_no, end)
+    return range_no, count, time.monotonic() - began
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search indices into new versioned indices and swap their aliases without downtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('indices', nargs='*', help='Index aliases to rebuild (default: all)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore any checkpoint and build a fresh index'
+        )
+        parser.add_argument(
+            '--keep-old', action='store_true',
+            help='Keep the previous index after the alias is swapped'
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['indices'] or sorted(
+            document._index._name for document in registry.get_documents()
+        )
+        for alias in aliases:
+            self.reindex(get_document(alias), options)
+
+    def reindex(self, document, options):
+        alias = document._index._name
+        client = document._get_connection()
+        checkpoint = Checkpoint(alias)
+
+        state = None if options['restart'] else checkpoint.load()
+        if state and not client.indices.exists(index=state['index']):
+            state = None
+        if state is None:
+            state = self.create_index(document, checkpoint, options['workers'])
+            self.stdout.write(f'Building {state["index"]} for alias {alias}')
+        else:
+            self.stdout.write(f'Resuming {state["index"]} for alias {alias}')
+
+        self.load(document, state, options)
+
+        # Rows written while the load ran went to the old index
+        since = self.catch_up(document, client, state['index'], state['started_at'])
+        self.remove_deleted(document, client, state['index'])
+        self.restore_settings(document, client, state['index'])
+        self.catch_up(document, client, state['index'], since)
+
+        self.swap_alias(client, alias, state['index'], options['keep_old'])
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(f'Alias {alias} now points to {state["index"]}'))
+
+    def create_index(self, document, checkpoint, workers):
+        """Create the versioned index with refresh and replicas off for the load"""
+        alias = document._index._name
+        started_at = timezone.now()
+        index_name = f'{alias}-{started_at:%Y%m%d%H%M%S}'
+
+        index = document._index.clone(name=index_name)
+        index.settings(refresh_interval='-1', number_of_replicas=0)
+        index.create()
+
+        bounds = document().get_queryset().aggregate(first=Min('pk'), last=Max('pk'))
+        ranges = []
+        if bounds['first'] is not None:
+            count = max(1, workers * RANGES_PER_WORKER)
+            step = max(1, (bounds['last'] - bounds['first'] + count) // count)
+            ranges = [
+                [start, min(start + step - 1, bounds['last'])]
+                for start in range(bounds['first'], bounds['last'] + 1, step)
+            ]
+        checkpoint.start(index_name, started_at, ranges)
+        return {'index': index_name, 'started_at': started_at, 'ranges': ranges, 'progress': {}}
+
+    def load(self, document, state, options):
+        """Index every unfinished range in parallel worker processes"""
+        alias = document._index._name
+        tasks = []
+        for range_no, (start, end) in enumerate(state['ranges']):
+            done = state['progress'].get(range_no, start - 1)
+            if done < end:
+                tasks.append((alias, state['index'], range_no, done + 1, end, options['batch_size']))
+        if not tasks:
+            return
+
+        # Forked workers must open their own database connections
+        connections.close_all()
+        began = time.monotonic()
+        total = 0
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            futures = [pool.submit(index_range, *task) for task in tasks]
+            for future in as_completed(futures):
+                range_no, count, seconds = future.result()
+                total += count
+                self.stdout.write(
+                    f'  range {range_no}: {count} docs in {seconds:.1f}s '
+                    f'({count / max(seconds, 0.001):.0f} docs/s)'
+                )
+
+        elapsed = time.monotonic() - began
+        self.stdout.write(
+            f'Indexed {total} docs in {elapsed:.1f}s '
+            f'({total / max(elapsed, 0.001):.0f} docs/s)'
+        )
+
+    def catch_up(self, document, client, index_name, since):
+        """
+        Index rows changed since ``since``; returns when this pass began.
+        Counter writes (buffer flushes, adjust_counters, comment counts) bump
+        ``updated_at`` so they are caught here too.
+        """
+        began = timezone.now()
+        doc = document()
+        changed = doc.get_queryset().filter(updated_at__gte=since).order_by('pk')
+        count = 0
+        batch = []
+        for instance in changed.iterator(chunk_size=1000):
+            batch.append(instance)
+            if len(batch) >= 1000:
+                count += send_batch(client, doc, index_name, batch)
+                batch = []
+        count += send_batch(client, doc, index_name, batch)
+        self.stdout.write(f'Caught up {count} docs changed since {since.isoformat()}')
+        return began
+
+    def remove_deleted(self, document, client, index_name):
+        """Delete documents whose rows were deleted or archived during the build"""
+        client.indices.refresh(index=index_name)
+        queryset = document().get_queryset()
+        hits = scan(client, index=index_name, query={'query': {'match_all': {}}}, _source=False)
+
+        removed = 0
+        batch = []
+        for hit in hits:
+            batch.append(int(hit['_id']))
+            if len(batch) >= 1000:
+                removed += self.delete_missing(client, queryset, index_name, batch)
+                batch = []
+        removed += self.delete_missing(client, queryset, index_name, batch)
+        self.stdout.write(f'Removed {removed} stale docs')
+
+    def delete_missing(self, client, queryset, index_name, ids):
+        present = set(queryset.filter(pk__in=ids).values_list('pk', flat=True))
+        missing = [obj_id for obj_id in ids if obj_id not in present]
+        if missing:
+            bulk(client, (
+                {'_op_type': 'delete', '_index': index_name, '_id': obj_id}
+                for obj_id in missing
+            ), raise_on_error=False)
+        return len(missing)
+
+    def restore_settings(self, document, client, index_name):
+        index_settings = document._index._settings
+        client.indices.put_settings(index=index_name, settings={
+            'refresh_interval': index_settings.get('refresh_interval', '1s'),
+            'number_of_replicas': index_settings.get('number_of_replicas', 1),
+        })
+        client.indices.refresh(index=index_name)
+
+    def swap_alias(self, client, alias, index_name, keep_old):
+        """Point ``alias`` at the new index in one atomic alias update"""
+        actions = [{'add': {'index': index_name, 'alias': alias}}]
+        old_indices = []
+        if client.indices.exists_alias(name=alias):
+            old_indices = [name for name in client.indices.get_alias(name=alias) if name != index_name]
+            actions = [{'remove': {'index': name, 'alias': alias}} for name in old_indices] + actions
+        elif client.indices.exists(index=alias):
+            # A concrete index from before aliases were used is dropped in the same update
+            actions.insert(0, {'remove_index': {'index': alias}})
+        client.indices.update_aliases(actions=actions)
+
+        if not keep_old:
+            for name in old_indices:
+                client.indices.delete(index=name, ignore_unavailable=True)
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from prometheus_client import start_http_server
+from apps.core.outbox import OutboxRelay, update_backlog_metrics
+import logging
+import signal
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Publish outbox events to Kafka until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain one batch per shard and exit')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--metrics-port', type=int, default=settings.OUTBOX_METRICS_PORT,
+            help='Port for Prometheus metrics (0 disables)'
+        )
+
+    def handle(self, *args, **options):
+        relay = OutboxRelay(batch_size=options['batch_size'])
+        if options['once']:
+            self.stdout.write(f'Published {relay.run_once()} events')
+            return
+
+        running = True
+
+        def stop(*args):
+            nonlocal running
+            running = False
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        if options['metrics_port']:
+            start_http_server(options['metrics_port'])
+
+        metrics_at = 0
+        while running:
+            close_old_connections()
+            try:
+                published = relay.run_once()
+                if time.monotonic() - metrics_at >= settings.OUTBOX_METRICS_INTERVAL:
+                    update_backlog_metrics()
+                    metrics_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Outbox relay error: {e}")
+                published = 0
+            if not published:
+                time.sleep(settings.OUTBOX_POLL_INTERVAL)
+        relay.producer.flush()
+        self.stdout.write('Outbox relay stopped')
@@ -0,0 +1,210 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+import logging
+import math
+import multiprocessing
+import os
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpeg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def _base83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def _srgb_to_linear(value):
+    value = value / 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, x_components=4, y_components=3):
+    """Encode a BlurHash placeholder for an RGB image"""
+    image = image.copy()
+    image.thumbnail((32, 32))
+    width, height = image.size
+    pixels = [tuple(_srgb_to_linear(channel) for channel in pixel) for pixel in image.getdata()]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            red = green = blue = 0.0
+            for y in range(height):
+                basis_y = math.cos(math.pi * j * y / height)
+                for x in range(width):
+                    basis = normalisation * math.cos(math.pi * i * x / width) * basis_y
+                    pixel = pixels[y * width + x]
+                    red += basis * pixel[0]
+                    green += basis * pixel[1]
+                    blue += basis * pixel[2]
+            scale = 1 / (width * height)
+            factors.append((red * scale, green * scale, blue * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised_max = max(0, min(82, int(max(abs(c) for factor in ac for c in factor) * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _base83(0, 1)
+
+    result += _base83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4
+    )
+    for factor in ac:
+        quantised = [
+            max(0, min(18, int(_sign_pow(c / max_value, 0.5) * 9 + 9.5)))
+            for c in factor
+        ]
+        result += _base83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+    return result
+
+
+def render_image(data, widths, quality):
+    """
+    Decode an image and encode it at each width in every rendition format.
+    Runs in a worker process, so it takes and returns plain bytes and dicts.
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+
+    # Never upscale; the largest rendition is capped at the original width
+    targets = sorted({min(width, image.width) for width in widths})
+    renditions = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for name, (pil_format, options) in RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, quality=quality, **options)
+            renditions.append({
+                'width': width,
+                'height': height,
+                'format': name,
+                'content': buffer.getvalue(),
+            })
+
+    return {
+        'width': image.width,
+        'height': image.height,
+        'placeholder': blurhash(image),
+        'renditions': renditions,
+    }
+
+
+_pool = None
+_pool_unavailable = False
+
+
+def _get_pool():
+    """
+    Lazily start the process pool; returns None when it cannot be used.
+    Daemonic processes, such as Celery prefork workers, may not have
+    children, so they render in-process without trying. A pool that fails
+    to start or accept work is not retried for the life of the process.
+    """
+    global _pool, _pool_unavailable
+    if _pool is not None or _pool_unavailable or settings.MEDIA_PROCESS_WORKERS <= 0:
+        return _pool
+    if multiprocessing.current_process().daemon:
+        logger.info("Daemonic worker process, rendering media in-process")
+        _pool_unavailable = True
+        return None
+    try:
+        _pool = ProcessPoolExecutor(max_workers=settings.MEDIA_PROCESS_WORKERS)
+    except Exception as e:
+        logger.error(f"Media process pool unavailable: {e}")
+        _pool_unavailable = True
+    return _pool
+
+
+def render_images(sources):
+    """
+    Render ``{key: image bytes}`` in the process pool and return
+    ``{key: result}``. Falls back to rendering in-process when the pool
+    cannot start, e.g. inside a daemonic prefork worker. Images that fail
+    to decode are logged and left out.
+    """
+    global _pool, _pool_unavailable
+    widths, quality = settings.MEDIA_RENDITION_WIDTHS, settings.MEDIA_RENDITION_QUALITY
+    pool = _get_pool()
+    futures = {}
+    if pool is not None:
+        try:
+            futures = {key: pool.submit(render_image, data, widths, quality) for key, data in sources.items()}
+        except Exception as e:
+            logger.error(f"Media process pool failed, rendering in-process: {e}")
+            _pool, _pool_unavailable = None, True
+            futures = {}
+
+    results = {}
+    for key, data in sources.items():
+        try:
+            if key in futures:
+                try:
+                    results[key] = futures[key].result()
+                    continue
+                except BrokenProcessPool as e:
+                    logger.error(f"Media process pool broke, rendering in-process: {e}")
+                    _pool = None
+            results[key] = render_image(data, widths, quality)
+        except Exception as e:
+            logger.error(f"Error rendering media {key}: {e}")
+    return results
+
+
+def save_renditions(field_file, result):
+    """Store rendered files next to the original and return their metadata"""
+    base = os.path.splitext(field_file.name)[0]
+    stored = []
+    for rendition in result['renditions']:
+        name = default_storage.save(
+            f"{base}_{rendition['width']}w.{rendition['format']}",
+            ContentFile(rendition['content'])
+        )
+        stored.append({
+            'width': rendition['width'],
+            'height': rendition['height'],
+            'format': rendition['format'],
+            'path': name,
+        })
+    return stored
+
+
+def rendition_urls(renditions, request=None):
+    """Public representation of stored renditions"""
+    urls = []
+    for rendition in renditions or []:
+        url = default_storage.url(rendition['path'])
+        urls.append({
+            'url': request.build_absolute_uri(url) if request is not None else url,
+            'width': rendition['width'],
+            'height': rendition['height'],
+            'format': rendition['format'],
+        })
+    return urls
@@ -1,3 +1,83 @@
+from django.conf import settings
 from django.db import models
+import os
+import uuid
 
-# Create your models here.
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload that posts and stories attach by id"""
+    UPLOADING = 'uploading'
+    COMPLETED = 'completed'
+    ATTACHED = 'attached'
+    STATUSES = [
+        (UPLOADING, 'Uploading'),
+        (COMPLETED, 'Completed'),
+        (ATTACHED, 'Attached'),
+    ]
+    MEDIA_TYPES = [
+        ('image', 'Image'),
+        ('video', 'Video'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='upload_sessions', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    media_type = models.CharField(max_length=10, choices=MEDIA_TYPES)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUSES, default=UPLOADING)
+    file = models.FileField(upload_to='uploads/', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['expires_at'], name='upload_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.id} by {self.user_id} ({self.status})"
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.UPLOAD_TEMP_DIR, f'{self.id}.part')
+
+    @property
+    def storage_name(self):
+        extension = os.path.splitext(self.filename)[1].lower()[:10]
+        return f'uploads/{self.user_id}/{self.id}{extension}'
+
+
+class EventOutbox(models.Model):
+    """
+    A domain event written in the same transaction as the change it
+    describes, waiting for the outbox relay to publish it to Kafka.
+    """
+    PENDING = 'pending'
+    DEAD = 'dead'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (DEAD, 'Dead'),
+    ]
+
+    topic = models.CharField(max_length=100)
+    aggregate = models.CharField(max_length=100)
+    shard = models.PositiveSmallIntegerField()
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'shard', 'id'], name='outbox_status_shard_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} event for {self.aggregate} ({self.status})"
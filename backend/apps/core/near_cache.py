@@ -0,0 +1,228 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from prometheus_client import Counter
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'cache:invalidate'
+
+REQUESTS = Counter(
+    'cache_requests_total',
+    'Cache lookups by tier and outcome',
+    ['tier', 'result']
+)
+
+
+class NearCache:
+    """
+    Bounded in-process LRU with a per-entry TTL.
+
+    Values are stored pickled, so every read returns a fresh copy and no
+    request can mutate what another one is served. ``generation`` is bumped
+    on every eviction by key; a reader that saw a different generation
+    before its Redis read does not store the (possibly stale) result.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout=None, generation=None):
+        ttl = self.ttl if timeout is None else min(self.ttl, timeout)
+        if ttl <= 0:
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+class TieredCache:
+    """
+    Django's Redis cache with an optional near-cache tier in front of it.
+
+    Keys starting with one of NEAR_CACHE_PREFIXES are also kept in a
+    per-process NearCache. Writes and deletes publish the keys on the
+    ``cache:invalidate`` channel, and a subscriber thread in every process
+    evicts them, so an invalidation in one worker reaches all of them.
+    If the subscriber loses its connection the near cache is cleared, as
+    messages may have been missed; NEAR_CACHE_TTL bounds staleness either way.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.near = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def near_tier(self):
+        """The process's near cache with its subscriber running, or None when disabled"""
+        if not settings.NEAR_CACHE_ENABLED:
+            return None
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # A forked child starts with an empty cache and its own subscriber
+                    self.near = NearCache(settings.NEAR_CACHE_MAX_ENTRIES, settings.NEAR_CACHE_TTL)
+                    self.origin = uuid.uuid4().hex
+                    self._pid = os.getpid()
+                    threading.Thread(
+                        target=self._subscribe, args=(self.near,),
+                        name='near-cache-invalidation', daemon=True
+                    ).start()
+        return self.near
+
+    def is_near(self, key):
+        return key.startswith(tuple(settings.NEAR_CACHE_PREFIXES))
+
+    def get(self, key, default=None):
+        near = self.near_tier() if self.is_near(key) else None
+        if near is not None:
+            value = near.get(key)
+            if value is not None:
+                REQUESTS.labels('near', 'hit').inc()
+                return value
+            REQUESTS.labels('near', 'miss').inc()
+            generation = near.generation
+
+        value = cache.get(key)
+        REQUESTS.labels('redis', 'miss' if value is None else 'hit').inc()
+        if value is None:
+            return default
+        if near is not None:
+            near.set(key, value, generation=generation)
+        return value
+
+    def get_many(self, keys):
+        keys = list(keys)
+        near = self.near_tier()
+        found = {}
+        remote = []
+        for key in keys:
+            value = near.get(key) if near is not None and self.is_near(key) else None
+            if value is not None:
+                found[key] = value
+            else:
+                remote.append(key)
+        if near is not None:
+            near_keys = sum(1 for key in keys if self.is_near(key))
+            REQUESTS.labels('near', 'hit').inc(len(found))
+            REQUESTS.labels('near', 'miss').inc(near_keys - len(found))
+        if not remote:
+            return found
+
+        generation = near.generation if near is not None else None
+        fetched = cache.get_many(remote)
+        REQUESTS.labels('redis', 'hit').inc(len(fetched))
+        REQUESTS.labels('redis', 'miss').inc(len(remote) - len(fetched))
+        if near is not None:
+            for key, value in fetched.items():
+                if self.is_near(key):
+                    near.set(key, value, generation=generation)
+        found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=None):
+        cache.set(key, value, timeout)
+        self._written([key], {key: value}, timeout)
+
+    def set_many(self, data, timeout=None):
+        cache.set_many(data, timeout)
+        self._written(list(data), data, timeout)
+
+    def delete(self, key):
+        cache.delete(key)
+        self._written([key])
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            cache.delete_many(keys)
+            self._written(keys)
+
+    def _written(self, keys, values=None, timeout=None):
+        """Update this process's near cache and tell the other processes"""
+        keys = [key for key in keys if self.is_near(key)]
+        near = self.near_tier()
+        if near is None or not keys:
+            return
+        near.evict(keys)
+        for key in keys:
+            if values and values.get(key) is not None:
+                near.set(key, values[key], timeout)
+        self.publish(keys)
+
+    def publish(self, keys):
+        try:
+            get_redis_connection("default").publish(
+                INVALIDATION_CHANNEL, json.dumps({'origin': self.origin, 'keys': keys})
+            )
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation: {e}")
+
+    def _subscribe(self, near):
+        """Subscriber thread: evict keys other processes wrote or deleted"""
+        while self.near is near:
+            pubsub = None
+            try:
+                pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                while self.near is near:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    payload = json.loads(message['data'])
+                    if payload['origin'] != self.origin:
+                        near.evict(payload['keys'])
+            except Exception as e:
+                logger.error(f"Near cache invalidation subscriber failed, clearing: {e}")
+                near.clear()
+                time.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+tiered_cache = TieredCache()
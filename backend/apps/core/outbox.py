@@ -0,0 +1,139 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from prometheus_client import Counter, Gauge
+from .kafka_producer import event_producer
+from .models import EventOutbox
+import logging
+import random
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# First key of the advisory locks that give one relay a shard at a time
+OUTBOX_LOCK_ID = 7301
+
+EVENTS = Counter(
+    'outbox_events_total',
+    'Outbox events handled by the relay, by outcome',
+    ['topic', 'result']
+)
+PENDING = Gauge('outbox_pending_events', 'Events waiting in the outbox')
+OLDEST_AGE = Gauge('outbox_oldest_event_age_seconds', 'Age of the oldest pending outbox event')
+DEAD = Gauge('outbox_dead_events', 'Events that exhausted their delivery attempts')
+
+
+def shard_for(aggregate):
+    return zlib.crc32(aggregate.encode()) % settings.OUTBOX_SHARDS
+
+
+def enqueue_event(topic, payload, aggregate):
+    """
+    Record an event for ``topic``. Call it inside the transaction that
+    makes the change, so the event exists if and only if the change does.
+    Events of one ``aggregate`` (e.g. ``post:42``) are published in order,
+    keyed by the aggregate so they share a Kafka partition.
+    """
+    aggregate = str(aggregate)
+    return EventOutbox.objects.create(
+        topic=topic, aggregate=aggregate, shard=shard_for(aggregate), payload=payload
+    )
+
+
+class OutboxRelay:
+    """
+    Publishes outbox events to Kafka and deletes them once acknowledged.
+
+    Events are split into OUTBOX_SHARDS by aggregate, and a relay holds a
+    transaction-level advisory lock on a shard while it drains a batch, so
+    any number of relays can run without publishing one aggregate's events
+    out of order. Within a shard, events go out in id order. An aggregate
+    whose oldest event is waiting to be retried is held back entirely. An
+    event that still fails after OUTBOX_MAX_ATTEMPTS is dead-lettered: it
+    stays in the table as dead and its aggregate moves on. Delivery is at
+    least once, so consumers must tolerate duplicates.
+    """
+
+    def __init__(self, producer=event_producer, batch_size=None):
+        self.producer = producer
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+
+    def run_once(self):
+        """Drain one batch from every shard no other relay holds; returns the count published"""
+        shards = list(range(settings.OUTBOX_SHARDS))
+        random.shuffle(shards)
+        return sum(self.relay_shard(shard) for shard in shards)
+
+    def lock_shard(self, shard):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_xact_lock(%s, %s)', [OUTBOX_LOCK_ID, shard])
+            return cursor.fetchone()[0]
+
+    def relay_shard(self, shard):
+        with transaction.atomic():
+            if not self.lock_shard(shard):
+                return 0
+
+            now = timezone.now()
+            pending = EventOutbox.objects.filter(status=EventOutbox.PENDING, shard=shard)
+            waiting = pending.filter(next_attempt_at__gt=now).values('aggregate')
+            events = list(pending.exclude(aggregate__in=waiting).order_by('id')[:self.batch_size])
+            if not events:
+                return 0
+
+            sent = []
+            failed = []
+            blocked = set()
+            for event in events:
+                if event.aggregate in blocked:
+                    continue
+                try:
+                    sent.append((event, self.producer.send(event.topic, event.payload, key=event.aggregate)))
+                except Exception as e:
+                    failed.append((event, e))
+                    blocked.add(event.aggregate)
+
+            self.producer.flush()
+            published = []
+            unacked = set()
+            for event, future in sent:
+                if event.aggregate in unacked:
+                    # Kept behind its failed predecessor, even if it was acked,
+                    # so the aggregate is republished in order
+                    continue
+                try:
+                    future.get(timeout=settings.OUTBOX_SEND_TIMEOUT)
+                    published.append(event.id)
+                    EVENTS.labels(event.topic, 'published').inc()
+                except Exception as e:
+                    failed.append((event, e))
+                    unacked.add(event.aggregate)
+
+            EventOutbox.objects.filter(id__in=published).delete()
+            for event, error in failed:
+                self.retry_later(event, error, now)
+        return len(published)
+
+    def retry_later(self, event, error, now):
+        event.attempts += 1
+        event.last_error = str(error)[:2000]
+        if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            event.status = EventOutbox.DEAD
+            event.next_attempt_at = None
+            EVENTS.labels(event.topic, 'dead').inc()
+            logger.error(f"Outbox event {event.id} for {event.aggregate} is dead after {event.attempts} attempts: {error}")
+        else:
+            delay = min(settings.OUTBOX_RETRY_BACKOFF * 2 ** (event.attempts - 1), settings.OUTBOX_MAX_BACKOFF)
+            event.next_attempt_at = now + timedelta(seconds=delay)
+            EVENTS.labels(event.topic, 'retried').inc()
+            logger.warning(f"Outbox event {event.id} for {event.aggregate} failed, retrying in {delay}s: {error}")
+        event.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def update_backlog_metrics():
+    pending = EventOutbox.objects.filter(status=EventOutbox.PENDING)
+    PENDING.set(pending.count())
+    oldest = pending.order_by('id').values_list('created_at', flat=True).first()
+    OLDEST_AGE.set((timezone.now() - oldest).total_seconds() if oldest else 0)
+    DEAD.set(EventOutbox.objects.filter(status=EventOutbox.DEAD).count())
@@ -0,0 +1,222 @@
+from base64 import b64decode, b64encode
+from datetime import datetime, timezone as dt_timezone
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+import json
+import math
+
+
+def encode_cursor(values):
+    """Encode a list of position values as an opaque cursor string"""
+    return b64encode(json.dumps(values, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor created by encode_cursor"""
+    try:
+        values = json.loads(b64decode(cursor.encode()).decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(values, list):
+        raise NotFound('Invalid cursor')
+    return values
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def cursor_datetime(timestamp):
+    """Datetime for a timestamp read from a cursor; out of range values are invalid"""
+    try:
+        return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        raise NotFound('Invalid cursor')
+
+
+def get_page_size(request, default, maximum, param='page_size'):
+    """Read a page size from the query string, clamped to ``maximum``"""
+    try:
+        size = int(request.query_params[param])
+    except (KeyError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on ``(created_at, id)``.
+
+    Each page is fetched with a range condition on the last row seen instead
+    of an OFFSET, and no COUNT query is run. Clients follow the opaque
+    ``next`` link until it is null.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+        self.next_position = None
+        self.request = None
+
+    def get_page_size(self, request):
+        return get_page_size(request, self.page_size, self.max_page_size, self.page_size_query_param)
+
+    def get_position(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise NotFound('Invalid cursor')
+        value, last_id = values
+        if not (is_number(value) or isinstance(value, str)):
+            raise NotFound('Invalid cursor')
+        if not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise NotFound('Invalid cursor')
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        value_field, id_field = (field.lstrip('-') for field in self.ordering)
+        descending = self.ordering[0].startswith('-')
+        lookup = 'lt' if descending else 'gt'
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.get_position(request)
+        if position is not None:
+            value, last_id = position
+            try:
+                value = queryset.model._meta.get_field(value_field).to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound('Invalid cursor')
+            queryset = queryset.filter(
+                Q(**{f'{value_field}__{lookup}': value}) |
+                Q(**{value_field: value, f'{id_field}__{lookup}': last_id})
+            )
+
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_position = None
+        if len(rows) > page_size:
+            last = page[-1]
+            value = getattr(last, value_field)
+            self.next_position = [
+                value.isoformat() if hasattr(value, 'isoformat') else value,
+                getattr(last, id_field),
+            ]
+        return page
+
+    def paginate_positions(self, fetch, request):
+        """
+        Paginate a ranked source outside the database, such as a Redis
+        sorted set. ``fetch(position, limit)`` must return up to ``limit``
+        ``(item_id, score)`` pairs ranked after ``position`` in descending
+        ``(score, item_id)`` order. Returns the item ids for the page.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.get_position(request)
+        if position is not None and not is_number(position[0]):
+            raise NotFound('Invalid cursor')
+        rows = fetch(position, page_size + 1)
+        page = rows[:page_size]
+        self.next_position = None
+        if len(rows) > page_size:
+            item_id, score = page[-1]
+            self.next_position = [score, item_id]
+        return [item_id for item_id, _ in page]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def rank_after(entries, position, limit):
+    """
+    Apply a keyset position to ``(item_id, score)`` pairs that are already
+    sorted by descending ``(score, item_id)``.
+    """
+    if position is not None:
+        score, last_id = position
+        entries = [
+            (item_id, item_score) for item_id, item_score in entries
+            if (item_score, item_id) < (score, last_id)
+        ]
+    return entries[:limit]
+
+
+class SearchAfterPagination:
+    """
+    Deep pagination for Elasticsearch queries using ``search_after``.
+
+    Results are sorted by relevance with the document id as a tie-breaker,
+    and the sort values of the last hit become the opaque next cursor.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+    sort = ('_score', {'id': 'desc'})
+
+    def __init__(self):
+        self.next_values = None
+        self.request = None
+
+    def paginate_search(self, search, request):
+        """Execute one page of ``search`` and return the response"""
+        self.request = request
+        page_size = get_page_size(request, self.page_size, self.max_page_size, self.page_size_query_param)
+        search = search.sort(*self.sort).extra(size=page_size)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(self.sort) or not all(is_number(value) for value in values):
+                raise NotFound('Invalid cursor')
+            search = search.extra(search_after=values)
+
+        response = search.execute()
+        hits = list(response)
+        self.next_values = None
+        if len(hits) == page_size:
+            self.next_values = list(hits[-1].meta.sort)
+        return response
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_values))
+
+    def get_paginated_response(self, data, count):
+        return Response({
+            'count': count,
+            'next': self.get_next_link(),
+            'results': data,
+        })
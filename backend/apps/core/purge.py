@@ -0,0 +1,112 @@
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from prometheus_client import CollectorRegistry, Gauge, push_to_gateway
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PurgeResult:
+    name: str
+    rows: int = 0
+    batches: int = 0
+    files: int = 0
+    file_errors: int = 0
+    seconds: float = 0.0
+    complete: bool = True
+    deleted: dict = field(default_factory=dict)
+
+    def __str__(self):
+        status = 'complete' if self.complete else 'stopped early, resumes next run'
+        return (
+            f'{self.name}: deleted {self.rows} rows in {self.batches} batches '
+            f'and {self.files} files in {self.seconds:.1f}s ({status})'
+        )
+
+
+def chunked_purge(queryset, name, batch_size=None, sleep=None, max_seconds=None, files=None):
+    """
+    Delete the rows of ``queryset`` in bounded primary key ranges.
+
+    Each range is deleted in its own short transaction, cascades included,
+    with ``sleep`` seconds between batches so replicas and autovacuum keep
+    up. The run stops after ``max_seconds`` and the rest is picked up by the
+    next run. ``files(batch)`` may return storage paths owned by a batch;
+    they are removed from storage once the batch has committed.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    sleep = settings.PURGE_SLEEP_SECONDS if sleep is None else sleep
+    max_seconds = settings.PURGE_MAX_SECONDS if max_seconds is None else max_seconds
+
+    result = PurgeResult(name)
+    began = time.monotonic()
+    last_pk = None
+    while True:
+        window = queryset.order_by('pk')
+        if last_pk is not None:
+            window = window.filter(pk__gt=last_pk)
+        # The range ends at the batch_size-th matching row, or the last one
+        bound = list(window.values_list('pk', flat=True)[batch_size - 1:batch_size])
+        upper = bound[0] if bound else window.values_list('pk', flat=True).last()
+        if upper is None:
+            break
+
+        batch = queryset.filter(pk__lte=upper)
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        with transaction.atomic():
+            paths = list(files(batch)) if files else []
+            deleted, per_model = batch.delete()
+        last_pk = upper
+
+        result.rows += deleted
+        result.batches += 1
+        for label, count in per_model.items():
+            result.deleted[label] = result.deleted.get(label, 0) + count
+        for path in paths:
+            try:
+                default_storage.delete(path)
+                result.files += 1
+            except Exception as e:
+                result.file_errors += 1
+                logger.error(f"Purge {name} could not delete {path}: {e}")
+
+        if time.monotonic() - began >= max_seconds:
+            result.complete = False
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    result.seconds = time.monotonic() - began
+    push_purge_metrics(result)
+    logger.info(str(result))
+    return result
+
+
+def push_purge_metrics(result):
+    """Push the metrics of one run to the Prometheus Pushgateway, if configured"""
+    if not settings.PROMETHEUS_PUSHGATEWAY:
+        return
+    registry = CollectorRegistry()
+    values = {
+        'purge_rows_deleted': ('Rows deleted by the last purge run, cascades included', result.rows),
+        'purge_batches': ('Batches in the last purge run', result.batches),
+        'purge_files_deleted': ('Storage files deleted by the last purge run', result.files),
+        'purge_file_errors': ('Storage files that could not be deleted', result.file_errors),
+        'purge_duration_seconds': ('Duration of the last purge run', result.seconds),
+        'purge_complete': ('1 if the last purge run finished its backlog', int(result.complete)),
+        'purge_last_run_timestamp_seconds': ('When the last purge run ended', time.time()),
+    }
+    for metric, (description, value) in values.items():
+        Gauge(metric, description, registry=registry).set(value)
+    try:
+        push_to_gateway(
+            settings.PROMETHEUS_PUSHGATEWAY, job='purge',
+            grouping_key={'purge': result.name}, registry=registry
+        )
+    except Exception as e:
+        logger.error(f"Could not push purge metrics: {e}")
@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
+from django_elasticsearch_dsl.registries import registry
+from django_elasticsearch_dsl.signals import BaseSignalProcessor
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+from .locks import redis_lock
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IndexQueue:
+    """
+    Queue of documents waiting to be written to Elasticsearch.
+
+    Changed ids are added to the Redis sets ``search_index:{index}:full``
+    (re-render the whole document) and ``search_index:{index}:partial``
+    (only the document's ``partial_update_fields``, e.g. counters). Sets
+    coalesce repeated changes to the same row, and ``flush`` sends them with
+    ``_bulk`` requests, so requests never wait on Elasticsearch.
+    """
+    FULL = 'full'
+    PARTIAL = 'partial'
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def key(document, kind):
+        return f'search_index:{document._index._name}:{kind}'
+
+    @staticmethod
+    def documents_for(model):
+        return [
+            document for document in registry.get_documents([model])
+            if not document.django.ignore_signals
+        ]
+
+    @classmethod
+    def _enqueue(cls, documents, ids, partial=False):
+        kind = cls.PARTIAL if partial else cls.FULL
+        try:
+            pipe = cls._conn().pipeline(transaction=False)
+            for document in documents:
+                pipe.sadd(cls.key(document, kind), *ids)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Search index queue error: {e}")
+
+    @classmethod
+    def mark(cls, model, ids, partial=False):
+        """
+        Queue rows of ``model`` for indexing once the current transaction
+        commits. ``partial`` limits the update to the counter fields.
+        """
+        cls.mark_documents(cls.documents_for(model), ids, partial)
+
+    @classmethod
+    def mark_documents(cls, documents, ids, partial=False):
+        ids = list(ids)
+        if ids and documents:
+            transaction.on_commit(lambda: cls._enqueue(documents, ids, partial))
+
+    @classmethod
+    def _claim(cls, conn, key):
+        """
+        Move a queue aside for flushing and return its ids. A batch left
+        behind by a failed flush is retried first. Callers hold the
+        document's flush lock.
+        """
+        flushing_key = f'{key}:flushing'
+        if not conn.exists(flushing_key):
+            try:
+                conn.rename(key, flushing_key)
+            except ResponseError:
+                # Nothing queued since the last flush
+                return set()
+        return {int(obj_id) for obj_id in conn.smembers(flushing_key)}
+
+    @staticmethod
+    def _batches(ids, size):
+        ids = sorted(ids)
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
+
+    @staticmethod
+    def full_actions(doc, ids):
+        """Index actions for rows that still qualify, delete actions for the rest"""
+        instances = {obj.pk: obj for obj in doc.get_queryset().filter(pk__in=ids)}
+        for obj_id in ids:
+            instance = instances.get(obj_id)
+            if instance is not None and doc.should_index_object(instance):
+                yield from doc.get_actions([instance], 'index')
+            else:
+                yield {'_op_type': 'delete', '_index': doc._index._name, '_id': obj_id}
+
+    @staticmethod
+    def partial_actions(doc, ids):
+        """Partial update actions carrying only the counter fields"""
+        fields = doc.partial_update_fields
+        for row in doc.get_queryset().filter(pk__in=ids).values('pk', *fields):
+            yield {
+                '_op_type': 'update',
+                '_index': doc._index._name,
+                '_id': row.pop('pk'),
+                'doc': row,
+            }
+
+    @classmethod
+    def _send(cls, doc, actions, retry):
+        """Send one bulk request and collect ids worth retrying by kind"""
+        actions = list(actions)
+        if not actions:
+            return 0
+        _, errors = doc.bulk(actions, raise_on_error=False)
+        for error in errors:
+            op_type, info = next(iter(error.items()))
+            if info.get('status') == 404:
+                # Deleting a missing document is fine; updating one means
+                # it was never indexed, so it needs a full index instead
+                if op_type == 'update':
+                    retry[cls.FULL].add(int(info['_id']))
+                continue
+            logger.error(f"Indexing {doc._index._name}/{info.get('_id')} failed: {info.get('error')}")
+            retry[cls.PARTIAL if op_type == 'update' else cls.FULL].add(int(info['_id']))
+        return len(actions)
+
+    @classmethod
+    def flush(cls, document, batch_size=None):
+        """
+        Send all queued changes for ``document``; returns the number of
+        actions. Flushes of one document never overlap, so a batch is not
+        claimed twice or dropped while another flush is sending it.
+        """
+        with redis_lock(f'search_index:{document._index._name}') as locked:
+            if not locked:
+                return 0
+            return cls._flush(document, batch_size)
+
+    @classmethod
+    def _flush(cls, document, batch_size=None):
+        batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+        conn = cls._conn()
+        full_key, partial_key = cls.key(document, cls.FULL), cls.key(document, cls.PARTIAL)
+        full_ids = cls._claim(conn, full_key)
+        # A full re-index already carries the latest counters
+        partial_ids = cls._claim(conn, partial_key) - full_ids
+
+        doc = document()
+        retry = {cls.FULL: set(), cls.PARTIAL: set()}
+        sent = 0
+        for batch in cls._batches(full_ids, batch_size):
+            sent += cls._send(doc, cls.full_actions(doc, batch), retry)
+        for batch in cls._batches(partial_ids, batch_size):
+            sent += cls._send(doc, cls.partial_actions(doc, batch), retry)
+
+        conn.delete(f'{full_key}:flushing', f'{partial_key}:flushing')
+        for kind, ids in retry.items():
+            if ids:
+                cls._enqueue([document], ids, partial=kind == cls.PARTIAL)
+        return sent
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """
+    Signal processor that queues model changes in ``IndexQueue`` instead of
+    indexing them inside the request. Saves that only touch a document's
+    ``partial_update_fields`` are queued as partial updates.
+    """
+
+    @staticmethod
+    def indexed_models():
+        """
+        Models with documents or embedded in one. Delete signals are only
+        connected for these, so cascades through other models can still use
+        Django's fast delete.
+        """
+        related = {model for model in registry._related_models if isinstance(model, type)}
+        return registry.get_models() | related
+
+    def setup(self):
+        for model in self.indexed_models():
+            models.signals.post_save.connect(self.handle_save, sender=model)
+            models.signals.post_delete.connect(self.handle_delete, sender=model)
+            models.signals.pre_delete.connect(self.handle_pre_delete, sender=model)
+        models.signals.m2m_changed.connect(self.handle_m2m_changed)
+
+    def teardown(self):
+        for model in self.indexed_models():
+            models.signals.post_save.disconnect(self.handle_save, sender=model)
+            models.signals.post_delete.disconnect(self.handle_delete, sender=model)
+            models.signals.pre_delete.disconnect(self.handle_pre_delete, sender=model)
+        models.signals.m2m_changed.disconnect(self.handle_m2m_changed)
+
+    def handle_save(self, sender, instance, update_fields=None, **kwargs):
+        # Counter saves also bump updated_at for the reindex catch-up pass
+        changed = set(update_fields or ()) - {'updated_at'}
+        for document in IndexQueue.documents_for(instance.__class__):
+            partial = bool(changed) and changed <= set(
+                getattr(document, 'partial_update_fields', ())
+            )
+            IndexQueue.mark_documents([document], [instance.pk], partial=partial)
+        self.mark_related(instance)
+
+    def handle_pre_delete(self, sender, instance, **kwargs):
+        self.mark_related(instance)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        # The flush finds the row gone and deletes the document
+        IndexQueue.mark(instance.__class__, [instance.pk])
+
+    def mark_related(self, instance):
+        """Queue documents that embed data from ``instance``"""
+        for document in registry._get_related_doc(instance):
+            try:
+                related = document().get_instances_from_related(instance)
+            except ObjectDoesNotExist:
+                related = None
+            if related is None:
+                continue
+            if isinstance(related, models.Model):
+                related = [related]
+            IndexQueue.mark(document.django.model, [obj.pk for obj in related])
@@ -0,0 +1,26 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import UploadSession
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'content_type', 'media_type', 'total_size', 
+                  'received_size', 'status', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'received_size', 'status', 'created_at', 'expires_at']
+
+    def validate_total_size(self, value):
+        # Reject oversized files before any bytes are sent
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size cannot exceed {settings.UPLOAD_MAX_SIZE // (1024 * 1024)}MB"
+            )
+        if value == 0:
+            raise serializers.ValidationError("File cannot be empty")
+        return value
+
+    def validate(self, data):
+        if not data['content_type'].startswith(f"{data['media_type']}/"):
+            raise serializers.ValidationError("Content type does not match the media type")
+        return data
@@ -0,0 +1,33 @@
+from celery import shared_task
+from django_elasticsearch_dsl.registries import registry
+from .search_indexing import IndexQueue
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def flush_search_index():
+    """Send queued model changes to Elasticsearch in bulk"""
+    sent = 0
+    for document in registry.get_documents():
+        try:
+            sent += IndexQueue.flush(document)
+        except Exception as e:
+            # The claimed batch stays in Redis and is retried next run
+            logger.error(f"Error indexing {document._index._name}: {e}")
+    return f'Sent {sent} search index actions'
+
+@shared_task
+def cleanup_upload_sessions():
+    """Delete expired upload sessions and any files that were never attached"""
+    from django.utils import timezone
+    from .models import UploadSession
+    from .uploads import discard_partial
+
+    expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+    for session in expired.exclude(status=UploadSession.ATTACHED).iterator():
+        discard_partial(session)
+        if session.file:
+            session.file.delete(save=False)
+    count, _ = expired.delete()
+    return f'Deleted {count} expired upload sessions'
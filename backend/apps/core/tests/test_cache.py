@@ -1,6 +1,7 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.core.cache import cache
-from apps.core.cache_utils import CacheManager
+from apps.core.cache_utils import CacheManager, cache_result, invalidate_tags
 
 class CacheTestCase(TestCase):
     def setUp(self):
@@ -31,4 +32,48 @@ class CacheTestCase(TestCase):
         CacheManager.invalidate_user_feed(user_id)
         
         cached_feed = CacheManager.get_user_feed(user_id)
-        self.assertIsNone(cached_feed)
\ No newline at end of file
+        self.assertIsNone(cached_feed)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    NEAR_CACHE_ENABLED=False
+)
+class CacheTagsTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock()
+        
+        @cache_result(timeout=60, key_prefix='tagged', tags=['user:{user_id}', 'post:{post_id}'])
+        def compute(user_id, post_id=None):
+            self.compute(user_id, post_id)
+            return user_id, post_id
+        
+        self.cached = compute
+    
+    def test_tagged_result_is_cached(self):
+        """Test tagged results are served from cache until invalidated"""
+        self.cached(1, post_id=2)
+        self.cached(1, post_id=2)
+        
+        self.assertEqual(self.compute.call_count, 1)
+    
+    def test_invalidating_a_tag_drops_its_entries(self):
+        """Test invalidating one tag recomputes only the results under it"""
+        self.cached(1, post_id=2)
+        self.cached(3, post_id=4)
+        
+        invalidate_tags(['post:2'])
+        self.cached(1, post_id=2)
+        self.cached(3, post_id=4)
+        
+        self.assertEqual(self.compute.call_count, 3)
+    
+    def test_post_invalidation_bumps_post_tag(self):
+        """Test invalidating a post detail also drops results tagged with the post"""
+        self.cached(1, post_id=2)
+        
+        CacheManager.invalidate_post_detail(2)
+        self.cached(1, post_id=2)
+        
+        self.assertEqual(self.compute.call_count, 2)
@@ -0,0 +1,107 @@
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from apps.core import cache_fill
+from apps.core.cache_fill import acquire_fill_locks, read_through, read_through_many, should_refresh, wrap
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(
+    CACHES=LOCMEM, NEAR_CACHE_ENABLED=False,
+    CACHE_FILL_WAIT=0.2, CACHE_FILL_POLL_INTERVAL=0.01, CACHE_XFETCH_BETA=1.0
+)
+class CacheFillTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_early_refresh_grows_near_expiry(self):
+        """Test XFetch refreshes only as the expiry nears"""
+        entry = wrap('value', delta=0.1, timeout=3600)
+        self.assertFalse(any(should_refresh(entry, 1.0) for _ in range(100)))
+
+        entry['expires_at'] = time.time() + 0.01
+        self.assertTrue(any(should_refresh(entry, 1.0) for _ in range(100)))
+
+    def test_miss_is_computed_once_and_cached(self):
+        """Test a miss computes the value and later reads are served from cache"""
+        compute = mock.Mock(return_value='value')
+
+        self.assertEqual(read_through('key', compute, 60), 'value')
+        self.assertEqual(read_through('key', compute, 60), 'value')
+        self.assertEqual(compute.call_count, 1)
+        self.assertIsNone(cache.get('fill_lock:key'))
+
+    def test_waits_for_fill_in_progress(self):
+        """Test a miss whose lock is held waits for the holder's value"""
+        cache.add('fill_lock:key', 1)
+        compute = mock.Mock(return_value='mine')
+
+        def filled(seconds):
+            cache.set('key', wrap('theirs', 0, 60))
+
+        with mock.patch('apps.core.cache_fill.time.sleep', side_effect=filled):
+            self.assertEqual(read_through('key', compute, 60), 'theirs')
+        compute.assert_not_called()
+
+    def test_computes_when_wait_runs_out(self):
+        """Test a stuck fill does not block readers, nor lose its lock"""
+        cache.add('fill_lock:key', 1)
+
+        self.assertEqual(read_through('key', lambda: 'mine', 60), 'mine')
+        self.assertEqual(cache.get('fill_lock:key'), 1)
+
+    def test_stale_value_is_served_while_refreshing(self):
+        """Test an expired entry is returned and refreshed in the background"""
+        entry = wrap('old', 0, 60)
+        entry['expires_at'] = time.time() - 1
+        cache.set('key', entry)
+
+        with mock.patch.object(cache_fill, 'refresh_in_background') as refresh:
+            self.assertEqual(read_through('key', lambda: 'new', 60, stale_timeout=30), 'old')
+        refresh.assert_called_once()
+
+    def test_many_loads_only_misses(self):
+        """Test the batch read loads cached ids from cache and the rest in one call"""
+        cache.set('post:1', wrap({'id': 1}, 0, 60))
+        load = mock.Mock(return_value={2: {'id': 2}})
+
+        values = read_through_many({'post:1': 1, 'post:2': 2}, load, 60)
+
+        self.assertEqual(values, {1: {'id': 1}, 2: {'id': 2}})
+        load.assert_called_once_with([2])
+        self.assertEqual(cache.get('post:2')['value'], {'id': 2})
+
+    def test_many_waits_for_locked_misses(self):
+        """Test the batch read leaves misses locked by another fill to their holder"""
+        cache.add('fill_lock:post:1', 1)
+        load = mock.Mock(side_effect=lambda ids: {ident: {'id': ident} for ident in ids})
+
+        def filled(seconds):
+            cache.set('post:1', wrap({'id': 1, 'by': 'holder'}, 0, 60))
+
+        with mock.patch('apps.core.cache_fill.time.sleep', side_effect=filled):
+            values = read_through_many({'post:1': 1, 'post:2': 2}, load, 60)
+
+        self.assertEqual(values[1], {'id': 1, 'by': 'holder'})
+        load.assert_called_once_with([2])
+
+    def test_locks_claimed_in_one_round_trip(self):
+        """Test a Redis cache claims every fill lock in a single pipeline"""
+        client = mock.Mock()
+        client.make_key.side_effect = lambda key: f'instagram:1:{key}'
+        client.encode.side_effect = lambda value: value
+        pipe = client.get_client.return_value.pipeline.return_value
+        pipe.execute.return_value = [True, None]
+
+        with mock.patch.object(cache_fill, 'cache', mock.Mock(client=client)):
+            self.assertEqual(acquire_fill_locks(['post:1', 'post:2']), ['post:1'])
+
+        pipe.execute.assert_called_once()
+        self.assertEqual(
+            [call.args[0] for call in pipe.set.call_args_list],
+            ['instagram:1:fill_lock:post:1', 'instagram:1:fill_lock:post:2']
+        )
+        self.assertTrue(all(call.kwargs['nx'] for call in pipe.set.call_args_list))
+
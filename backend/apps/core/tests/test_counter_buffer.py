@@ -0,0 +1,46 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.core.locks import redis_lock
+from apps.posts.counters import post_likes
+from apps.posts.models import Post
+
+User = get_user_model()
+
+class CounterBufferTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', email='author@example.com', password='testpass123')
+        self.post = Post.objects.create(user=self.user, caption='Test')
+        post_likes._conn().delete(post_likes.key, post_likes.flushing_key)
+
+    def tearDown(self):
+        post_likes._conn().delete(post_likes.key, post_likes.flushing_key)
+
+    def test_flush_applies_deltas_once(self):
+        """Test buffered deltas reach the column and leave the buffer"""
+        post_likes.incr(self.post.id, 2)
+        self.assertEqual(post_likes.pending([self.post.id]), {self.post.id: 2})
+        
+        self.assertEqual(post_likes.flush(), [self.post.id])
+        self.assertEqual(post_likes.flush(), [])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        self.assertEqual(post_likes.pending([self.post.id]), {self.post.id: 0})
+
+    def test_flush_skips_while_another_flush_runs(self):
+        """Test a batch claimed by another flush is not applied again"""
+        post_likes.incr(self.post.id)
+        with redis_lock(post_likes.key):
+            self.assertEqual(post_likes.flush(), [])
+        
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertEqual(post_likes.pending([self.post.id]), {self.post.id: 1})
+
+    def test_flush_bumps_updated_at(self):
+        """Test a flushed count marks the row changed for reindex catch-up"""
+        before = self.post.updated_at
+        post_likes.incr(self.post.id)
+        post_likes.flush()
+        
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated_at, before)
@@ -0,0 +1,103 @@
+from collections import namedtuple
+from contextlib import nullcontext
+from unittest import mock
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+from kafka import TopicPartition
+from apps.core.kafka_consumer import BatchConsumer
+
+Record = namedtuple('Record', ['topic', 'partition', 'offset', 'value'])
+
+class FakeConsumer:
+    """Stand-in for KafkaConsumer serving queued batches"""
+
+    def __init__(self, *topics, **config):
+        self.batches = []
+        self.commits = 0
+        self.seeks = {}
+
+    def poll(self, timeout_ms=0, max_records=None):
+        if not self.batches:
+            return {}
+        records = self.batches.pop(0)
+        return {TopicPartition('events', 0): records}
+
+    def commit(self):
+        self.commits += 1
+
+    def seek(self, partition, offset):
+        self.seeks[partition] = offset
+
+    def assignment(self):
+        return set()
+
+
+@override_settings(KAFKA_CONSUMER_RETRY_BACKOFF=0, KAFKA_CONSUMER_MAX_RETRIES=1)
+class BatchConsumerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.handled = []
+        # Handlers here never touch the database
+        for target, new in (
+            ('apps.core.kafka_consumer.transaction.atomic', nullcontext),
+            ('apps.core.kafka_consumer.close_old_connections', mock.Mock()),
+        ):
+            patcher = mock.patch(target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_consumer(self, handler=None):
+        consumer = BatchConsumer(['events'], 'test-group', handler or self.handled.append, consumer_class=FakeConsumer)
+        consumer.connect()
+        return consumer
+
+    def records(self, *values):
+        return [Record('events', 0, offset, value) for offset, value in enumerate(values)]
+
+    def test_batch_is_handled_then_committed(self):
+        """Test a polled batch reaches the handler at once before its commit"""
+        consumer = self.make_consumer()
+        consumer.consumer.batches.append(self.records({'id': 1}, None, {'id': 2}))
+        
+        self.assertEqual(consumer.poll_once(), 3)
+        self.assertEqual(self.handled, [[{'id': 1}, {'id': 2}]])
+        self.assertEqual(consumer.consumer.commits, 1)
+
+    def test_failing_message_is_skipped(self):
+        """Test a message that keeps failing is isolated and the rest handled"""
+        def handler(values):
+            if any(value['id'] == 2 for value in values):
+                raise ValueError('Bad event')
+            self.handled.extend(values)
+
+        consumer = self.make_consumer(handler)
+        consumer.consumer.batches.append(self.records({'id': 1}, {'id': 2}, {'id': 3}))
+        consumer.poll_once()
+        
+        self.assertEqual(self.handled, [{'id': 1}, {'id': 3}])
+        self.assertEqual(consumer.consumer.commits, 1)
+
+    def test_database_outage_rewinds_batch(self):
+        """Test the batch is polled again, uncommitted, when the database is down"""
+        def handler(values):
+            raise OperationalError('Connection refused')
+
+        consumer = self.make_consumer(handler)
+        consumer.consumer.batches.append(self.records({'id': 1}, {'id': 2}))
+        consumer.poll_once()
+        
+        self.assertEqual(consumer.consumer.commits, 0)
+        self.assertEqual(consumer.consumer.seeks, {TopicPartition('events', 0): 0})
+
+    @override_settings(KAFKA_CONSUMER_RETRY_BACKOFF=1, KAFKA_CONSUMER_MAX_BACKOFF=3)
+    def test_outage_backoff_grows(self):
+        """Test consecutive database outages wait longer each time, up to the cap"""
+        def handler(values):
+            raise OperationalError('Connection refused')
+
+        consumer = self.make_consumer(handler)
+        with mock.patch('apps.core.kafka_consumer.time.sleep') as sleep:
+            for _ in range(4):
+                consumer.consumer.batches.append(self.records({'id': 1}))
+                consumer.poll_once()
+        
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2, 3, 3])
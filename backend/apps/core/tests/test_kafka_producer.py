@@ -0,0 +1,71 @@
+from django.test import SimpleTestCase
+from kafka.errors import KafkaTimeoutError
+from kafka.future import Future
+from apps.core.kafka_producer import EventProducer, MESSAGES
+
+class FakeProducer:
+    instances = 0
+
+    def __init__(self, **config):
+        FakeProducer.instances += 1
+        self.config = config
+        self.futures = []
+        self.flushed = False
+
+    def send(self, topic, value, key=None):
+        if topic == 'full':
+            raise KafkaTimeoutError('Buffer full')
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def flush(self, timeout=None):
+        self.flushed = True
+
+
+class EventProducerTestCase(SimpleTestCase):
+    def setUp(self):
+        FakeProducer.instances = 0
+        self.producer = EventProducer(producer_class=FakeProducer)
+
+    def count(self, topic, result):
+        return MESSAGES.labels(topic, result)._value.get()
+
+    def test_connects_lazily(self):
+        """Test the client is created on first send, not at construction"""
+        self.assertEqual(FakeProducer.instances, 0)
+        self.producer.send_event('events', {'id': 1})
+        self.producer.send_event('events', {'id': 2})
+        
+        self.assertEqual(FakeProducer.instances, 1)
+        self.assertEqual(self.producer.producer.config['api_version'], (2, 5, 0))
+        self.assertGreater(self.producer.producer.config['linger_ms'], 0)
+
+    def test_send_does_not_wait_for_delivery(self):
+        """Test sending returns at once and callbacks record the outcome"""
+        delivered = self.count('events', 'delivered')
+        failed = self.count('events', 'failed')
+        
+        self.assertTrue(self.producer.send_event('events', {'id': 1}))
+        self.assertTrue(self.producer.send_event('events', {'id': 2}))
+        first, second = self.producer.producer.futures
+        first.success(None)
+        second.failure(KafkaTimeoutError('Broker unavailable'))
+        
+        self.assertEqual(self.count('events', 'delivered'), delivered + 1)
+        self.assertEqual(self.count('events', 'failed'), failed + 1)
+
+    def test_full_buffer_drops_event(self):
+        """Test an event is dropped when the local buffer stays full"""
+        dropped = self.count('full', 'dropped')
+        
+        self.assertFalse(self.producer.send_event('full', {'id': 1}))
+        self.assertEqual(self.count('full', 'dropped'), dropped + 1)
+
+    def test_flush(self):
+        """Test flush drains the client only once it exists"""
+        self.producer.flush()
+        self.producer.send_event('events', {'id': 1})
+        self.producer.flush()
+        
+        self.assertTrue(self.producer.producer.flushed)
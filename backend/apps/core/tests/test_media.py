@@ -0,0 +1,56 @@
+from io import BytesIO
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from apps.core import media
+from apps.core.media import blurhash, render_image, render_images
+
+class MediaRenditionTestCase(SimpleTestCase):
+    def _image_bytes(self, size=(1200, 800)):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 40, 40)).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+    def test_renditions_never_upscale(self):
+        """Test renditions are capped at the original width"""
+        result = render_image(self._image_bytes(), [320, 2000], 80)
+        
+        widths = {rendition['width'] for rendition in result['renditions']}
+        formats = {rendition['format'] for rendition in result['renditions']}
+        self.assertEqual(widths, {320, 1200})
+        self.assertEqual(formats, {'webp', 'jpeg'})
+        self.assertEqual(result['renditions'][0]['height'], 213)
+
+    def test_blurhash_placeholder(self):
+        """Test the placeholder is a 4x3 component BlurHash"""
+        placeholder = blurhash(Image.new('RGB', (64, 64), (255, 255, 255)))
+        
+        self.assertEqual(len(placeholder), 28)
+        self.assertEqual(placeholder[0], 'L')
+
+    @override_settings(MEDIA_PROCESS_WORKERS=2)
+    def test_daemonic_worker_renders_in_process(self):
+        """Test a daemonic process renders in-process without starting a pool"""
+        daemon = mock.Mock(daemon=True)
+        with mock.patch.object(media, '_pool', None), mock.patch.object(media, '_pool_unavailable', False), \
+                mock.patch('apps.core.media.multiprocessing.current_process', return_value=daemon), \
+                mock.patch('apps.core.media.ProcessPoolExecutor') as executor:
+            first = render_images({'a': self._image_bytes((64, 64))})
+            second = render_images({'b': self._image_bytes((64, 64))})
+            self.assertTrue(media._pool_unavailable)
+        
+        self.assertEqual((set(first), set(second)), ({'a'}, {'b'}))
+        executor.assert_not_called()
+
+    @override_settings(MEDIA_PROCESS_WORKERS=2)
+    def test_failed_pool_is_not_retried(self):
+        """Test a pool that rejects work is remembered and not restarted"""
+        executor = mock.Mock()
+        executor.return_value.submit.side_effect = RuntimeError('daemonic processes are not allowed to have children')
+        with mock.patch.object(media, '_pool', None), mock.patch.object(media, '_pool_unavailable', False), \
+                mock.patch('apps.core.media.ProcessPoolExecutor', executor):
+            render_images({'a': self._image_bytes((64, 64))})
+            result = render_images({'b': self._image_bytes((64, 64))})
+        
+        self.assertEqual(set(result), {'b'})
+        executor.assert_called_once()
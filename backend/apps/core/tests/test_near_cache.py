@@ -0,0 +1,41 @@
+import time
+from django.test import SimpleTestCase
+from apps.core.near_cache import NearCache
+
+class NearCacheTestCase(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the cache keeps at most max_entries, dropping the coldest"""
+        near = NearCache(max_entries=2, ttl=60)
+        near.set('post:1', 1)
+        near.set('post:2', 2)
+        near.get('post:1')
+        near.set('post:3', 3)
+        
+        self.assertEqual(near.get('post:1'), 1)
+        self.assertIsNone(near.get('post:2'))
+        self.assertEqual(near.get('post:3'), 3)
+
+    def test_entries_expire(self):
+        """Test entries live no longer than the smaller of both TTLs"""
+        near = NearCache(max_entries=10, ttl=60)
+        near.set('post:1', 1, timeout=0.01)
+        time.sleep(0.02)
+        
+        self.assertIsNone(near.get('post:1'))
+
+    def test_reads_return_copies(self):
+        """Test a caller mutating a cached value does not change the cache"""
+        near = NearCache(max_entries=10, ttl=60)
+        near.set('post:1', {'likes_count': 1})
+        near.get('post:1')['likes_count'] = 99
+        
+        self.assertEqual(near.get('post:1'), {'likes_count': 1})
+
+    def test_read_racing_invalidation_is_not_stored(self):
+        """Test a value read before an eviction is not cached after it"""
+        near = NearCache(max_entries=10, ttl=60)
+        generation = near.generation
+        near.evict(['post:1'])
+        near.set('post:1', 'stale', generation=generation)
+        
+        self.assertIsNone(near.get('post:1'))
@@ -0,0 +1,94 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from kafka.errors import KafkaTimeoutError
+from kafka.future import Future
+from rest_framework.test import APIClient
+from apps.core.models import EventOutbox
+from apps.core.outbox import OutboxRelay, enqueue_event
+from apps.posts.models import Post
+
+User = get_user_model()
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+        self.failing = set()
+        self.unacked = set()
+
+    def send(self, topic, value, key=None):
+        future = Future()
+        if key in self.failing or value.get('index') in self.unacked:
+            future.failure(KafkaTimeoutError('Broker unavailable'))
+        else:
+            self.sent.append((topic, key, value))
+            future.success(None)
+        return future
+
+    def flush(self, timeout=None):
+        pass
+
+
+@override_settings(OUTBOX_SHARDS=1, OUTBOX_MAX_ATTEMPTS=2)
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        self.producer = FakeProducer()
+        self.relay = OutboxRelay(producer=self.producer)
+
+    def test_like_writes_event_with_the_like(self):
+        """Test liking a post records its event in the outbox"""
+        user = User.objects.create_user(username='alice', email='alice@example.com', password='testpass123')
+        post = Post.objects.create(user=user, caption='Hello')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.post(f'/api/posts/{post.id}/like/')
+        
+        event = EventOutbox.objects.get(topic='post_liked')
+        self.assertEqual(event.aggregate, f'post:{post.id}')
+        self.assertEqual(event.payload['user_id'], user.id)
+
+    def test_relay_publishes_in_order_and_deletes(self):
+        """Test events are published in order and removed once acknowledged"""
+        for index in range(3):
+            enqueue_event('post_liked', {'index': index}, aggregate='post:1')
+        
+        self.assertEqual(self.relay.run_once(), 3)
+        self.assertEqual([value['index'] for _, _, value in self.producer.sent], [0, 1, 2])
+        self.assertFalse(EventOutbox.objects.exists())
+
+    def test_failed_event_holds_back_its_aggregate(self):
+        """Test a failing event is retried before newer events of its aggregate"""
+        enqueue_event('post_liked', {'index': 0}, aggregate='post:1')
+        enqueue_event('post_liked', {'index': 1}, aggregate='post:1')
+        enqueue_event('post_liked', {'index': 2}, aggregate='post:2')
+        self.producer.failing.add('post:1')
+        
+        self.assertEqual(self.relay.run_once(), 1)
+        self.assertEqual(self.relay.run_once(), 0)
+        first = EventOutbox.objects.get(payload__index=0)
+        self.assertEqual(first.attempts, 1)
+        self.assertIsNotNone(first.next_attempt_at)
+        self.assertEqual(EventOutbox.objects.get(payload__index=1).attempts, 0)
+
+    def test_unacked_event_keeps_later_events(self):
+        """Test an event acked after its aggregate's failed event is kept for the retry"""
+        enqueue_event('post_liked', {'index': 0}, aggregate='post:1')
+        enqueue_event('post_liked', {'index': 1}, aggregate='post:1')
+        self.producer.unacked.add(0)
+        
+        self.assertEqual(self.relay.run_once(), 0)
+        self.assertEqual(EventOutbox.objects.count(), 2)
+        self.assertEqual(EventOutbox.objects.get(payload__index=1).attempts, 0)
+
+    def test_event_is_dead_lettered(self):
+        """Test an event that exhausts its attempts is dead and no longer blocks"""
+        event = enqueue_event('post_liked', {'index': 0}, aggregate='post:1')
+        enqueue_event('post_liked', {'index': 1}, aggregate='post:1')
+        EventOutbox.objects.filter(pk=event.pk).update(attempts=1)
+        self.producer.failing.add('post:1')
+        self.relay.run_once()
+        self.producer.failing.clear()
+        EventOutbox.objects.filter(payload__index=1).update(next_attempt_at=None)
+        
+        event.refresh_from_db()
+        self.assertEqual(event.status, EventOutbox.DEAD)
+        self.assertEqual(self.relay.run_once(), 1)
@@ -0,0 +1,49 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.core.pagination import (
+    KeysetPagination, SearchAfterPagination, cursor_datetime, decode_cursor, encode_cursor
+)
+
+class CursorTestCase(SimpleTestCase):
+    def request(self, values=None, raw=None):
+        cursor = raw if raw is not None else encode_cursor(values)
+        return Request(APIRequestFactory().get('/', {'cursor': cursor}))
+
+    def test_cursor_round_trip(self):
+        """Test a position survives encoding and decoding"""
+        self.assertEqual(decode_cursor(encode_cursor([1700000000.5, 42])), [1700000000.5, 42])
+
+    def test_garbage_cursor_is_rejected(self):
+        """Test a cursor that is not base64 JSON is a 404"""
+        with self.assertRaises(NotFound):
+            decode_cursor('not a cursor')
+
+    def test_position_types_are_checked(self):
+        """Test decoded cursors with the wrong shape or types are rejected"""
+        paginator = KeysetPagination()
+        self.assertEqual(paginator.get_position(self.request([1.5, 7])), [1.5, 7])
+        for values in ([1.5], [1.5, '7'], [None, 7], [[1], 7], [1.5, True], {'a': 1}):
+            with self.subTest(values=values), self.assertRaises(NotFound):
+                paginator.get_position(self.request(values))
+
+    def test_ranked_positions_need_a_finite_score(self):
+        """Test score cursors reject strings and non-finite numbers"""
+        paginator = KeysetPagination()
+        for raw in (encode_cursor(['2024-01-01T00:00:00', 7]), 'WyJOYU4iLDdd', 'W05hTiw3XQ=='):
+            with self.subTest(raw=raw), self.assertRaises(NotFound):
+                paginator.paginate_positions(lambda position, limit: [], self.request(raw=raw))
+
+    def test_out_of_range_timestamp_is_rejected(self):
+        """Test a timestamp no datetime can hold is a 404, not a 500"""
+        with self.assertRaises(NotFound):
+            cursor_datetime(1e300)
+
+    def test_search_after_values_are_checked(self):
+        """Test search_after cursors must hold one number per sort key"""
+        paginator = SearchAfterPagination()
+        for values in ([1.5], [1.5, 'x'], ['a', 'b']):
+            with self.subTest(values=values), self.assertRaises(NotFound):
+                paginator.paginate_search(mock.MagicMock(), self.request(values))
@@ -0,0 +1,37 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.core.purge import chunked_purge
+from apps.notifications.models import Notification
+
+User = get_user_model()
+
+class ChunkedPurgeTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='testpass123')
+        for index in range(7):
+            Notification.objects.create(
+                recipient=self.alice, sender=self.bob,
+                notification_type='follow', is_read=index % 2 == 0
+            )
+
+    def test_purge_in_batches(self):
+        """Test only matching rows are deleted, in bounded batches"""
+        result = chunked_purge(
+            Notification.objects.filter(is_read=True), 'test', batch_size=2, sleep=0
+        )
+        
+        self.assertEqual(result.rows, 4)
+        self.assertEqual(result.batches, 2)
+        self.assertTrue(result.complete)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertFalse(Notification.objects.filter(is_read=True).exists())
+
+    def test_purge_stops_at_time_budget(self):
+        """Test a run stops early once its time budget is spent"""
+        result = chunked_purge(
+            Notification.objects.filter(is_read=True), 'test', batch_size=1, sleep=0, max_seconds=0
+        )
+        
+        self.assertEqual(result.batches, 1)
+        self.assertFalse(result.complete)
@@ -0,0 +1,87 @@
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.core.locks import redis_lock
+from apps.core.search_indexing import IndexQueue
+from apps.posts.documents import PostDocument
+from apps.posts.models import Post
+
+User = get_user_model()
+
+class IndexQueueTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', email='author@example.com', password='testpass123')
+        self.post = Post.objects.create(user=self.user, caption='Test', likes_count=3)
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        keys = []
+        for kind in (IndexQueue.FULL, IndexQueue.PARTIAL):
+            key = IndexQueue.key(PostDocument, kind)
+            keys += [key, f'{key}:flushing']
+        IndexQueue._conn().delete(*keys)
+
+    def queued(self, kind):
+        return {int(obj_id) for obj_id in IndexQueue._conn().smembers(IndexQueue.key(PostDocument, kind))}
+
+    def test_mark_waits_for_commit(self):
+        """Test marked rows are queued only once the transaction commits"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            IndexQueue.mark(Post, [self.post.id], partial=True)
+            self.assertEqual(self.queued(IndexQueue.PARTIAL), set())
+        
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(self.queued(IndexQueue.PARTIAL), {self.post.id})
+
+    def test_flush_sends_full_and_partial_actions(self):
+        """Test a full re-index supersedes a partial update of the same row"""
+        other = Post.objects.create(user=self.user, caption='Other', likes_count=7)
+        IndexQueue._enqueue([PostDocument], [self.post.id])
+        IndexQueue._enqueue([PostDocument], [self.post.id, other.id], partial=True)
+        
+        with mock.patch.object(PostDocument, 'bulk', return_value=(2, [])) as bulk:
+            self.assertEqual(IndexQueue.flush(PostDocument), 2)
+        
+        actions = [action for call in bulk.call_args_list for action in call.args[0]]
+        self.assertEqual(
+            [(action.get('_op_type', 'index'), int(action['_id'])) for action in actions],
+            [('index', self.post.id), ('update', other.id)]
+        )
+        self.assertEqual(actions[1]['doc'], {'likes_count': 7, 'comments_count': 0})
+        self.assertEqual(self.queued(IndexQueue.FULL) | self.queued(IndexQueue.PARTIAL), set())
+
+    def test_flush_deletes_rows_that_no_longer_qualify(self):
+        """Test an archived row is removed from the index"""
+        Post.objects.filter(pk=self.post.pk).update(is_archived=True)
+        IndexQueue._enqueue([PostDocument], [self.post.id])
+        
+        with mock.patch.object(PostDocument, 'bulk', return_value=(1, [])) as bulk:
+            IndexQueue.flush(PostDocument)
+        
+        self.assertEqual(bulk.call_args.args[0], [{'_op_type': 'delete', '_index': 'posts', '_id': self.post.id}])
+
+    def test_partial_update_of_missing_document_is_requeued_in_full(self):
+        """Test a 404 on a partial update queues the row for a full index"""
+        IndexQueue._enqueue([PostDocument], [self.post.id], partial=True)
+        errors = [{'update': {'_id': str(self.post.id), 'status': 404}}]
+        
+        with mock.patch.object(PostDocument, 'bulk', return_value=(0, errors)):
+            IndexQueue.flush(PostDocument)
+        
+        self.assertEqual(self.queued(IndexQueue.FULL), {self.post.id})
+        self.assertEqual(self.queued(IndexQueue.PARTIAL), set())
+
+    def test_flush_skips_while_another_flush_runs(self):
+        """Test a queue claimed by another flush is left alone"""
+        IndexQueue._enqueue([PostDocument], [self.post.id])
+        
+        with redis_lock(f'search_index:{PostDocument._index._name}'), \
+                mock.patch.object(PostDocument, 'bulk') as bulk:
+            self.assertEqual(IndexQueue.flush(PostDocument), 0)
+        
+        bulk.assert_not_called()
+        self.assertEqual(self.queued(IndexQueue.FULL), {self.post.id})
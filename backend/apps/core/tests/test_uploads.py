@@ -0,0 +1,66 @@
+from io import BytesIO
+import tempfile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from PIL import Image
+from apps.core.models import UploadSession
+
+User = get_user_model()
+
+@override_settings(UPLOAD_TEMP_DIR=tempfile.mkdtemp(), MEDIA_ROOT=tempfile.mkdtemp())
+class UploadSessionAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), (10, 20, 30)).save(buffer, 'PNG')
+        self.content = buffer.getvalue()
+
+    def _init(self, **overrides):
+        data = {
+            'filename': 'photo.png',
+            'content_type': 'image/png',
+            'media_type': 'image',
+            'total_size': len(self.content),
+        }
+        data.update(overrides)
+        return self.client.post('/api/uploads/', data)
+
+    def _put(self, upload_id, start, end):
+        return self.client.generic(
+            'PUT', f'/api/uploads/{upload_id}/', self.content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}'
+        )
+
+    def test_chunked_upload(self):
+        """Test uploading in chunks and completing"""
+        upload_id = self._init().data['id']
+        middle = len(self.content) // 2
+        
+        self.assertEqual(self._put(upload_id, 0, middle - 1).status_code, status.HTTP_200_OK)
+        response = self._put(upload_id, middle, len(self.content) - 1)
+        self.assertEqual(response.data['received_size'], len(self.content))
+        
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.data['status'], UploadSession.COMPLETED)
+
+    def test_out_of_order_chunk_rejected(self):
+        """Test a chunk must start at the received offset"""
+        upload_id = self._init().data['id']
+        response = self._put(upload_id, 10, 19)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['received_size'], 0)
+
+    @override_settings(UPLOAD_MAX_SIZE=10)
+    def test_size_limit_enforced_at_init(self):
+        """Test oversized uploads are rejected before any bytes are sent"""
+        response = self._init()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers
+from .models import UploadSession
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 64 * 1024
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def parse_content_range(header, session):
+    """
+    Parse ``Content-Range: bytes start-end/total`` for a chunk of
+    ``session`` and return ``(start, length)``.
+    """
+    match = CONTENT_RANGE.match(header or '')
+    if not match:
+        raise serializers.ValidationError('A Content-Range header of the form "bytes start-end/total" is required')
+    start, end, total = (int(value) for value in match.groups())
+    if total != session.total_size or end < start or end >= total:
+        raise serializers.ValidationError('Content-Range does not match the upload')
+    length = end - start + 1
+    if length > settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise serializers.ValidationError(
+            f'Chunks cannot exceed {settings.UPLOAD_MAX_CHUNK_SIZE} bytes'
+        )
+    return start, length
+
+
+def write_chunk(session, start, length, stream):
+    """
+    Stream one chunk from ``stream`` into the session's partial file at
+    ``start``, never holding more than COPY_BUFFER_SIZE bytes in memory.
+    Returns False when another request already advanced the offset.
+    """
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    path = session.temp_path
+    written = 0
+    # Positional writes make a retried chunk idempotent
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.seek(start)
+        while written < length:
+            data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            written += len(data)
+
+    if written != length:
+        raise serializers.ValidationError(f'Expected {length} bytes but received {written}')
+
+    return bool(UploadSession.objects.filter(
+        pk=session.pk,
+        status=UploadSession.UPLOADING,
+        received_size=start
+    ).update(received_size=start + length, updated_at=timezone.now()))
+
+
+def complete_upload(session_id, user):
+    """Verify a fully received upload and move it into media storage"""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id, user=user)
+        if session.status != UploadSession.UPLOADING:
+            return session
+        if session.received_size != session.total_size:
+            raise serializers.ValidationError(
+                f'Upload is incomplete: {session.received_size} of {session.total_size} bytes received'
+            )
+
+        if session.media_type == 'image':
+            try:
+                with Image.open(session.temp_path) as image:
+                    image.verify()
+            except Exception:
+                raise serializers.ValidationError('Uploaded file is not a valid image')
+
+        with open(session.temp_path, 'rb') as f:
+            session.file = default_storage.save(session.storage_name, File(f))
+        session.status = UploadSession.COMPLETED
+        session.save(update_fields=['file', 'status', 'updated_at'])
+
+    discard_partial(session)
+    return session
+
+
+def discard_partial(session):
+    try:
+        os.remove(session.temp_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Error removing partial upload {session.id}: {e}")
+
+
+def claim_uploads(user, upload_ids):
+    """
+    Mark completed uploads as attached and return them in the given order.
+    Must run inside the transaction that creates the referencing rows.
+    """
+    upload_ids = list(dict.fromkeys(upload_ids))
+    sessions = {
+        session.id: session
+        for session in UploadSession.objects.select_for_update().filter(
+            user=user, id__in=upload_ids, status=UploadSession.COMPLETED
+        )
+    }
+    if len(sessions) != len(upload_ids):
+        raise serializers.ValidationError('Uploads must be completed and belong to you')
+    UploadSession.objects.filter(pk__in=upload_ids).update(
+        status=UploadSession.ATTACHED, updated_at=timezone.now()
+    )
+    return [sessions[upload_id] for upload_id in upload_ids]
@@ -1,8 +1,13 @@
-from django.urls import path
-from .views import HealthCheckView, ReadinessCheckView, LivenessCheckView
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
+from .views import HealthCheckView, ReadinessCheckView, LivenessCheckView, UploadSessionViewSet
+
+router = SimpleRouter()
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('health/', HealthCheckView.as_view(), name='health-check'),
     path('ready/', ReadinessCheckView.as_view(), name='readiness-check'),
     path('live/', LivenessCheckView.as_view(), name='liveness-check'),
+    path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,74 @@
+from collections import defaultdict
+from django.db import models
+from rest_framework import serializers
+
+
+class ViewerState:
+    """
+    Per-request store of viewer-specific flags (liked, saved, viewed...).
+
+    Flags are resolved for a whole page at once and recorded here so that
+    serializers can answer ``is_liked``-style fields without a query per
+    object. ``lookup`` returns None for objects that were never resolved so
+    callers can fall back to a direct query.
+
+    Serializers rendered with ``viewer_independent`` in their context skip
+    all of this; their output can be cached and shared between viewers.
+    """
+
+    def __init__(self):
+        self._resolved = defaultdict(set)
+        self._hits = defaultdict(set)
+
+    def update(self, name, resolved_ids, hit_ids):
+        self._resolved[name].update(resolved_ids)
+        self._hits[name].update(hit_ids)
+
+    def lookup(self, name, obj_id):
+        if obj_id not in self._resolved[name]:
+            return None
+        return obj_id in self._hits[name]
+
+
+def get_viewer(context):
+    """Return the authenticated user for a serializer context, if any"""
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def get_viewer_state(context):
+    """Return the ViewerState attached to a serializer context, creating it"""
+    if 'viewer_state' not in context:
+        context['viewer_state'] = ViewerState()
+    return context['viewer_state']
+
+
+def viewer_flag(context, name, obj_id, fallback):
+    """
+    Resolve a viewer flag from the prefetched state, or call ``fallback``
+    when the object was not part of a prefetched page.
+    """
+    if get_viewer(context) is None or context.get('viewer_independent'):
+        return False
+    state = context.get('viewer_state')
+    result = state.lookup(name, obj_id) if state else None
+    if result is None:
+        return fallback()
+    return result
+
+
+class ViewerStateListSerializer(serializers.ListSerializer):
+    """
+    List serializer that lets its child resolve viewer state for the whole
+    page before any item is rendered. The child serializer implements
+    ``prefetch_viewer_state(instances, context)``.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(iterable)
+        if items and get_viewer(self.context) is not None and not self.context.get('viewer_independent'):
+            self.child.prefetch_viewer_state(items, self.context)
+        return super().to_representation(items)
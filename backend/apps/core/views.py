@@ -1,9 +1,16 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from django.core.cache import cache
 from django.db import connection
 from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+from .uploads import complete_upload, parse_content_range, write_chunk
 import redis
 import logging
 
@@ -80,4 +87,62 @@ class LivenessCheckView(APIView):
     permission_classes = []
     
     def get(self, request):
-        return Response({'status': 'alive'}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({'status': 'alive'}, status=status.HTTP_200_OK)
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads.
+
+    POST creates a session, PUT sends one chunk with a Content-Range header,
+    GET reports how many bytes were received so a client can resume, and
+    POST ``complete/`` moves the file into media storage. Posts and stories
+    then reference the upload by id.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(
+            user=self.request.user,
+            expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        )
+
+    def update(self, request, *args, **kwargs):
+        """Append one chunk; the body is streamed, never parsed"""
+        session = self.get_object()
+        if session.status != UploadSession.UPLOADING:
+            return Response(
+                {'error': 'Upload is already complete'}, 
+                status=status.HTTP_409_CONFLICT
+            )
+
+        start, length = parse_content_range(request.headers.get('Content-Range'), session)
+        if start != session.received_size:
+            return Response(
+                {'error': 'Chunk does not start at the current offset', 'received_size': session.received_size}, 
+                status=status.HTTP_409_CONFLICT
+            )
+        if int(request.headers.get('Content-Length') or 0) != length:
+            return Response(
+                {'error': 'Content-Length does not match Content-Range'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not write_chunk(session, start, length, request.stream):
+            session.refresh_from_db()
+            return Response(
+                {'error': 'Chunk was superseded', 'received_size': session.received_size}, 
+                status=status.HTTP_409_CONFLICT
+            )
+        session.received_size = start + length
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = complete_upload(self.get_object().pk, request.user)
+        return Response(self.get_serializer(session).data)
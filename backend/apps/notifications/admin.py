@@ -1,15 +1,16 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import Notification
+from .unread import UnreadCounter
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['id', 'recipient', 'sender', 'notification_type', 
-                    'status_badge', 'post_info', 'created_at']
-    list_filter = ['notification_type', 'is_read', 'created_at']
+    list_display = ['id', 'recipient', 'sender', 'notification_type', 'actor_count',
+                    'status_badge', 'post_info', 'updated_at']
+    list_filter = ['notification_type', 'is_read', 'updated_at']
     search_fields = ['recipient__username', 'sender__username', 'post__caption']
     raw_id_fields = ['recipient', 'sender', 'post', 'comment']
-    readonly_fields = ['created_at']
+    readonly_fields = ['group_key', 'actor_count', 'recent_actor_ids', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Notification Information', {
@@ -18,8 +19,11 @@ class NotificationAdmin(admin.ModelAdmin):
         ('Related Content', {
             'fields': ('post', 'comment')
         }),
+        ('Aggregation', {
+            'fields': ('group_key', 'actor_count', 'recent_actor_ids')
+        }),
         ('Timestamp', {
-            'fields': ('created_at',)
+            'fields': ('created_at', 'updated_at')
         }),
     )
     
@@ -59,13 +63,17 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def mark_as_read(self, request, queryset):
         """Admin action to mark notifications as read"""
+        recipients = set(queryset.values_list('recipient_id', flat=True))
         count = queryset.update(is_read=True)
+        UnreadCounter.invalidate(recipients)
         self.message_user(request, f'{count} notifications marked as read.')
     mark_as_read.short_description = 'Mark selected as read'
     
     def mark_as_unread(self, request, queryset):
         """Admin action to mark notifications as unread"""
+        recipients = set(queryset.values_list('recipient_id', flat=True))
         count = queryset.update(is_read=False)
+        UnreadCounter.invalidate(recipients)
         self.message_user(request, f'{count} notifications marked as unread.')
     mark_as_unread.short_description = 'Mark selected as unread'
     
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Notification
+from .realtime import publish_notifications
+from .unread import UnreadCounter
+import logging
+
+logger = logging.getLogger(__name__)
+
+AGGREGATED_TYPES = {'like', 'comment', 'follow'}
+
+
+def group_key(notification_type, post_id=None, at=None):
+    """
+    Key of the group an event joins: its type, its post and the time
+    window it falls in. Windows are aligned, so every writer derives the
+    same key without coordinating.
+    """
+    at = at or timezone.now()
+    window = int(at.timestamp()) // settings.NOTIFICATION_GROUP_WINDOW
+    return f'{notification_type}:{post_id or "-"}:{window}'
+
+
+def notify(recipient_id, sender_id, notification_type, post_id=None, comment_id=None):
+    """Record a single notification event"""
+    aggregate([{
+        'recipient_id': recipient_id,
+        'sender_id': sender_id,
+        'notification_type': notification_type,
+        'post_id': post_id,
+        'comment_id': comment_id,
+    }])
+
+
+def aggregate(events):
+    """
+    Fold notification events, oldest first, into their group rows.
+
+    Events of one group are merged in memory and applied with a single
+    locked upsert, so a burst of likes on a popular post updates one row
+    instead of inserting one per like. Types that are not aggregated are
+    inserted as they are. Recipients gain one unread notification per
+    group that is new or was read before. Touched notifications are
+    published to the recipients' streams after commit and returned.
+    """
+    now = timezone.now()
+    groups = {}
+    singles = []
+    for event in events:
+        if event['recipient_id'] == event['sender_id']:
+            continue
+        if event['notification_type'] not in AGGREGATED_TYPES:
+            singles.append(Notification(**event))
+            continue
+        key = group_key(event['notification_type'], event.get('post_id'), now)
+        groups.setdefault((event['recipient_id'], key), []).append(event)
+
+    touched = []
+    unread = []
+    # A fixed lock order keeps concurrent batches from deadlocking
+    for recipient_id, key in sorted(groups):
+        try:
+            group, became_unread = upsert_group(recipient_id, key, groups[(recipient_id, key)])
+        except IntegrityError as e:
+            # The recipient, actor or post was deleted meanwhile
+            logger.error(f"Error aggregating notification group {key} for user {recipient_id}: {e}")
+            continue
+        touched.append(group)
+        if became_unread:
+            unread.append(recipient_id)
+    if singles:
+        touched.extend(Notification.objects.bulk_create(singles))
+        unread.extend(notification.recipient_id for notification in singles)
+
+    if unread:
+        transaction.on_commit(lambda: UnreadCounter.incr(unread))
+    if touched:
+        transaction.on_commit(lambda: publish_notifications(touched))
+    return touched
+
+
+def upsert_group(recipient_id, key, events):
+    """
+    Create the group row or fold ``events`` into it under a row lock.
+
+    Actors are de-duplicated against the recent actors only, so someone who
+    acts again long after dropping out of that list is counted twice; the
+    count is meant for display ("alice and 41 others"). Returns the group
+    and whether it went from read (or missing) to unread.
+    """
+    limit = settings.NOTIFICATION_RECENT_ACTORS
+    latest = events[-1]
+    actors = list(dict.fromkeys(event['sender_id'] for event in reversed(events)))
+    comment_id = next((event['comment_id'] for event in reversed(events) if event.get('comment_id')), None)
+
+    with transaction.atomic():
+        group, created = Notification.objects.select_for_update().get_or_create(
+            recipient_id=recipient_id,
+            group_key=key,
+            defaults={
+                'sender_id': actors[0],
+                'notification_type': latest['notification_type'],
+                'post_id': latest.get('post_id'),
+                'comment_id': comment_id,
+                'actor_count': len(actors),
+                'recent_actor_ids': actors[:limit],
+            }
+        )
+        if created:
+            return group, True
+
+        was_read = group.is_read
+        known = set(group.recent_actor_ids)
+        group.actor_count += sum(1 for actor in actors if actor not in known)
+        group.recent_actor_ids = (actors + [
+            actor for actor in group.recent_actor_ids if actor not in actors
+        ])[:limit]
+        group.sender_id = actors[0]
+        group.comment_id = comment_id or group.comment_id
+        group.is_read = False
+        group.save(update_fields=[
+            'sender', 'comment', 'actor_count', 'recent_actor_ids', 'is_read', 'updated_at'
+        ])
+    return group, was_read
@@ -1,6 +1,5 @@
 from apps.core.kafka_producer import event_producer
-from apps.core.kafka_consumer import EventConsumer
-from .models import Notification
+from .aggregation import aggregate
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,22 +12,19 @@ def publish_notification_event(notification_type, recipient_id, sender_id, post_
         'sender_id': sender_id,
         'post_id': post_id,
     }
-    event_producer.send_event('notifications', event_data)
+    event_producer.send_event('notifications', event_data, key=recipient_id)
 
-def handle_notification_event(event_data):
-    """Handle notification event from Kafka"""
-    try:
-        Notification.objects.create(
-            notification_type=event_data['type'],
-            recipient_id=event_data['recipient_id'],
-            sender_id=event_data['sender_id'],
-            post_id=event_data.get('post_id')
-        )
-        logger.info(f"Created notification from Kafka event")
-    except Exception as e:
-        logger.error(f"Failed to create notification from Kafka event: {e}")
-
-# Consumer for notifications
-def start_notification_consumer():
-    consumer = EventConsumer('notifications', 'notification-group')
-    consumer.consume_events(handle_notification_event)
\ No newline at end of file
+def handle_notification_events(events):
+    """Fold a batch of notification events from Kafka into their groups"""
+    notifications = []
+    for event_data in events:
+        try:
+            notifications.append({
+                'recipient_id': event_data['recipient_id'],
+                'sender_id': event_data['sender_id'],
+                'notification_type': event_data['type'],
+                'post_id': event_data.get('post_id'),
+            })
+        except (KeyError, TypeError):
+            logger.error(f"Skipping malformed notification event: {event_data}")
+    aggregate(notifications)
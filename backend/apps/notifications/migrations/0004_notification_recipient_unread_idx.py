@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_comment_comment_post_created_idx'),
+        ('notifications', '0003_notification_groups'),
+        ('posts', '0003_postmedia_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read'], name='notif_recipient_unread_idx'),
+        ),
+    ]
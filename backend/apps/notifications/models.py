@@ -15,12 +15,26 @@ class Notification(models.Model):
     sender = models.ForeignKey(User, related_name='sent_notifications', on_delete=models.CASCADE)
     notification_type = models.CharField(max_length=10, choices=NOTIFICATION_TYPES)
     post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.CASCADE)
-    comment = models.ForeignKey(Comment, null=True, blank=True, on_delete=models.CASCADE)
+    comment = models.ForeignKey(Comment, null=True, blank=True, on_delete=models.SET_NULL)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Aggregation: one row per (recipient, type, post) and time window.
+    # ``sender`` is the latest actor; null group_key marks a single event.
+    group_key = models.CharField(max_length=64, null=True, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actor_ids = models.JSONField(default=list, blank=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-updated_at', '-id']
+        indexes = [
+            models.Index(fields=['recipient', '-updated_at', '-id'], name='notif_recipient_updated_idx'),
+            models.Index(fields=['recipient', 'is_read'], name='notif_recipient_unread_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['recipient', 'group_key'], name='unique_notification_group'),
+        ]
     
     def __str__(self):
         return f"Notification from {self.sender.username} to {self.recipient.username} - {self.notification_type}"
\ No newline at end of file
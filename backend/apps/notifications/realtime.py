@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django_redis import get_redis_connection
+import redis.asyncio as aioredis
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def channel(user_id):
+    return f'notifications:{user_id}'
+
+
+def notification_event(notification):
+    """Compact push payload; clients refetch the list for full data"""
+    return {
+        'id': notification.id,
+        'notification_type': notification.notification_type,
+        'post_id': notification.post_id,
+        'sender_id': notification.sender_id,
+        'actor_count': notification.actor_count,
+        'recent_actor_ids': notification.recent_actor_ids,
+        'is_read': notification.is_read,
+        'updated_at': notification.updated_at,
+    }
+
+
+def publish(messages):
+    """
+    Publish ``(user_id, event, data)`` messages to the users' channels in
+    one round trip. Delivery is best effort: only open streams receive
+    them, and clients catch up from the list endpoint when they reconnect.
+    """
+    try:
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        for user_id, event, data in messages:
+            pipe.publish(channel(user_id), json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Error publishing notification events: {e}")
+
+
+def publish_notifications(notifications):
+    publish([
+        (notification.recipient_id, 'notification', notification_event(notification))
+        for notification in notifications
+    ])
+
+
+_client = None
+
+
+def get_async_redis():
+    """Asyncio Redis client for the streams, sharing the cache's server"""
+    global _client
+    if _client is None:
+        cache = settings.CACHES['default']
+        _client = aioredis.from_url(
+            cache['LOCATION'],
+            password=cache['OPTIONS'].get('PASSWORD'),
+            socket_connect_timeout=cache['OPTIONS'].get('SOCKET_CONNECT_TIMEOUT'),
+        )
+    return _client
+
+
+def format_event(event, data, retry=None):
+    """Encode one server-sent event"""
+    lines = []
+    if retry is not None:
+        lines.append(f'retry: {retry}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {data if isinstance(data, str) else json.dumps(data, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def event_stream(user_id, unread_count):
+    """
+    Relay the user's channel as server-sent events.
+
+    The subscription is open before ``unread_count()`` is awaited, so no
+    event published after the initial count is missed. A comment line is
+    sent when the channel is idle to keep proxies from closing the
+    connection, and the stream ends after NOTIFICATION_STREAM_MAX_SECONDS;
+    EventSource clients reconnect on their own.
+    """
+    pubsub = get_async_redis().pubsub()
+    await pubsub.subscribe(channel(user_id))
+    try:
+        yield format_event(
+            'unread', {'unread_count': await unread_count()},
+            retry=settings.NOTIFICATION_STREAM_RETRY_MS
+        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.NOTIFICATION_STREAM_MAX_SECONDS
+        while loop.time() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.NOTIFICATION_STREAM_HEARTBEAT
+            )
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+            payload = json.loads(message['data'])
+            yield format_event(payload['event'], payload['data'])
+    finally:
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+        except Exception as e:
+            logger.error(f"Error closing notification stream for user {user_id}: {e}")
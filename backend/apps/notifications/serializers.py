@@ -1,22 +1,54 @@
 from rest_framework import serializers
 from .models import Notification
-from apps.accounts.serializers import UserSerializer
+from apps.accounts.models import User
+from apps.accounts.serializers import UserSerializer, prefetch_following
+from apps.core.viewer_state import ViewerStateListSerializer
 
 class NotificationSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
+    actors = serializers.SerializerMethodField()
     post_data = serializers.SerializerMethodField()
-    
+
     class Meta:
         model = Notification
-        fields = ['id', 'sender', 'notification_type', 'post_data', 
-                  'is_read', 'created_at']
-        read_only_fields = ['id', 'sender', 'created_at']
+        fields = ['id', 'sender', 'actors', 'actor_count', 'notification_type', 'post_data',
+                  'is_read', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'sender', 'actor_count', 'created_at', 'updated_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def prefetch_viewer_state(self, instances, context):
+        prefetch_following([notification.sender for notification in instances], context)
+        # Recent actors of the whole page in one query
+        actor_ids = {actor_id for notification in instances for actor_id in self.actor_ids(notification)}
+        context['notification_actors'] = User.objects.in_bulk(actor_ids)
+
+    @staticmethod
+    def actor_ids(obj):
+        return obj.recent_actor_ids or [obj.sender_id]
+
+    def get_actors(self, obj):
+        """Compact profiles of the most recent actors, newest first"""
+        actors = self.context.get('notification_actors')
+        if actors is None:
+            actors = User.objects.in_bulk(self.actor_ids(obj))
+        request = self.context.get('request')
+        result = []
+        for actor_id in self.actor_ids(obj):
+            actor = actors.get(actor_id)
+            if actor is None:
+                continue
+            picture = None
+            if actor.profile_picture:
+                picture = request.build_absolute_uri(actor.profile_picture.url) if request else actor.profile_picture.url
+            result.append({'id': actor.id, 'username': actor.username, 'profile_picture': picture})
+        return result
 
     def get_post_data(self, obj):
         if obj.post:
+            media = obj.post.media.all()
             return {
                 'id': obj.post.id,
                 'caption': obj.post.caption[:50] if obj.post.caption else '',
-                'thumbnail': obj.post.media.first().file.url if obj.post.media.exists() else None
+                'thumbnail': media[0].media_file.url if media else None
             }
-        return None
\ No newline at end of file
+        return None
@@ -1,36 +1,39 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from apps.posts.models import Like
 from apps.comments.models import Comment
 from apps.accounts.models import Follow
-from .models import Notification
+from .aggregation import notify
+
+# Groups are upserted after commit so their row locks are held briefly
 
 @receiver(post_save, sender=Like)
 def create_like_notification(sender, instance, created, **kwargs):
-    if created and instance.user != instance.post.user:
-        Notification.objects.create(
-            recipient=instance.post.user,
-            sender=instance.user,
+    if created and instance.user_id != instance.post.user_id:
+        transaction.on_commit(lambda: notify(
+            recipient_id=instance.post.user_id,
+            sender_id=instance.user_id,
             notification_type='like',
-            post=instance.post
-        )
+            post_id=instance.post_id
+        ))
 
 @receiver(post_save, sender=Comment)
 def create_comment_notification(sender, instance, created, **kwargs):
-    if created and instance.user != instance.post.user:
-        Notification.objects.create(
-            recipient=instance.post.user,
-            sender=instance.user,
+    if created and instance.user_id != instance.post.user_id:
+        transaction.on_commit(lambda: notify(
+            recipient_id=instance.post.user_id,
+            sender_id=instance.user_id,
             notification_type='comment',
-            post=instance.post,
-            comment=instance
-        )
+            post_id=instance.post_id,
+            comment_id=instance.id
+        ))
 
 @receiver(post_save, sender=Follow)
 def create_follow_notification(sender, instance, created, **kwargs):
     if created:
-        Notification.objects.create(
-            recipient=instance.following,
-            sender=instance.follower,
+        transaction.on_commit(lambda: notify(
+            recipient_id=instance.following_id,
+            sender_id=instance.follower_id,
             notification_type='follow'
-        )
\ No newline at end of file
+        ))
\ No newline at end of file
@@ -5,15 +5,16 @@ from .models import Notification
 
 @shared_task
 def cleanup_old_notifications():
-    """Delete read notifications older than 30 days"""
+    """Delete read notifications not updated for 30 days in batches"""
+    from apps.core.purge import chunked_purge
+
     threshold = timezone.now() - timedelta(days=30)
     old_notifications = Notification.objects.filter(
         is_read=True,
-        created_at__lte=threshold
+        updated_at__lte=threshold
     )
-    count = old_notifications.count()
-    old_notifications.delete()
-    return f'Deleted {count} old notifications'
+    result = chunked_purge(old_notifications, 'old_notifications')
+    return str(result)
 
 @shared_task
 def send_push_notification(notification_id):
@@ -28,10 +29,7 @@ def send_push_notification(notification_id):
 
 @shared_task
 def batch_create_notifications(notification_data_list):
-    """Create multiple notifications in batch"""
-    from .models import Notification
-    notifications = [
-        Notification(**data) for data in notification_data_list
-    ]
-    Notification.objects.bulk_create(notifications, ignore_conflicts=True)
-    return f'Created {len(notifications)} notifications'
\ No newline at end of file
+    """Fold a batch of notification events into their groups"""
+    from .aggregation import aggregate
+    notifications = aggregate(notification_data_list)
+    return f'Aggregated {len(notification_data_list)} events into {len(notifications)} notifications'
\ No newline at end of file
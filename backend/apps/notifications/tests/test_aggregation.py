@@ -0,0 +1,66 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from apps.notifications.aggregation import aggregate
+from apps.notifications.models import Notification
+from apps.posts.models import Like, Post
+
+User = get_user_model()
+
+class NotificationAggregationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.likers = [
+            User.objects.create_user(username=f'liker{index}', email=f'liker{index}@example.com', password='testpass123')
+            for index in range(5)
+        ]
+        self.post = Post.objects.create(user=self.owner, caption='Popular')
+
+    def like_events(self, likers):
+        return [{
+            'recipient_id': self.owner.id,
+            'sender_id': liker.id,
+            'notification_type': 'like',
+            'post_id': self.post.id,
+        } for liker in likers]
+
+    def test_likes_collapse_into_one_group(self):
+        """Test likes on a post within the window share one row"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for liker in self.likers:
+                Like.objects.create(user=liker, post=self.post)
+        
+        group = Notification.objects.get(recipient=self.owner)
+        self.assertEqual(group.actor_count, 5)
+        self.assertEqual(group.sender, self.likers[-1])
+        self.assertEqual(group.recent_actor_ids, [liker.id for liker in self.likers[::-1][:3]])
+
+    def test_repeat_actor_is_not_counted_twice(self):
+        """Test an actor already in the recent actors only moves to the front"""
+        aggregate(self.like_events(self.likers[:2]))
+        aggregate(self.like_events(self.likers[:1]))
+        
+        group = Notification.objects.get(recipient=self.owner)
+        self.assertEqual(group.actor_count, 2)
+        self.assertEqual(group.recent_actor_ids, [self.likers[0].id, self.likers[1].id])
+
+    def test_new_actor_reopens_read_group(self):
+        """Test a read group becomes unread when someone new joins it"""
+        aggregate(self.like_events(self.likers[:1]))
+        Notification.objects.update(is_read=True)
+        aggregate(self.like_events(self.likers[1:2]))
+        
+        self.assertFalse(Notification.objects.get(recipient=self.owner).is_read)
+
+    def test_list_serves_groups(self):
+        """Test the list endpoint returns groups with their recent actors"""
+        aggregate(self.like_events(self.likers))
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.get('/api/notifications/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        group = response.data['results'][0]
+        self.assertEqual(group['actor_count'], 5)
+        self.assertEqual([actor['username'] for actor in group['actors']], ['liker4', 'liker3', 'liker2'])
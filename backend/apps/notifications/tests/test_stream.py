@@ -0,0 +1,30 @@
+import json
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase
+from apps.notifications.realtime import event_stream, publish
+
+class NotificationStreamTestCase(SimpleTestCase):
+    async def test_stream_requires_token(self):
+        """Test the stream rejects requests without a valid access token"""
+        response = await self.async_client.get('/api/notifications/stream/', {'token': 'invalid'})
+        
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_relays_published_events(self):
+        """Test the stream starts with the unread count and relays the channel"""
+        async def unread_count():
+            return 3
+
+        stream = event_stream(987654, unread_count)
+        try:
+            first = await stream.__anext__()
+            self.assertIn('event: unread', first)
+            self.assertIn('"unread_count": 3', first)
+            
+            await sync_to_async(publish)([(987654, 'notification', {'id': 1, 'actor_count': 2})])
+            event = await stream.__anext__()
+            self.assertTrue(event.startswith('event: notification\n'))
+            data = json.loads(event.split('data: ', 1)[1])
+            self.assertEqual(data, {'id': 1, 'actor_count': 2})
+        finally:
+            await stream.aclose()
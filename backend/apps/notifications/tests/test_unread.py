@@ -0,0 +1,42 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from apps.notifications.aggregation import notify
+from apps.notifications.models import Notification
+from apps.notifications.unread import UnreadCounter
+
+User = get_user_model()
+
+class UnreadCounterTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='testpass123')
+        UnreadCounter.invalidate([self.alice.id])
+        self.client.force_authenticate(user=self.alice)
+
+    def tearDown(self):
+        UnreadCounter.invalidate([self.alice.id])
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread_count']
+
+    def test_counter_follows_new_and_read_notifications(self):
+        """Test the cached count is adjusted by new notifications and mark_read"""
+        self.assertEqual(self.unread_count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.alice.id, self.bob.id, 'follow')
+        self.assertEqual(self.unread_count(), 1)
+        
+        notification = Notification.objects.get(recipient=self.alice)
+        self.client.post(f'/api/notifications/{notification.id}/mark_read/')
+        self.client.post(f'/api/notifications/{notification.id}/mark_read/')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_missing_counter_is_recounted(self):
+        """Test a count that is not cached is read from the database"""
+        Notification.objects.create(recipient=self.alice, sender=self.bob, notification_type='mention')
+        
+        self.assertEqual(self.unread_count(), 1)
+        self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(self.unread_count(), 0)
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django_redis import get_redis_connection
+from .models import Notification
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Adjust a counter only while it is cached; a missing key is recounted on read
+ADJUST_IF_EXISTS_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value then
+    return nil
+end
+local updated = tonumber(value) + tonumber(ARGV[1])
+if updated < 0 then
+    updated = 0
+end
+redis.call('SET', KEYS[1], updated, 'KEEPTTL')
+return updated
+"""
+
+
+class UnreadCounter:
+    """
+    Unread notification count per user, cached in ``notifications:unread:{id}``.
+
+    Writers adjust the counter only when it is already cached, so it never
+    holds a partial count. A missing key is counted from the database on the
+    next read and cached for NOTIFICATION_UNREAD_TTL seconds; the TTL is not
+    extended by writes, so any drift is reconciled at least that often.
+    """
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def key(user_id):
+        return f'notifications:unread:{user_id}'
+
+    @classmethod
+    def _adjust(cls, user_ids, delta):
+        try:
+            pipe = cls._conn().pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.eval(ADJUST_IF_EXISTS_SCRIPT, 1, cls.key(user_id), delta)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error adjusting unread counters: {e}")
+            cls.invalidate(user_ids)
+
+    @classmethod
+    def incr(cls, user_ids):
+        """Count one new unread notification for each of ``user_ids``"""
+        cls._adjust(user_ids, 1)
+
+    @classmethod
+    def decr(cls, user_id):
+        cls._adjust([user_id], -1)
+
+    @classmethod
+    def reset(cls, user_id):
+        """The user has no unread notifications left"""
+        try:
+            cls._conn().set(cls.key(user_id), 0, ex=settings.NOTIFICATION_UNREAD_TTL)
+        except Exception as e:
+            logger.error(f"Error resetting unread counter for user {user_id}: {e}")
+
+    @classmethod
+    def invalidate(cls, user_ids):
+        """Drop cached counts so they are recounted on the next read"""
+        try:
+            keys = [cls.key(user_id) for user_id in user_ids]
+            if keys:
+                cls._conn().delete(*keys)
+        except Exception as e:
+            logger.error(f"Error invalidating unread counters: {e}")
+
+    @classmethod
+    def get(cls, user_id):
+        key = cls.key(user_id)
+        try:
+            value = cls._conn().get(key)
+            if value is not None:
+                return int(value)
+        except Exception as e:
+            logger.error(f"Error reading unread counter for user {user_id}: {e}")
+            return cls.count(user_id)
+
+        count = cls.count(user_id)
+        try:
+            # NX: a concurrent reader may have cached a count already
+            cls._conn().set(key, count, ex=settings.NOTIFICATION_UNREAD_TTL, nx=True)
+        except Exception as e:
+            logger.error(f"Error caching unread counter for user {user_id}: {e}")
+        return count
+
+    @staticmethod
+    def count(user_id):
+        return Notification.objects.filter(recipient_id=user_id, is_read=False).count()
@@ -1,34 +1,46 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from .models import Notification
+from .realtime import event_stream
 from .serializers import NotificationSerializer
+from .unread import UnreadCounter
+from apps.core.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    # Groups move to the top when a new actor joins them
+    ordering = ('-updated_at', '-id')
+
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
     
     def get_queryset(self):
         return Notification.objects.filter(
             recipient=self.request.user
-        ).select_related('sender', 'post').order_by('-created_at')
+        ).select_related('sender', 'post').prefetch_related('post__media')
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications"""
-        count = Notification.objects.filter(
-            recipient=request.user, 
-            is_read=False
-        ).count()
-        return Response({'unread_count': count})
+        return Response({'unread_count': UnreadCounter.get(request.user.id)})
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark a notification as read"""
         notification = self.get_object()
-        notification.is_read = True
-        notification.save(update_fields=['is_read'])
+        # Only the request that flips the flag decrements the counter
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+            UnreadCounter.decr(request.user.id)
         return Response({'message': 'Notification marked as read'})
 
     @action(detail=False, methods=['post'])
@@ -38,6 +50,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             recipient=request.user, 
             is_read=False
         ).update(is_read=True)
+        UnreadCounter.reset(request.user.id)
         
         return Response({'message': f'{updated} notifications marked as read'})
 
@@ -45,4 +58,44 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def clear_all(self, request):
         """Delete all notifications"""
         deleted = Notification.objects.filter(recipient=request.user).delete()
-        return Response({'message': f'{deleted[0]} notifications deleted'})
\ No newline at end of file
+        UnreadCounter.reset(request.user.id)
+        return Response({'message': f'{deleted[0]} notifications deleted'})
+
+
+def stream_user(request):
+    """
+    Authenticate a stream request by its access token, taken from the
+    Authorization header or, since EventSource cannot set headers, from
+    the ``token`` query parameter.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+@require_GET
+async def notification_stream(request):
+    """
+    Server-sent events for the user's notifications: an ``unread`` event
+    with the current count, then a ``notification`` event whenever one is
+    created or updated. Needs the ASGI server, which holds the idle
+    connection without tying up a worker thread.
+    """
+    user = await sync_to_async(stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+    response = StreamingHttpResponse(
+        event_stream(user.id, sync_to_async(lambda: UnreadCounter.get(user.id))),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,4 @@
+from apps.core.counter_buffer import CounterBuffer
+
+# Likes are buffered in Redis and flushed by apps.posts.tasks.flush_like_counters
+post_likes = CounterBuffer('post_likes', 'posts.Post', 'likes_count')
@@ -23,6 +23,9 @@ class PostDocument(Document):
             'refresh_interval': '5s',
         }
 
+    # Saves touching only these fields are sent as partial updates
+    partial_update_fields = ('likes_count', 'comments_count')
+
     class Django:
         model = Post
         fields = [
@@ -36,7 +39,9 @@ class PostDocument(Document):
         related_models = ['user']
 
     def get_queryset(self):
-        return super().get_queryset().filter(is_archived=False)
+        return super().get_queryset().filter(
+            is_archived=False
+        ).select_related('user').prefetch_related('media')
 
     def get_instances_from_related(self, related_instance):
         if isinstance(related_instance, self.django.model):
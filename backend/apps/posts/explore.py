@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django_redis import get_redis_connection
+from datetime import timedelta
+from apps.core.pagination import rank_after
+from .models import Post
+import math
+
+
+class ExplorePool:
+    """
+    Precomputed explore candidates.
+
+    ``refresh`` ranks recent posts by engagement into the sorted set
+    ``explore_pool`` with a companion hash of post id -> author id. Every
+    viewer reads the whole pool and filters it against the accounts they
+    follow, so the cost of a request is bounded by the pool size rather
+    than the posts table.
+
+    Scores decay against a fixed epoch rather than the refresh time, so a
+    post keeps its score across refreshes unless its engagement changes and
+    cursors taken before a refresh stay valid after it.
+    """
+    READ_CHUNK = 200
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def key():
+        return 'explore_pool'
+
+    @staticmethod
+    def authors_key():
+        return 'explore_pool:authors'
+
+    @staticmethod
+    def score(likes_count, comments_count, created_at):
+        """
+        Log-scaled engagement plus age, as in Reddit's hot ranking: a post
+        needs ten times the engagement to rank level with one that is
+        ``EXPLORE_SCORE_DECAY_SECONDS`` newer.
+        """
+        engagement = math.log10(likes_count + 2 * comments_count + 1)
+        return engagement + created_at.timestamp() / settings.EXPLORE_SCORE_DECAY_SECONDS
+
+    @classmethod
+    def refresh(cls):
+        """Rebuild the pool from recent, high-engagement posts"""
+        now = timezone.now()
+        candidates = Post.objects.filter(
+            is_archived=False,
+            created_at__gte=now - timedelta(days=settings.EXPLORE_POOL_DAYS)
+        ).annotate(
+            engagement=F('likes_count') + F('comments_count') * 2
+        ).order_by('-engagement', '-id').values_list(
+            'id', 'user_id', 'likes_count', 'comments_count', 'created_at'
+        )[:settings.EXPLORE_POOL_SIZE * 2]
+
+        ranked = sorted(
+            (
+                (cls.score(likes, comments, created_at), post_id, author_id)
+                for post_id, author_id, likes, comments, created_at in candidates
+            ),
+            reverse=True
+        )[:settings.EXPLORE_POOL_SIZE]
+
+        pipe = cls._conn().pipeline(transaction=True)
+        staging, staging_authors = f'{cls.key()}:staging', f'{cls.authors_key()}:staging'
+        pipe.delete(staging, staging_authors)
+        if ranked:
+            pipe.zadd(staging, {post_id: score for score, post_id, _ in ranked})
+            pipe.hset(staging_authors, mapping={post_id: author_id for _, post_id, author_id in ranked})
+            pipe.rename(staging, cls.key())
+            pipe.rename(staging_authors, cls.authors_key())
+        else:
+            pipe.delete(cls.key(), cls.authors_key())
+        pipe.execute()
+        return len(ranked)
+
+    @classmethod
+    def exists(cls):
+        return bool(cls._conn().exists(cls.key()))
+
+    @classmethod
+    def get_entries(cls, excluded_author_ids, position=None, limit=20):
+        """
+        Return ``(post_id, score)`` pairs from the pool, skipping posts by
+        excluded authors, ranked after ``position``.
+        """
+        conn = cls._conn()
+        if position is not None:
+            position = (float(position[0]), int(position[1]))
+        max_score = '+inf' if position is None else position[0]
+
+        results = []
+        offset = 0
+        while len(results) < limit:
+            rows = conn.zrevrangebyscore(
+                cls.key(), max_score, '-inf',
+                start=offset, num=cls.READ_CHUNK, withscores=True
+            )
+            if not rows:
+                break
+            offset += len(rows)
+            authors = conn.hmget(cls.authors_key(), [member for member, _ in rows])
+            for (member, score), author_id in zip(rows, authors):
+                if author_id is not None and int(author_id) not in excluded_author_ids:
+                    results.append((int(member), score))
+            results = rank_after(results, position, len(results))
+        return results[:limit]
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+from django.utils.dateparse import parse_datetime
+from apps.core.cache_utils import CacheManager
+from apps.core.viewer_state import ViewerState
+from .counters import post_likes
+from .models import Post
+from .serializers import PostSerializer
+from .viewer_state import prefetch_page_state
+import logging
+
+logger = logging.getLogger(__name__)
+
+VIEWER_FIELDS = ('is_liked', 'is_saved')
+
+
+def render_fragments(posts, request):
+    """Serialize posts without any viewer-specific fields"""
+    context = {'request': request, 'viewer_independent': True}
+    fragments = {}
+    for data in PostSerializer(posts, many=True, context=context).data:
+        data = dict(data)
+        for field in VIEWER_FIELDS:
+            data.pop(field, None)
+        data['user'] = dict(data['user'])
+        data['user'].pop('is_following', None)
+        fragments[data['id']] = data
+    return fragments
+
+
+def hydrate_posts(post_ids, request):
+    """
+    Assemble serialized posts for the given ids, in the given order.
+
+    Viewer-independent fragments are read from ``post:{id}`` with one MGET;
+    only the misses are loaded from the database, in one query, and written
+    back. A post that is already being loaded by another request is waited
+    for rather than loaded again. Viewer flags, author follow state and
+    buffered like deltas are then overlaid for the whole page. Missing or
+    archived posts are skipped.
+    """
+    post_ids = list(dict.fromkeys(post_ids))
+    if not post_ids:
+        return []
+
+    def load(ids):
+        posts = Post.objects.filter(
+            id__in=ids,
+            is_archived=False
+        ).select_related('user').prefetch_related('media')
+        return render_fragments(posts, request)
+
+    try:
+        fragments = CacheManager.read_post_details(post_ids, load)
+    except Exception as e:
+        logger.error(f"Cache error: {e}")
+        fragments = load(post_ids)
+
+    ordered = [fragments[post_id] for post_id in post_ids if post_id in fragments]
+    return overlay_viewer_state(ordered, request)
+
+
+def overlay_viewer_state(fragments, request):
+    """Add the requesting user's flags and live like counts to fragments"""
+    posts = [
+        SimpleNamespace(id=data['id'], created_at=parse_datetime(data['created_at']))
+        for data in fragments
+    ]
+    state = ViewerState()
+    if posts:
+        prefetch_page_state(posts, (data['user']['id'] for data in fragments), request.user, state)
+    pending = post_likes.pending(post.id for post in posts)
+
+    results = []
+    for data in fragments:
+        post_id = data['id']
+        item = dict(data)
+        item['user'] = dict(data['user'], is_following=bool(
+            state.lookup('following_users', data['user']['id'])
+        ))
+        item['likes_count'] = max(0, data['likes_count'] + pending.get(post_id, 0))
+        item['is_liked'] = bool(state.lookup('liked_posts', post_id))
+        item['is_saved'] = bool(state.lookup('saved_posts', post_id))
+        results.append(item)
+    return results
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_like_like_post_created_idx_post_post_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postmedia',
+            name='placeholder',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='renditions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -14,6 +14,9 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+        ]
     
     def __str__(self):
         return f"Post by {self.user.username} at {self.created_at}"
@@ -27,6 +30,8 @@ class PostMedia(models.Model):
     post = models.ForeignKey(Post, related_name='media', on_delete=models.CASCADE)
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPES)
     media_file = models.FileField(upload_to='posts/')
+    renditions = models.JSONField(default=list, blank=True)
+    placeholder = models.CharField(max_length=64, blank=True)
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -40,6 +45,9 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='like_post_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} likes Post {self.post.id}"
@@ -52,6 +60,9 @@ class SavedPost(models.Model):
     class Meta:
         unique_together = ('user', 'post')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='saved_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} saved Post {self.post.id}"
\ No newline at end of file
@@ -1,9 +1,9 @@
-from elasticsearch_dsl import Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.core.pagination import SearchAfterPagination
 from .documents import PostDocument
-from .serializers import PostSerializer
+from .hydration import hydrate_posts
 
 class PostSearchView(APIView):
     permission_classes = [IsAuthenticated]
@@ -14,24 +14,22 @@ class PostSearchView(APIView):
         if not query:
             return Response({'results': []})
         
-        # Search in caption and location
+        # Search in caption and location; only the ids are needed back
         search = PostDocument.search().query(
             'multi_match',
             query=query,
             fields=['caption^2', 'location', 'user.username'],
             fuzziness='AUTO'
-        )
+        ).source(False)
         
-        # Execute search
-        response = search.execute()
+        # Execute one page of the search
+        paginator = SearchAfterPagination()
+        response = paginator.paginate_search(search, request)
         
-        # Get actual Post objects
-        post_ids = [hit.meta.id for hit in response]
-        from .models import Post
-        posts = Post.objects.filter(id__in=post_ids)
+        # Assemble posts in relevance order from the post fragment cache
+        post_ids = [int(hit.meta.id) for hit in response]
         
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response({
-            'count': response.hits.total.value,
-            'results': serializer.data
-        })
\ No newline at end of file
+        return paginator.get_paginated_response(
+            hydrate_posts(post_ids, request),
+            response.hits.total.value
+        )
@@ -1,14 +1,24 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Post, PostMedia, Like, SavedPost
-from apps.accounts.serializers import UserSerializer
+from apps.accounts.serializers import UserSerializer, prefetch_following
+from apps.core.media import rendition_urls
+from apps.core.uploads import claim_uploads
+from apps.core.viewer_state import (
+    ViewerStateListSerializer, get_viewer, get_viewer_state, viewer_flag
+)
+from .counters import post_likes
+from .viewer_state import prefetch_post_flags
 
 class PostMediaSerializer(serializers.ModelSerializer):
     media_file = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = PostMedia
-        fields = ['id', 'media_type', 'media_file', 'order', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'media_type', 'media_file', 'renditions', 'placeholder', 
+                  'order', 'created_at']
+        read_only_fields = ['id', 'placeholder', 'created_at']
 
     def get_media_file(self, obj):
         if obj.media_file:
@@ -18,6 +28,9 @@ class PostMediaSerializer(serializers.ModelSerializer):
             return obj.media_file.url
         return None
 
+    def get_renditions(self, obj):
+        return rendition_urls(obj.renditions, self.context.get('request'))
+
 class PostSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     media = PostMediaSerializer(many=True, read_only=True)
@@ -31,18 +44,40 @@ class PostSerializer(serializers.ModelSerializer):
                   'media', 'is_liked', 'is_saved', 'created_at', 'updated_at']
         read_only_fields = ['id', 'likes_count', 'comments_count', 
                             'created_at', 'updated_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def prefetch_viewer_state(self, instances, context):
+        """Resolve is_liked and is_saved for a page of posts in one query each"""
+        prefetch_post_flags(instances, get_viewer(context), get_viewer_state(context))
+        prefetch_following([post.user for post in instances], context)
+        context.setdefault('pending_likes', {}).update(
+            post_likes.pending(post.id for post in instances)
+        )
+
+    def to_representation(self, instance):
+        """Overlay like deltas that are still buffered in Redis"""
+        data = super().to_representation(instance)
+        if self.context.get('viewer_independent'):
+            return data
+        pending = self.context.get('pending_likes', {})
+        if instance.id in pending:
+            delta = pending[instance.id]
+        else:
+            delta = post_likes.pending([instance.id])[instance.id]
+        data['likes_count'] = max(0, data['likes_count'] + delta)
+        return data
 
     def get_is_liked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Like.objects.filter(user=request.user, post=obj).exists()
-        return False
+        return viewer_flag(
+            self.context, 'liked_posts', obj.id,
+            lambda: Like.objects.filter(user=self.context['request'].user, post=obj).exists()
+        )
 
     def get_is_saved(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return SavedPost.objects.filter(user=request.user, post=obj).exists()
-        return False
+        return viewer_flag(
+            self.context, 'saved_posts', obj.id,
+            lambda: SavedPost.objects.filter(user=self.context['request'].user, post=obj).exists()
+        )
     
 class PostCreateSerializer(serializers.ModelSerializer):
     media_files = serializers.ListField(
@@ -52,11 +87,14 @@ class PostCreateSerializer(serializers.ModelSerializer):
         child=serializers.ChoiceField(choices=PostMedia.MEDIA_TYPES), 
         write_only=True, required=False
     )
+    upload_ids = serializers.ListField(
+        child=serializers.UUIDField(), write_only=True, required=False
+    )
 
     class Meta:
         model = Post
         fields = ['id', 'caption', 'location', 'comments_disabled', 
-                  'media_files', 'media_types', 'created_at', 'updated_at']
+                  'media_files', 'media_types', 'upload_ids', 'created_at', 'updated_at']
 
     def validate(self, data):
         media_files = data.get('media_files', [])
@@ -64,7 +102,7 @@ class PostCreateSerializer(serializers.ModelSerializer):
         if len(media_files) != len(media_types):
             raise serializers.ValidationError( "Number of media files must match number of media types" )
         
-        if(len(media_files) > 10):
+        if(len(media_files) + len(data.get('upload_ids', [])) > 10):
             raise serializers.ValidationError("Maximum 10 media files allowed per post")
         
         return data
@@ -72,15 +110,24 @@ class PostCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         media_files = validated_data.pop('media_files', [])
         media_types = validated_data.pop('media_types', [])
-        post = Post.objects.create(**validated_data)
-
-        for index, (file, media_type) in enumerate(zip(media_files, media_types)):
-            PostMedia.objects.create(
-                post=post,
-                media_type=media_type,
-                media_file=file,
-                order=index
-            )
+        upload_ids = validated_data.pop('upload_ids', [])
+
+        with transaction.atomic():
+            post = Post.objects.create(**validated_data)
+
+            media = [(file, media_type) for file, media_type in zip(media_files, media_types)]
+            # Completed chunked uploads are already in media storage
+            media += [
+                (upload.file.name, upload.media_type)
+                for upload in claim_uploads(post.user, upload_ids)
+            ]
+            for index, (file, media_type) in enumerate(media):
+                PostMedia.objects.create(
+                    post=post,
+                    media_type=media_type,
+                    media_file=file,
+                    order=index
+                )
         return post
     
 class LikeSerializer(serializers.ModelSerializer):
@@ -89,4 +136,8 @@ class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
         fields = ['id', 'user', 'post', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'created_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def prefetch_viewer_state(self, instances, context):
+        prefetch_following([like.user for like in instances], context)
\ No newline at end of file
@@ -1,65 +1,181 @@
 from celery import shared_task
-from django.core.cache import cache
-from django.db.models import Count, Q
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 from .models import Post
 
+FANOUT_BATCH_SIZE = 1000
+
 @shared_task
 def update_trending_posts():
-    """Update trending posts based on engagement"""
-    time_threshold = timezone.now() - timedelta(hours=24)
-    
-    trending_posts = Post.objects.filter(
+    """Merge the engagement buckets and cache the current trending posts"""
+    from apps.core.cache_utils import CacheManager
+    from .trending import TrendingEngine
+
+    TrendingEngine.merge()
+
+    # Over-fetch so that archived and out-of-window posts can be dropped
+    candidates = TrendingEngine.top(settings.TRENDING_POSTS_LIMIT * 4)
+    time_threshold = timezone.now() - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    eligible = set(Post.objects.filter(
+        id__in=candidates,
         created_at__gte=time_threshold,
         is_archived=False
-    ).annotate(
-        engagement_score=Count('likes') + Count('comments') * 2
-    ).order_by('-engagement_score')[:50]
+    ).values_list('id', flat=True))
     
-    trending_ids = list(trending_posts.values_list('id', flat=True))
-    cache.set('trending_posts', trending_ids, timeout=1800)  # 30 minutes
+    trending_ids = [post_id for post_id in candidates if post_id in eligible]
+    trending_ids = trending_ids[:settings.TRENDING_POSTS_LIMIT]
+    CacheManager.set_trending_posts(trending_ids, timeout=settings.TRENDING_CACHE_TIMEOUT)
     
     return f'Updated {len(trending_ids)} trending posts'
 
+@shared_task
+def refresh_explore_pool():
+    """Rebuild the explore candidate pool"""
+    from .explore import ExplorePool
+
+    count = ExplorePool.refresh()
+    return f'Refreshed explore pool with {count} posts'
+
+@shared_task
+def flush_like_counters():
+    """Apply buffered like/unlike deltas to Post.likes_count"""
+    from apps.core.cache_utils import CacheManager
+    from apps.core.search_indexing import IndexQueue
+    from .counters import post_likes
+
+    post_ids = post_likes.flush()
+    CacheManager.invalidate_post_details(post_ids)
+    IndexQueue.mark(Post, post_ids, partial=True)
+    return f'Flushed like counters for {len(post_ids)} posts'
+
 @shared_task
 def process_post_media(post_id):
-    """Process uploaded media (compress, generate thumbnails, etc.)"""
-    from .models import Post, PostMedia
-    try:
-        post = Post.objects.get(id=post_id)
-        media_items = post.media.all()
-        
-        for media in media_items:
-            # Add your processing logic here
-            # Example: compress images, generate thumbnails
-            pass
-        
-        return f'Processed media for post {post_id}'
-    except Post.DoesNotExist:
-        return f'Post {post_id} not found'
+    """Generate resized renditions and a placeholder for a post's images"""
+    from apps.core.cache_utils import CacheManager
+    from apps.core.media import render_images, save_renditions
+    from .models import PostMedia
+
+    media_items = {
+        media.id: media
+        for media in PostMedia.objects.filter(post_id=post_id, media_type='image')
+    }
+    if not media_items:
+        return f'No images to process for post {post_id}'
+
+    sources = {}
+    for media_id, media in media_items.items():
+        with media.media_file.open('rb') as f:
+            sources[media_id] = f.read()
+
+    # Decoding and encoding are CPU bound and run in the media process pool
+    for media_id, result in render_images(sources).items():
+        media = media_items[media_id]
+        PostMedia.objects.filter(pk=media_id).update(
+            renditions=save_renditions(media.media_file, result),
+            placeholder=result['placeholder']
+        )
+
+    CacheManager.invalidate_post_details([post_id])
+    return f'Processed media for post {post_id}'
 
 @shared_task
 def generate_feed_for_user(user_id):
-    """Pre-generate feed for user and cache it"""
+    """Rebuild a user's materialized timeline from the database"""
     from apps.accounts.models import Follow
     from django.contrib.auth import get_user_model
+    from .timeline import TimelineStore
     
     User = get_user_model()
     try:
         user = User.objects.get(id=user_id)
-        following_users = Follow.objects.filter(
-            follower=user
-        ).values_list('following', flat=True)
-        
-        feed_posts = Post.objects.filter(
-            Q(user__in=following_users) | Q(user=user),
-            is_archived=False
-        ).select_related('user').prefetch_related('media').order_by('-created_at')[:100]
-        
-        feed_ids = list(feed_posts.values_list('id', flat=True))
-        cache.set(f'user_feed:{user_id}', feed_ids, timeout=600)  # 10 minutes
-        
-        return f'Generated feed for user {user_id}'
     except User.DoesNotExist:
-        return f'User {user_id} not found'
\ No newline at end of file
+        return f'User {user_id} not found'
+
+    following = Follow.objects.filter(follower=user).values_list(
+        'following_id', 'following__followers_count'
+    )
+
+    push_authors = [user.id]
+    pull_authors = []
+    for author_id, follower_total in following:
+        if TimelineStore.is_pull_author(follower_total):
+            pull_authors.append(author_id)
+        else:
+            push_authors.append(author_id)
+
+    feed_posts = Post.objects.filter(
+        user__in=push_authors,
+        is_archived=False
+    ).order_by('-created_at').values_list('id', 'created_at')[:settings.FEED_TIMELINE_SIZE]
+
+    entries = [(post_id, created_at.timestamp()) for post_id, created_at in feed_posts]
+    TimelineStore.rebuild(user.id, entries, pull_authors)
+
+    for author_id in pull_authors:
+        author_posts = Post.objects.filter(
+            user_id=author_id,
+            is_archived=False
+        ).order_by('-created_at').values_list('id', 'created_at')[:settings.FEED_TIMELINE_SIZE]
+        TimelineStore.warm_author(
+            author_id,
+            [(post_id, created_at.timestamp()) for post_id, created_at in author_posts]
+        )
+
+    return f'Generated feed for user {user_id}'
+
+@shared_task
+def fan_out_post(post_id):
+    """Push a new post into the timelines of its author's followers"""
+    from apps.accounts.models import Follow
+    from .timeline import TimelineStore
+
+    try:
+        post = Post.objects.select_related('user').get(id=post_id, is_archived=False)
+    except Post.DoesNotExist:
+        return f'Post {post_id} not found'
+
+    TimelineStore.add_author_post(post)
+    TimelineStore.push([post.user_id], post)
+
+    followers = Follow.objects.filter(following_id=post.user_id)
+    follower_count = post.user.followers_count
+    if TimelineStore.is_pull_author(follower_count):
+        return f'Post {post_id} left for pull reads ({follower_count} followers)'
+
+    follower_ids = followers.values_list('follower_id', flat=True).iterator(
+        chunk_size=FANOUT_BATCH_SIZE
+    )
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(follower_id)
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineStore.push(batch, post)
+            batch = []
+    if batch:
+        TimelineStore.push(batch, post)
+
+    return f'Fanned out post {post_id} to {follower_count} followers'
+
+@shared_task
+def remove_post_from_timelines(post_id, author_id):
+    """Remove a deleted or archived post from every timeline it was pushed to"""
+    from apps.accounts.models import Follow
+    from .timeline import TimelineStore
+
+    TimelineStore.remove_author_post(author_id, post_id)
+    TimelineStore.remove([author_id], post_id)
+
+    follower_ids = Follow.objects.filter(following_id=author_id).values_list(
+        'follower_id', flat=True
+    ).iterator(chunk_size=FANOUT_BATCH_SIZE)
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(follower_id)
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineStore.remove(batch, post_id)
+            batch = []
+    if batch:
+        TimelineStore.remove(batch, post_id)
+
+    return f'Removed post {post_id} from timelines'
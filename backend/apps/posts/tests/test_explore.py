@@ -0,0 +1,72 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from apps.posts.explore import ExplorePool
+from apps.posts.models import Post
+
+User = get_user_model()
+
+class ExplorePoolTestCase(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username='viewer', email='viewer@example.com', password='testpass123')
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='testpass123')
+        self.followed = User.objects.create_user(username='followed', email='followed@example.com', password='testpass123')
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        ExplorePool._conn().delete(ExplorePool.key(), ExplorePool.authors_key())
+
+    def post_ids(self, entries):
+        return [post_id for post_id, score in entries]
+
+    def test_refresh_ranks_by_engagement(self):
+        """Test every viewer reads the whole pool, best posts first"""
+        quiet = Post.objects.create(user=self.author, caption='Quiet')
+        popular = Post.objects.create(user=self.author, caption='Popular', likes_count=50)
+        Post.objects.create(user=self.author, caption='Archived', likes_count=90, is_archived=True)
+        
+        self.assertEqual(ExplorePool.refresh(), 2)
+        self.assertTrue(ExplorePool.exists())
+        self.assertEqual(self.post_ids(ExplorePool.get_entries(set())), [popular.id, quiet.id])
+
+    def test_get_entries_skips_excluded_authors(self):
+        """Test posts by followed accounts are filtered out"""
+        post = Post.objects.create(user=self.author, caption='New')
+        Post.objects.create(user=self.followed, caption='Followed', likes_count=10)
+        ExplorePool.refresh()
+        
+        entries = ExplorePool.get_entries({self.viewer.id, self.followed.id})
+        self.assertEqual(self.post_ids(entries), [post.id])
+
+    def test_get_entries_pages_after_position(self):
+        """Test a position continues the ranking without repeats"""
+        posts = [Post.objects.create(user=self.author, caption=str(n), likes_count=n) for n in range(5)]
+        ExplorePool.refresh()
+        
+        first = ExplorePool.get_entries(set(), limit=2)
+        post_id, score = first[-1]
+        rest = ExplorePool.get_entries(set(), position=(score, post_id), limit=10)
+        self.assertEqual(self.post_ids(first + rest), [post.id for post in reversed(posts)])
+
+    def test_cursor_survives_refresh(self):
+        """Test a refresh keeps unchanged scores, so open cursors stay valid"""
+        for n in range(4):
+            Post.objects.create(user=self.author, caption=str(n), likes_count=n)
+        ExplorePool.refresh()
+        first = ExplorePool.get_entries(set(), limit=2)
+        before = ExplorePool.get_entries(set(), position=(first[-1][1], first[-1][0]))
+        
+        ExplorePool.refresh()
+        after = ExplorePool.get_entries(set(), position=(first[-1][1], first[-1][0]))
+        self.assertEqual(after, before)
+
+    @override_settings(EXPLORE_SCORE_DECAY_SECONDS=45000)
+    def test_score_ignores_refresh_time(self):
+        """Test newer posts need less engagement to rank level"""
+        now = timezone.now()
+        older = now - timedelta(seconds=45000)
+        self.assertAlmostEqual(ExplorePool.score(9, 0, older), ExplorePool.score(0, 0, now))
@@ -0,0 +1,54 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.posts.models import Post
+from apps.posts.timeline import TimelineStore
+
+User = get_user_model()
+
+class TimelineStoreTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='testpass123')
+        TimelineStore.invalidate(self.user.id)
+        TimelineStore._conn().delete(TimelineStore.author_key(self.author.id))
+
+    def tearDown(self):
+        TimelineStore.invalidate(self.user.id)
+        TimelineStore._conn().delete(TimelineStore.author_key(self.author.id))
+
+    def post_ids(self, user_id):
+        return [post_id for post_id, score in TimelineStore.get_entries(user_id)]
+
+    def test_push_skips_timelines_that_are_not_built(self):
+        """Test a push never creates a partial timeline"""
+        post = Post.objects.create(user=self.author, caption='New')
+        TimelineStore.push([self.user.id], post)
+        
+        self.assertFalse(TimelineStore.exists(self.user.id))
+
+    def test_push_adds_to_built_timeline(self):
+        """Test pushed posts appear newest first after a rebuild"""
+        old = Post.objects.create(user=self.author, caption='Old')
+        TimelineStore.rebuild(self.user.id, [(old.id, TimelineStore.score(old))], [])
+        new = Post.objects.create(user=self.author, caption='New')
+        TimelineStore.push([self.user.id], new)
+        
+        self.assertEqual(self.post_ids(self.user.id), [new.id, old.id])
+
+    def test_empty_rebuild_keeps_timeline(self):
+        """Test a user following nobody still has a built, empty timeline"""
+        TimelineStore.rebuild(self.user.id, [], [])
+        
+        self.assertTrue(TimelineStore.exists(self.user.id))
+        self.assertEqual(self.post_ids(self.user.id), [])
+
+    def test_author_posts_are_seeded_before_appending(self):
+        """Test a new post does not stand in for an unseeded author timeline"""
+        old = Post.objects.create(user=self.author, caption='Old')
+        new = Post.objects.create(user=self.author, caption='New')
+        TimelineStore.add_author_post(new)
+        TimelineStore.warm_author(self.author.id, [(old.id, TimelineStore.score(old))])
+        TimelineStore.add_author_post(new)
+        TimelineStore.rebuild(self.user.id, [], [self.author.id])
+        
+        self.assertEqual(self.post_ids(self.user.id), [new.id, old.id])
@@ -0,0 +1,68 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from apps.posts.models import Like, Post
+from apps.posts.viewer_state import RecentLikes
+
+User = get_user_model()
+
+class RecentLikesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='testpass123')
+        self.post = Post.objects.create(user=self.author, caption='Recent')
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        RecentLikes._conn().delete(RecentLikes.key(self.user.id), RecentLikes.since_key(self.user.id))
+
+    def test_resolve_answers_recent_posts_from_redis(self):
+        """Test a recent liked post resolves from the loaded set"""
+        Like.objects.create(user=self.user, post=self.post)
+        
+        resolved, liked = RecentLikes.resolve(self.user.id, [self.post])
+        
+        self.assertEqual(resolved, {self.post.id})
+        self.assertEqual(liked, {self.post.id})
+
+    def test_like_before_load_survives_load(self):
+        """Test a like written before the set is built is kept by the load"""
+        RecentLikes.add(self.user.id, self.post.id)
+        
+        RecentLikes.load(self.user.id)
+        
+        self.assertTrue(RecentLikes._conn().sismember(RecentLikes.key(self.user.id), self.post.id))
+
+    def test_evicted_set_is_rebuilt(self):
+        """Test a set evicted under its window marker is rebuilt, not trusted"""
+        RecentLikes.load(self.user.id)
+        RecentLikes._conn().delete(RecentLikes.key(self.user.id))
+        Like.objects.create(user=self.user, post=self.post)
+        
+        resolved, liked = RecentLikes.resolve(self.user.id, [self.post])
+        
+        self.assertEqual(liked, {self.post.id})
+        self.assertTrue(RecentLikes._conn().sismember(RecentLikes.key(self.user.id), 0))
+
+    def test_partial_set_is_not_trusted(self):
+        """Test a set holding only live likes is completed before use"""
+        other = Post.objects.create(user=self.author, caption='Other')
+        Like.objects.create(user=self.user, post=other)
+        RecentLikes._conn().set(RecentLikes.since_key(self.user.id), 0)
+        RecentLikes.add(self.user.id, self.post.id)
+        
+        resolved, liked = RecentLikes.resolve(self.user.id, [self.post, other])
+        
+        self.assertEqual(liked, {self.post.id, other.id})
+
+    def test_remove_drops_like(self):
+        """Test an unlike is removed from the set"""
+        Like.objects.create(user=self.user, post=self.post)
+        RecentLikes.load(self.user.id)
+        
+        RecentLikes.remove(self.user.id, self.post.id)
+        resolved, liked = RecentLikes.resolve(self.user.id, [self.post])
+        
+        self.assertEqual(liked, set())
@@ -41,4 +41,58 @@ class PostAPITestCase(TestCase):
         post = Post.objects.create(user=self.user, caption='Test')
         self.client.post(f'/api/posts/{post.id}/like/')
         response = self.client.post(f'/api/posts/{post.id}/unlike/')
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_feed_includes_followed_posts(self):
+        """Test that the feed is built from the materialized timeline"""
+        from apps.accounts.models import Follow
+        from apps.posts.timeline import TimelineStore
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='testpass123'
+        )
+        Follow.objects.create(follower=self.user, following=author)
+        TimelineStore.invalidate(self.user.id)
+        post = Post.objects.create(user=author, caption='Followed post')
+        response = self.client.get('/api/posts/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(post.id, [item['id'] for item in response.data['results']])
+    
+    def test_retrieve_overlays_viewer_state(self):
+        """Test that cached post fragments get the viewer's flags and live counts"""
+        post = Post.objects.create(user=self.user, caption='Test')
+        self.client.get(f'/api/posts/{post.id}/')
+        self.client.post(f'/api/posts/{post.id}/like/')
+        response = self.client.get(f'/api/posts/{post.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_liked'])
+        self.assertEqual(response.data['likes_count'], 1)
+    
+    def test_cached_post_overlay_is_one_query(self):
+        """Test a cached post gets all viewer flags from a single query"""
+        post = Post.objects.create(user=self.user, caption='Test')
+        self.client.get(f'/api/posts/{post.id}/')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/posts/{post.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_saved'])
+    
+    def test_trending_posts(self):
+        """Test that liked posts show up in trending"""
+        from apps.posts.tasks import update_trending_posts
+        post = Post.objects.create(user=self.user, caption='Test')
+        self.client.post(f'/api/posts/{post.id}/like/')
+        update_trending_posts()
+        response = self.client.get('/api/posts/trending/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(post.id, [item['id'] for item in response.data['results']])
+    
+    def test_unarchive_hides_other_users_posts(self):
+        """Test unarchiving another user's post is not found"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        post = Post.objects.create(user=other, caption='Archived', is_archived=True)
+        response = self.client.post(f'/api/posts/{post.id}/unarchive/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        post.refresh_from_db()
+        self.assertTrue(post.is_archived)
@@ -0,0 +1,174 @@
+from django.conf import settings
+from django_redis import get_redis_connection
+from apps.core.pagination import rank_after
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Add a post to a timeline only while it is cached; a missing timeline is
+# rebuilt from the database on the next read, which already includes the post
+ZADD_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -tonumber(ARGV[3]) - 1)
+if tonumber(ARGV[4]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return 1
+"""
+
+
+class TimelineStore:
+    """
+    Materialized per-user home timelines kept in Redis.
+
+    Every user has a capped sorted set ``timeline:{user_id}`` of post ids
+    scored by the post's creation timestamp. Posts are pushed into it by the
+    fan-out task when they are created, but only while it exists; a missing
+    timeline is rebuilt from the database on the next feed read. Authors with more followers than
+    ``FEED_FANOUT_FOLLOWER_LIMIT`` are not fanned out; their posts are pulled
+    at read time from ``author_posts:{author_id}``, and each reader keeps the
+    set of such authors it follows in ``timeline_pull:{user_id}``.
+    """
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def timeline_key(user_id):
+        return f'timeline:{user_id}'
+
+    @staticmethod
+    def author_key(author_id):
+        return f'author_posts:{author_id}'
+
+    @staticmethod
+    def pull_key(user_id):
+        return f'timeline_pull:{user_id}'
+
+    @staticmethod
+    def score(post):
+        return post.created_at.timestamp()
+
+    @staticmethod
+    def is_pull_author(follower_count):
+        """Authors above the limit are read on demand instead of fanned out"""
+        return follower_count > settings.FEED_FANOUT_FOLLOWER_LIMIT
+
+    @classmethod
+    def exists(cls, user_id):
+        return bool(cls._conn().exists(cls.timeline_key(user_id)))
+
+    @classmethod
+    def push(cls, user_ids, post):
+        """Push a post into the timelines of the given users that are built"""
+        size = settings.FEED_TIMELINE_SIZE
+        score = cls.score(post)
+        pipe = cls._conn().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.eval(
+                ZADD_IF_EXISTS_SCRIPT, 1, cls.timeline_key(user_id),
+                score, post.id, size, settings.FEED_TIMELINE_TTL
+            )
+        pipe.execute()
+
+    @classmethod
+    def remove(cls, user_ids, post_id):
+        """Remove a post from the timelines of the given users"""
+        pipe = cls._conn().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.zrem(cls.timeline_key(user_id), post_id)
+        pipe.execute()
+
+    @classmethod
+    def add_author_post(cls, post):
+        """
+        Record a post in its author's own timeline, used for pull reads.
+        A timeline that is not seeded yet is left to ``warm_author``.
+        """
+        cls._conn().eval(
+            ZADD_IF_EXISTS_SCRIPT, 1, cls.author_key(post.user_id),
+            cls.score(post), post.id, settings.FEED_TIMELINE_SIZE, 0
+        )
+
+    @classmethod
+    def warm_author(cls, author_id, entries):
+        """Seed an author's post timeline if it is not in Redis yet"""
+        conn = cls._conn()
+        key = cls.author_key(author_id)
+        if entries and not conn.exists(key):
+            conn.zadd(key, {post_id: score for post_id, score in entries})
+
+    @classmethod
+    def remove_author_post(cls, author_id, post_id):
+        cls._conn().zrem(cls.author_key(author_id), post_id)
+
+    @classmethod
+    def add_pull_author(cls, user_id, author_id):
+        """Mark a followed high-follower author to be pulled at read time"""
+        conn = cls._conn()
+        key = cls.pull_key(user_id)
+        if conn.exists(cls.timeline_key(user_id)):
+            conn.sadd(key, author_id)
+            conn.expire(key, settings.FEED_TIMELINE_TTL)
+
+    @classmethod
+    def invalidate(cls, user_id):
+        """Drop a user's timeline so the next read rebuilds it"""
+        cls._conn().delete(cls.timeline_key(user_id), cls.pull_key(user_id))
+
+    @classmethod
+    def rebuild(cls, user_id, entries, pull_author_ids):
+        """
+        Replace a user's timeline with the given ``(post_id, score)`` entries.
+        An empty timeline still gets a sentinel so that a user who follows
+        nobody does not trigger a rebuild on every read.
+        """
+        conn = cls._conn()
+        key = cls.timeline_key(user_id)
+        pull_key = cls.pull_key(user_id)
+        pipe = conn.pipeline(transaction=True)
+        pipe.delete(key, pull_key)
+        mapping = {post_id: score for post_id, score in entries}
+        mapping[0] = 0
+        pipe.zadd(key, mapping)
+        pipe.zremrangebyrank(key, 0, -settings.FEED_TIMELINE_SIZE - 2)
+        pipe.expire(key, settings.FEED_TIMELINE_TTL)
+        if pull_author_ids:
+            pipe.sadd(pull_key, *pull_author_ids)
+            pipe.expire(pull_key, settings.FEED_TIMELINE_TTL)
+        pipe.execute()
+
+    @classmethod
+    def get_entries(cls, user_id, position=None, limit=None):
+        """
+        Return ``(post_id, score)`` pairs for a user's home feed, newest first,
+        starting after the keyset ``position`` if one is given. Pushed posts
+        are merged with the recent posts of pulled authors.
+        """
+        conn = cls._conn()
+        limit = limit or settings.FEED_TIMELINE_SIZE
+        if position is not None:
+            position = (float(position[0]), int(position[1]))
+        max_score = '+inf' if position is None else position[0]
+        pull_authors = conn.smembers(cls.pull_key(user_id))
+
+        # Fetch one extra row per source to step over a tie at the boundary
+        pipe = conn.pipeline(transaction=False)
+        keys = [cls.timeline_key(user_id)]
+        keys += [cls.author_key(int(author_id)) for author_id in pull_authors]
+        for key in keys:
+            pipe.zrevrangebyscore(key, max_score, '-inf', start=0, num=limit + 1, withscores=True)
+        results = pipe.execute()
+
+        merged = {}
+        for rows in results:
+            for member, score in rows:
+                post_id = int(member)
+                if post_id:
+                    merged[post_id] = score
+        entries = sorted(merged.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        return rank_after(entries, position, limit)
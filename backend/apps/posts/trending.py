@@ -0,0 +1,65 @@
+from django.conf import settings
+from django_redis import get_redis_connection
+import time
+
+
+class TrendingEngine:
+    """
+    Incremental trending scores over a sliding window of time buckets.
+
+    Engagement is added to the sorted set of the current bucket
+    (``trending:bucket:{n}``) as it happens. ``merge`` combines the buckets
+    inside the window into ``trending:merged``, weighting each by an
+    exponential decay on its age, so the top posts are a ZREVRANGE away.
+    """
+    WEIGHTS = {
+        'like': 1,
+        'comment': 2,
+    }
+    MERGED_KEY = 'trending:merged'
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def bucket_key(bucket):
+        return f'trending:bucket:{bucket}'
+
+    @staticmethod
+    def current_bucket(now=None):
+        return int((now or time.time()) // settings.TRENDING_BUCKET_SECONDS)
+
+    @classmethod
+    def window_buckets(cls):
+        return settings.TRENDING_WINDOW_HOURS * 3600 // settings.TRENDING_BUCKET_SECONDS
+
+    @classmethod
+    def record(cls, post_id, event, count=1):
+        """Add engagement to the current bucket; a negative count retracts it"""
+        key = cls.bucket_key(cls.current_bucket())
+        pipe = cls._conn().pipeline(transaction=False)
+        pipe.zincrby(key, cls.WEIGHTS[event] * count, post_id)
+        pipe.expire(key, settings.TRENDING_WINDOW_HOURS * 3600 + settings.TRENDING_BUCKET_SECONDS)
+        pipe.execute()
+
+    @classmethod
+    def merge(cls):
+        """Rebuild the decayed score set from the buckets inside the window"""
+        conn = cls._conn()
+        current = cls.current_bucket()
+        bucket_hours = settings.TRENDING_BUCKET_SECONDS / 3600
+        weights = {
+            cls.bucket_key(current - age): 0.5 ** (age * bucket_hours / settings.TRENDING_HALF_LIFE_HOURS)
+            for age in range(cls.window_buckets())
+        }
+        pipe = conn.pipeline(transaction=True)
+        pipe.zunionstore(cls.MERGED_KEY, weights)
+        # Retracted engagement can leave zero or negative scores behind
+        pipe.zremrangebyscore(cls.MERGED_KEY, '-inf', 0)
+        pipe.execute()
+
+    @classmethod
+    def top(cls, limit):
+        """Return the ids of the top ``limit`` posts by decayed score"""
+        return [int(post_id) for post_id in cls._conn().zrevrange(cls.MERGED_KEY, 0, limit - 1)]
@@ -0,0 +1,159 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import CharField, F, Value
+from django.utils import timezone
+from django_redis import get_redis_connection
+from datetime import datetime, timedelta, timezone as dt_timezone
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class RecentLikes:
+    """
+    Redis mirror of the posts a user liked among recently created posts.
+
+    ``recent_likes:{user_id}`` holds the ids of every post created since
+    ``recent_likes:{user_id}:since`` that the user likes. Within that window
+    the set is complete, so ``is_liked`` for a recent post can be answered
+    without touching Postgres. Older posts fall back to the database.
+    """
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def key(user_id):
+        return f'recent_likes:{user_id}'
+
+    @staticmethod
+    def since_key(user_id):
+        return f'recent_likes:{user_id}:since'
+
+    @classmethod
+    def load(cls, user_id, rebuild=False):
+        """Build the set for a user if it is missing and return its window start"""
+        conn = cls._conn()
+        since = None if rebuild else conn.get(cls.since_key(user_id))
+        if since is not None:
+            return datetime.fromtimestamp(float(since), tz=dt_timezone.utc)
+
+        from .models import Like
+        window_start = timezone.now() - timedelta(days=settings.RECENT_LIKES_WINDOW_DAYS)
+        post_ids = list(Like.objects.filter(
+            user_id=user_id,
+            post__created_at__gte=window_start
+        ).values_list('post_id', flat=True))
+
+        # Union into the live set so likes recorded while the query ran survive
+        ttl = settings.RECENT_LIKES_TTL
+        staging_key = f'{cls.key(user_id)}:load:{uuid.uuid4().hex}'
+        pipe = conn.pipeline(transaction=True)
+        # 0 is a sentinel so the set exists even when the user liked nothing
+        pipe.sadd(staging_key, 0, *post_ids)
+        pipe.sunionstore(cls.key(user_id), [cls.key(user_id), staging_key])
+        pipe.delete(staging_key)
+        pipe.expire(cls.key(user_id), ttl)
+        pipe.set(cls.since_key(user_id), window_start.timestamp(), ex=ttl)
+        pipe.execute()
+        return window_start
+
+    @classmethod
+    def resolve(cls, user_id, posts):
+        """
+        Split posts into those answerable from Redis and the rest. Returns
+        ``(resolved_ids, liked_ids)`` for the posts inside the window.
+
+        Redis evicts keys independently, so a set missing its sentinel is
+        incomplete even while its window marker survives; it is rebuilt once
+        before giving up and leaving every post to the database.
+        """
+        for rebuild in (False, True):
+            since = cls.load(user_id, rebuild=rebuild)
+            recent = [post.id for post in posts if post.created_at >= since]
+            if not recent:
+                return set(), set()
+            built, *flags = cls._conn().smismember(cls.key(user_id), [0, *recent])
+            if built:
+                return set(recent), {post_id for post_id, flag in zip(recent, flags) if flag}
+        return set(), set()
+
+    @classmethod
+    def add(cls, user_id, post_id):
+        """
+        Record a like. Always written, so a set being loaded concurrently
+        keeps it; a set without the sentinel is never trusted by ``resolve``.
+        """
+        pipe = cls._conn().pipeline()
+        pipe.sadd(cls.key(user_id), post_id)
+        pipe.expire(cls.key(user_id), settings.RECENT_LIKES_TTL)
+        pipe.execute()
+
+    @classmethod
+    def remove(cls, user_id, post_id):
+        cls._conn().srem(cls.key(user_id), post_id)
+
+
+def resolve_recent_likes(posts, user, state):
+    """Answer ``liked_posts`` from Redis where possible; returns the ids left for the database"""
+    post_ids = {post.id for post in posts}
+    if settings.RECENT_LIKES_ENABLED:
+        try:
+            resolved, liked = RecentLikes.resolve(user.id, posts)
+            state.update('liked_posts', resolved, liked)
+            return post_ids - resolved
+        except Exception as e:
+            logger.error(f"Recent likes error: {e}")
+    return post_ids
+
+
+def prefetch_post_flags(posts, user, state):
+    """Resolve ``liked_posts`` and ``saved_posts`` for a page of posts"""
+    from .models import Like, SavedPost
+
+    post_ids = {post.id for post in posts}
+    pending_ids = resolve_recent_likes(posts, user, state)
+    if pending_ids:
+        liked = Like.objects.filter(
+            user=user, post_id__in=pending_ids
+        ).values_list('post_id', flat=True)
+        state.update('liked_posts', pending_ids, liked)
+
+    saved = SavedPost.objects.filter(
+        user=user, post_id__in=post_ids
+    ).values_list('post_id', flat=True)
+    state.update('saved_posts', post_ids, saved)
+
+
+def prefetch_page_state(posts, author_ids, user, state):
+    """
+    Resolve ``liked_posts``, ``saved_posts`` and ``following_users`` for a
+    page of posts with one UNION query, after recent likes from Redis.
+    """
+    from apps.accounts.models import Follow
+    from .models import Like, SavedPost
+
+    post_ids = {post.id for post in posts}
+    author_ids = set(author_ids)
+    pending_ids = resolve_recent_likes(posts, user, state)
+
+    def flagged(queryset, name, field):
+        return queryset.order_by().annotate(
+            name=Value(name, output_field=CharField()), obj_id=F(field)
+        ).values_list('name', 'obj_id')
+
+    queries = [
+        flagged(SavedPost.objects.filter(user=user, post_id__in=post_ids), 'saved_posts', 'post_id'),
+        flagged(Follow.objects.filter(follower=user, following_id__in=author_ids), 'following_users', 'following_id'),
+    ]
+    if pending_ids:
+        queries.append(flagged(Like.objects.filter(user=user, post_id__in=pending_ids), 'liked_posts', 'post_id'))
+
+    hits = defaultdict(set)
+    for name, obj_id in queries[0].union(*queries[1:], all=True):
+        hits[name].add(obj_id)
+    state.update('liked_posts', pending_ids, hits['liked_posts'])
+    state.update('saved_posts', post_ids, hits['saved_posts'])
+    state.update('following_users', author_ids, hits['following_users'])
@@ -1,15 +1,30 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.db.models import Q
-from django.core.cache import cache
+from django.conf import settings
+from django.utils import timezone
 from .models import Post, Like, SavedPost
 from .serializers import PostSerializer, PostCreateSerializer, LikeSerializer
 from apps.accounts.models import Follow
+from apps.accounts.counters import adjust_counters
 from apps.core.cache_utils import CacheManager, cache_result
-from apps.core.kafka_producer import event_producer
+from apps.core.outbox import enqueue_event
+from apps.core.pagination import KeysetPagination, cursor_datetime
+from apps.core.search_indexing import IndexQueue
+from .tasks import (
+    fan_out_post, generate_feed_for_user, process_post_media, remove_post_from_timelines
+)
+from .timeline import TimelineStore
+from .trending import TrendingEngine
+from .counters import post_likes
+from .explore import ExplorePool
+from .hydration import hydrate_posts
+from .viewer_state import RecentLikes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,8 +35,22 @@ class PostViewSet(viewsets.ModelViewSet):
     search_fields = ['caption', 'location', 'user__username']
     ordering_fields = ['created_at', 'likes_count', 'comments_count']
     ordering = ['-created_at']
+    cursor_paginated_actions = {'feed', 'explore', 'likes', 'saved'}
+    
+    @property
+    def paginator(self):
+        """Keyset pagination for the list actions that can grow without bound"""
+        if not hasattr(self, '_paginator'):
+            if self.action in self.cursor_paginated_actions:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
     
     def get_queryset(self):
+        if self.action == 'unarchive':
+            # Archived posts are only reachable by their owner, to restore them
+            return Post.objects.filter(user=self.request.user)
         queryset = Post.objects.filter(is_archived=False).select_related('user').prefetch_related('media')
         # Filter by user if specified
         user_id = self.request.query_params.get('user_id')
@@ -39,26 +68,26 @@ class PostViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Save the post with current user
-        post = serializer.save(user=request.user)
+        # Save the post with current user; the Kafka event is committed with it
+        with transaction.atomic():
+            post = serializer.save(user=request.user)
+            enqueue_event('post_created', {
+                'post_id': post.id,
+                'user_id': request.user.id,
+                'timestamp': post.created_at.isoformat()
+            }, aggregate=f'post:{post.id}')
         
-        # Invalidate user's followers' feeds
+        # Push the post into followers' timelines
         try:
-            followers = Follow.objects.filter(following=request.user).values_list('follower_id', flat=True)
-            for follower_id in followers:
-                CacheManager.invalidate_user_feed(follower_id)
+            fan_out_post.delay(post.id)
         except Exception as e:
-            logger.error(f"Error invalidating cache: {e}")
+            logger.error(f"Error queueing feed fan-out: {e}")
         
-        # Publish event to Kafka
+        # Generate resized renditions in the background
         try:
-            event_producer.send_event('post_created', {
-                'post_id': post.id,
-                'user_id': request.user.id,
-                'timestamp': post.created_at.isoformat()
-            })
+            process_post_media.delay(post.id)
         except Exception as e:
-            logger.error(f"Error sending Kafka event: {e}")
+            logger.error(f"Error queueing media processing: {e}")
         
         logger.info(f"Post {post.id} created by user {request.user.id}")
         
@@ -67,145 +96,136 @@ class PostViewSet(viewsets.ModelViewSet):
         
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
-    def retrieve(self, request, *args, **kwargs):
-        """Get post detail with caching"""
-        post_id = kwargs.get('pk')
-        
-        # Try to get from cache
+    def perform_destroy(self, instance):
+        post_id, author_id = instance.id, instance.user_id
+        super().perform_destroy(instance)
         try:
-            cached_data = CacheManager.get_post_detail(post_id)
-            if cached_data:
-                return Response(cached_data)
+            CacheManager.invalidate_post_detail(post_id)
+            remove_post_from_timelines.delay(post_id, author_id)
         except Exception as e:
-            logger.error(f"Cache error: {e}")
-        
-        # Get from database
-        instance = self.get_object()
-        serializer = self.get_serializer(
-            instance,
-            context={'request': request}
-        )
-
+            logger.error(f"Error queueing timeline removal: {e}")
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Get post detail from the shared post fragment cache"""
+        try:
+            post_id = int(kwargs.get('pk'))
+        except (TypeError, ValueError):
+            raise NotFound()
         
-        # Cache the result
+        results = hydrate_posts([post_id], request)
+        if not results:
+            raise NotFound()
+        return Response(results[0])
+    
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
         try:
-            CacheManager.set_post_detail(post_id, serializer.data)
+            CacheManager.invalidate_post_detail(serializer.instance.id)
         except Exception as e:
             logger.error(f"Cache error: {e}")
-        
-        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def feed(self, request):
-        """Get posts from users that the current user follows with caching"""
+        """Get posts from users that the current user follows from the materialized timeline"""
         user_id = request.user.id
         
-        # Try to get from cache
-        try:
-            cached_feed = CacheManager.get_user_feed(user_id)
-            if cached_feed:
-                posts = Post.objects.filter(id__in=cached_feed).select_related('user').prefetch_related('media')
-                serializer = self.get_serializer(
-                    posts,
-                    many=True,
-                    context={'request': request}
-                )
-
-                return Response(serializer.data)
-        except Exception as e:
-            logger.error(f"Cache error: {e}")
+        def fetch(position, limit):
+            try:
+                if not TimelineStore.exists(user_id):
+                    generate_feed_for_user(user_id)
+                return TimelineStore.get_entries(user_id, position, limit)
+            except Exception as e:
+                logger.error(f"Timeline error: {e}")
+            return self._feed_from_db(request.user, position, limit)
         
-        # Get from database
+        post_ids = self.paginator.paginate_positions(fetch, request)
+        return self.get_paginated_response(hydrate_posts(post_ids, request))
+    
+    def _feed_from_db(self, user, position, limit):
+        """Build a feed page straight from Postgres when Redis is unavailable"""
         following_users = Follow.objects.filter(
-            follower=request.user
+            follower=user
         ).values_list('following', flat=True)
         
         posts = Post.objects.filter(
-            Q(user__in=following_users) | Q(user=request.user),
+            Q(user__in=following_users) | Q(user=user),
             is_archived=False
-        ).select_related('user').prefetch_related('media').order_by('-created_at')[:100]
-        
-        # Cache post IDs
+        )
+        if position is not None:
+            created_at = cursor_datetime(position[0])
+            posts = posts.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=position[1])
+            )
+        rows = posts.order_by('-created_at', '-id').values_list('id', 'created_at')[:limit]
+        return [(post_id, created_at.timestamp()) for post_id, created_at in rows]
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Get the current trending posts, ranked by decayed engagement"""
+        post_ids = None
         try:
-            post_ids = list(posts.values_list('id', flat=True))
-            CacheManager.set_user_feed(user_id, post_ids)
+            post_ids = CacheManager.get_trending_posts()
+            if post_ids is None:
+                post_ids = TrendingEngine.top(settings.TRENDING_POSTS_LIMIT)
         except Exception as e:
-            logger.error(f"Cache error: {e}")
+            logger.error(f"Trending error: {e}")
         
-        page = self.paginate_queryset(posts)
+        page = self.paginate_queryset(post_ids or [])
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(
-            posts,
-            many=True,
-            context={'request': request}
-        )
-
-        return Response(serializer.data)
+            return self.get_paginated_response(hydrate_posts(page, request))
+        return Response(hydrate_posts(post_ids or [], request))
     
     @action(detail=False, methods=['get'])
     def explore(self, request):
         """Get Posts from users not followed by current user"""
-        following_users = Follow.objects.filter(
+        excluded_authors = set(Follow.objects.filter(
             follower=request.user
-        ).values_list('following', flat=True)
+        ).values_list('following_id', flat=True))
+        excluded_authors.add(request.user.id)
         
-        posts = Post.objects.exclude(
-            Q(user__in=following_users) | Q(user=request.user)
-        ).filter(is_archived=False).select_related('user').prefetch_related('media').order_by('-created_at')
+        # Serve from the precomputed pool; pool cursors carry a numeric score
+        position = self.paginator.get_position(request)
+        if position is None or isinstance(position[0], (int, float)):
+            try:
+                if ExplorePool.exists():
+                    post_ids = self.paginator.paginate_positions(
+                        lambda pos, limit: ExplorePool.get_entries(excluded_authors, pos, limit),
+                        request
+                    )
+                    return self.get_paginated_response(hydrate_posts(post_ids, request))
+            except Exception as e:
+                logger.error(f"Explore pool error: {e}")
         
-        page = self.paginate_queryset(posts)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        posts = Post.objects.exclude(user__in=excluded_authors).filter(
+            is_archived=False
+        ).only('id', 'created_at')
         
-        serializer = self.get_serializer(
-            posts,
-            many=True,
-            context={'request': request}
-        )
-
-        return Response(serializer.data)
+        page = self.paginate_queryset(posts)
+        return self.get_paginated_response(hydrate_posts([post.id for post in page], request))
     
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         post = self.get_object()
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        
-        if created:
-            # Update likes count
-            post.likes_count += 1
-            post.save(update_fields=['likes_count'])
-            
-            # Invalidate caches
-            try:
-                CacheManager.invalidate_post_detail(post.id)
-            except Exception as e:
-                logger.error(f"Cache error: {e}")
-            
-            # Publish event to Kafka
-            try:
-                event_producer.send_event('post_liked', {
+        with transaction.atomic():
+            like, created = Like.objects.get_or_create(user=request.user, post=post)
+            if created:
+                enqueue_event('post_liked', {
                     'post_id': post.id,
                     'user_id': request.user.id,
-                    'post_owner_id': post.user.id
-                })
-            except Exception as e:
-                logger.error(f"Kafka error: {e}")
+                    'post_owner_id': post.user_id
+                }, aggregate=f'post:{post.id}')
+        
+        if created:
+            # Buffer the likes count; flush_like_counters writes it back
+            post_likes.incr(post.id, 1)
             
-            # Create notification asynchronously
+            # The cached post fragment stays valid: readers overlay the
+            # buffered count until the next flush invalidates it
             try:
-                from apps.notifications.tasks import batch_create_notifications
-                batch_create_notifications.delay([{
-                    'recipient_id': post.user.id,
-                    'sender_id': request.user.id,
-                    'notification_type': 'like',
-                    'post_id': post.id
-                }])
+                RecentLikes.add(request.user.id, post.id)
+                TrendingEngine.record(post.id, 'like')
             except Exception as e:
-                logger.error(f"Notification error: {e}")
+                logger.error(f"Engagement tracking error: {e}")
             
             return Response({'message': 'Post liked'}, status=status.HTTP_201_CREATED)
         
@@ -217,12 +237,12 @@ class PostViewSet(viewsets.ModelViewSet):
         deleted, _ = Like.objects.filter(user=request.user, post=post).delete()
         
         if deleted > 0:
-            post.likes_count = max(0, post.likes_count - 1)
-            post.save(update_fields=['likes_count'])
+            post_likes.incr(post.id, -1)
             try:
-                CacheManager.invalidate_post_detail(post.id)
+                RecentLikes.remove(request.user.id, post.id)
+                TrendingEngine.record(post.id, 'like', count=-1)
             except Exception as e:
-                logger.error(f"Cache error: {e}")
+                logger.error(f"Engagement tracking error: {e}")
             return Response({'message': 'Post unliked successfully'})
         return Response({'message': 'Post not liked yet'}, status=status.HTTP_400_BAD_REQUEST)
     
@@ -232,11 +252,8 @@ class PostViewSet(viewsets.ModelViewSet):
         likes = Like.objects.filter(post=post).select_related('user')
         
         page = self.paginate_queryset(likes)
-        if page is not None:
-            serializer = LikeSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = LikeSerializer(likes, many=True)
-        return Response(serializer.data)
+        serializer = LikeSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def save(self, request, pk=None):
@@ -259,22 +276,12 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def saved(self, request):
         """Get all saved posts of the current user"""
-        saved_posts = SavedPost.objects.filter(
-            user=request.user
-        ).select_related('post__user').prefetch_related('post__media').order_by('-created_at')
-        posts = [sp.post for sp in saved_posts]
+        saved_posts = SavedPost.objects.filter(user=request.user).only('id', 'post_id', 'created_at')
         
-        page = self.paginate_queryset(posts)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(
-            posts,
-            many=True,
-            context={'request': request}
+        page = self.paginate_queryset(saved_posts)
+        return self.get_paginated_response(
+            hydrate_posts([saved.post_id for saved in page], request)
         )
-
-        return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def archive(self, request, pk=None):
@@ -284,18 +291,30 @@ class PostViewSet(viewsets.ModelViewSet):
                 {'error': 'You can only archive your own posts'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
-        post.is_archived = True
-        post.save(update_fields=['is_archived'])
+        if Post.objects.filter(pk=post.pk, is_archived=False).update(
+            is_archived=True, updated_at=timezone.now()
+        ):
+            adjust_counters(post.user_id, posts_count=-1)
+            IndexQueue.mark(Post, [post.id])
+            try:
+                CacheManager.invalidate_post_detail(post.id)
+                remove_post_from_timelines.delay(post.id, post.user_id)
+            except Exception as e:
+                logger.error(f"Error queueing timeline removal: {e}")
         return Response({'message': 'Post archived successfully'})
     
     @action(detail=True, methods=['post'])
     def unarchive(self, request, pk=None):
+        # get_queryset only exposes the caller's own posts here, so another
+        # user's post is a 404 rather than a 403
         post = self.get_object()
-        if post.user != request.user:
-            return Response(
-                {'error': 'You can only unarchive your own posts'}, 
-                status=status.HTTP_403_FORBIDDEN
-            )
-        post.is_archived = False
-        post.save(update_fields=['is_archived'])
+        if Post.objects.filter(pk=post.pk, is_archived=True).update(
+            is_archived=False, updated_at=timezone.now()
+        ):
+            adjust_counters(post.user_id, posts_count=1)
+            IndexQueue.mark(Post, [post.id])
+            try:
+                fan_out_post.delay(post.id)
+            except Exception as e:
+                logger.error(f"Error queueing feed fan-out: {e}")
         return Response({'message': 'Post unarchived successfully'})
\ No newline at end of file
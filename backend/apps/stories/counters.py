@@ -0,0 +1,4 @@
+from apps.core.counter_buffer import CounterBuffer
+
+# Views are buffered in Redis and flushed by apps.stories.tasks.flush_story_views
+story_views = CounterBuffer('story_views', 'stories.Story', 'views_count')
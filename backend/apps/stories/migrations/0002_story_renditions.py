@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='placeholder',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='renditions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 21:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0002_story_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='storyview',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -11,6 +11,8 @@ class Story(models.Model):
     user = models.ForeignKey(User, related_name='stories', on_delete=models.CASCADE)
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPES)
     media_file = models.FileField(upload_to='stories/')
+    renditions = models.JSONField(default=list, blank=True)
+    placeholder = models.CharField(max_length=64, blank=True)
     caption = models.TextField(max_length=500, blank=True)
     views_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -31,7 +33,8 @@ class Story(models.Model):
 class StoryView(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     story = models.ForeignKey(Story, related_name='views', on_delete=models.CASCADE)
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: views are flushed in batches with the time they happened
+    viewed_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         unique_together = ('user', 'story')
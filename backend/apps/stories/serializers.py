@@ -1,43 +1,119 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 from .models import Story, StoryView
-from apps.accounts.serializers import UserSerializer
+from apps.accounts.serializers import UserSerializer, prefetch_following
+from apps.core.media import rendition_urls
+from apps.core.uploads import claim_uploads
+from apps.core.viewer_state import (
+    ViewerStateListSerializer, get_viewer, get_viewer_state, viewer_flag
+)
+from .counters import story_views
+from .tray import StoryTray
+import logging
+
+logger = logging.getLogger(__name__)
 
 class StorySerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     is_viewed = serializers.SerializerMethodField()
     is_expired = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
     
     class Meta:
         model = Story
-        fields = ['id', 'user', 'media_type', 'media_file', 'caption', 
-                  'views_count', 'is_viewed', 'is_expired', 
-                  'created_at', 'expires_at']
-        read_only_fields = ['id', 'user', 'views_count', 'created_at', 'expires_at']
+        fields = ['id', 'user', 'media_type', 'media_file', 'renditions', 
+                  'placeholder', 'caption', 'views_count', 'is_viewed', 
+                  'is_expired', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'user', 'placeholder', 'views_count', 
+                            'created_at', 'expires_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def prefetch_viewer_state(self, instances, context):
+        """Resolve is_viewed for a page of stories in one query"""
+        viewer = get_viewer(context)
+        story_ids = {story.id for story in instances}
+        viewed = set(StoryView.objects.filter(
+            user=viewer, story_id__in=story_ids
+        ).values_list('story_id', flat=True))
+        # Views recorded in Redis but not yet persisted
+        try:
+            viewed |= StoryTray.seen(viewer.id, story_ids - viewed)
+        except Exception as e:
+            logger.error(f"Story tray error: {e}")
+        get_viewer_state(context).update('viewed_stories', story_ids, viewed)
+        prefetch_following([story.user for story in instances], context)
+        context.setdefault('pending_views', {}).update(
+            story_views.pending(story.id for story in instances)
+        )
+
+    def to_representation(self, instance):
+        """Overlay view deltas that are still buffered in Redis"""
+        data = super().to_representation(instance)
+        pending = self.context.get('pending_views', {})
+        if instance.id in pending:
+            delta = pending[instance.id]
+        else:
+            delta = story_views.pending([instance.id])[instance.id]
+        data['views_count'] = max(0, data['views_count'] + delta)
+        return data
 
     def get_is_viewed(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return StoryView.objects.filter(user=request.user, story=obj).exists()
-        return False
+        return viewer_flag(
+            self.context, 'viewed_stories', obj.id,
+            lambda: StoryView.objects.filter(user=self.context['request'].user, story=obj).exists()
+        )
 
     def get_is_expired(self, obj):
         return obj.is_expired()
 
+    def get_renditions(self, obj):
+        return rendition_urls(obj.renditions, self.context.get('request'))
+
 class StoryCreateSerializer(serializers.ModelSerializer):
+    upload_id = serializers.UUIDField(write_only=True, required=False)
+
     class Meta:
         model = Story
-        fields = ['media_type', 'media_file', 'caption']
+        fields = ['media_type', 'media_file', 'upload_id', 'caption']
+        extra_kwargs = {
+            'media_type': {'required': False},
+            'media_file': {'required': False},
+        }
 
-    def validate_file(self, value):
+    def validate_media_file(self, value):
         # Validate file size (max 50MB)
-        if value.size > 50 * 1024 * 1024:
-            raise serializers.ValidationError("File size cannot exceed 50MB")
+        if value.size > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size cannot exceed {settings.UPLOAD_MAX_SIZE // (1024 * 1024)}MB"
+            )
         return value
 
+    def validate(self, data):
+        if 'upload_id' in data:
+            if 'media_file' in data:
+                raise serializers.ValidationError("Send either media_file or upload_id, not both")
+        elif not data.get('media_file') or not data.get('media_type'):
+            raise serializers.ValidationError("media_file and media_type are required without upload_id")
+        return data
+
+    def create(self, validated_data):
+        upload_id = validated_data.pop('upload_id', None)
+        with transaction.atomic():
+            if upload_id:
+                upload, = claim_uploads(validated_data['user'], [upload_id])
+                validated_data['media_file'] = upload.file.name
+                validated_data['media_type'] = upload.media_type
+            return super().create(validated_data)
+
 class StoryViewSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = StoryView
         fields = ['id', 'user', 'viewed_at']
-        read_only_fields = ['id', 'user', 'viewed_at']
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'viewed_at']
+        list_serializer_class = ViewerStateListSerializer
+
+    def prefetch_viewer_state(self, instances, context):
+        prefetch_following([view.user for view in instances], context)
\ No newline at end of file
@@ -2,22 +2,71 @@ from celery import shared_task
 from django.utils import timezone
 from .models import Story
 
+def story_files(stories):
+    """Storage paths of the original media and renditions of ``stories``"""
+    for media_file, renditions in stories.values_list('media_file', 'renditions'):
+        if media_file:
+            yield media_file
+        for rendition in renditions or []:
+            yield rendition['path']
+
 @shared_task
 def delete_expired_stories():
-    """Delete stories that have expired"""
+    """Delete expired stories, their views and their media files in batches"""
+    from apps.core.purge import chunked_purge
+
     expired_stories = Story.objects.filter(expires_at__lte=timezone.now())
-    count = expired_stories.count()
-    expired_stories.delete()
-    return f'Deleted {count} expired stories'
+    result = chunked_purge(expired_stories, 'expired_stories', files=story_files)
+    return str(result)
 
 @shared_task
 def process_story_upload(story_id):
-    """Process uploaded story (compress, generate thumbnail, etc.)"""
-    from .models import Story
+    """Generate resized renditions and a placeholder for a story image"""
+    from apps.core.media import render_images, save_renditions
+    from .tray import StoryTray
     try:
         story = Story.objects.get(id=story_id)
-        # Add your processing logic here
-        # Example: compress video, generate thumbnail
-        return f'Processed story {story_id}'
     except Story.DoesNotExist:
-        return f'Story {story_id} not found'
\ No newline at end of file
+        return f'Story {story_id} not found'
+
+    if story.media_type != 'image':
+        return f'No image to process for story {story_id}'
+
+    with story.media_file.open('rb') as f:
+        result = render_images({story.id: f.read()}).get(story.id)
+    if result is None:
+        return f'Could not process story {story_id}'
+
+    story.renditions = save_renditions(story.media_file, result)
+    story.placeholder = result['placeholder']
+    Story.objects.filter(pk=story.id).update(
+        renditions=story.renditions,
+        placeholder=story.placeholder
+    )
+    StoryTray.add(story)
+    return f'Processed story {story_id}'
+
+@shared_task
+def rebuild_story_tray():
+    """Load all active stories and their views into the story tray"""
+    from .models import StoryView
+    from .tray import StoryTray
+
+    active = Story.objects.filter(expires_at__gt=timezone.now())
+    views = StoryView.objects.filter(story__in=active).select_related('story').only(
+        'user_id', 'story__id', 'story__expires_at'
+    )
+    StoryTray.rebuild(
+        active.iterator(),
+        ((view.user_id, view.story) for view in views.iterator())
+    )
+    return 'Rebuilt story tray'
+
+
+@shared_task
+def flush_story_views():
+    """Persist story views recorded in Redis and apply views_count deltas"""
+    from .view_tracking import StoryViewLog
+
+    count = StoryViewLog.flush()
+    return f'Flushed {count} story views'
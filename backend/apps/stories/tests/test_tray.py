@@ -0,0 +1,87 @@
+from datetime import timedelta
+from django.test import RequestFactory, SimpleTestCase
+from django.utils import timezone
+from apps.stories.models import Story
+from apps.stories.tray import StoryTray, tray_groups
+
+AUTHORS = {101: ('alice', ''), 102: ('bob', ''), 103: ('carol', '')}
+
+
+def make_story(story_id, author_id, minutes_ago=0, expires_in=timedelta(hours=24)):
+    created_at = timezone.now() - timedelta(minutes=minutes_ago)
+    return Story(
+        id=story_id, user_id=author_id, media_type='image', media_file=f'stories/{story_id}.jpg',
+        created_at=created_at, expires_at=created_at + expires_in
+    )
+
+
+class StoryTrayTestCase(SimpleTestCase):
+    VIEWER_ID = 900
+
+    def setUp(self):
+        self.clear()
+
+    def tearDown(self):
+        self.clear()
+
+    def clear(self):
+        keys = [StoryTray.BUILT_KEY, StoryTray.REBUILDING_KEY, StoryTray.seen_key(self.VIEWER_ID)]
+        for author_id in AUTHORS:
+            keys += [StoryTray.author_key(author_id), StoryTray.data_key(author_id)]
+        StoryTray._conn().delete(*keys)
+
+    def test_get_tray_orders_stories_and_marks_seen(self):
+        """Test a tray lists active stories oldest first with seen flags"""
+        older, newer = make_story(1, 101, minutes_ago=30), make_story(2, 101, minutes_ago=5)
+        StoryTray.add(newer)
+        StoryTray.add(older)
+        StoryTray.mark_seen(self.VIEWER_ID, older)
+        
+        tray = StoryTray.get_tray(self.VIEWER_ID, AUTHORS)
+        
+        self.assertEqual(list(tray), [101])
+        self.assertEqual([(story['id'], seen) for story, seen in tray[101]], [(1, True), (2, False)])
+
+    def test_get_tray_skips_expired_stories(self):
+        """Test an expired story is left out before its key expires"""
+        StoryTray.add(make_story(1, 101, minutes_ago=90, expires_in=timedelta(hours=1)))
+        StoryTray.add(make_story(2, 102))
+        
+        self.assertEqual(list(StoryTray.get_tray(self.VIEWER_ID, AUTHORS)), [102])
+
+    def test_seen_returns_marked_subset(self):
+        """Test seen markers answer only for stories the viewer opened"""
+        story = make_story(1, 101)
+        StoryTray.mark_seen(self.VIEWER_ID, story)
+        
+        self.assertEqual(StoryTray.seen(self.VIEWER_ID, [1, 2]), {1})
+        self.assertEqual(StoryTray.seen(self.VIEWER_ID, []), set())
+
+    def test_rebuild_is_claimed_once(self):
+        """Test only one request queues a rebuild while the tray is missing"""
+        self.assertTrue(StoryTray.claim_rebuild())
+        self.assertFalse(StoryTray.claim_rebuild())
+        
+        StoryTray.rebuild([make_story(1, 101)], [])
+        self.assertTrue(StoryTray.is_built())
+        self.assertTrue(StoryTray.claim_rebuild())
+
+
+class TrayGroupsTestCase(SimpleTestCase):
+    def test_unseen_authors_first_then_most_recent(self):
+        """Test authors with unseen stories lead, each part newest first"""
+        data = {
+            story.id: StoryTray.story_data(story)
+            for story in (make_story(1, 101, 50), make_story(2, 102, 10), make_story(3, 103, 30))
+        }
+        tray = {
+            101: [(data[1], False)],
+            102: [(data[2], True)],
+            103: [(data[3], False)],
+        }
+        
+        groups = tray_groups(tray, AUTHORS, RequestFactory().get('/api/stories/feed/'))
+        
+        self.assertEqual([group['user']['id'] for group in groups], [103, 101, 102])
+        self.assertEqual([group['has_unseen'] for group in groups], [True, True, False])
+        self.assertTrue(groups[2]['stories'][0]['is_viewed'])
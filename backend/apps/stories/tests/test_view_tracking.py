@@ -0,0 +1,17 @@
+from django.test import SimpleTestCase
+from apps.stories.view_tracking import parse_entry, viewed_at
+
+class PendingViewTestCase(SimpleTestCase):
+    def test_entry_keeps_view_time(self):
+        """Test a flushed view keeps the time it was recorded, not the flush time"""
+        story_id, user_id, when = parse_entry(b'12:34:1700000000.5')
+        
+        self.assertEqual((story_id, user_id), (12, 34))
+        self.assertEqual(when, viewed_at(1700000000.5))
+
+    def test_entry_without_time_is_accepted(self):
+        """Test entries queued in the old format are still flushed"""
+        story_id, user_id, when = parse_entry(b'12:34')
+        
+        self.assertEqual((story_id, user_id), (12, 34))
+        self.assertIsNotNone(when)
@@ -0,0 +1,185 @@
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django_redis import get_redis_connection
+from apps.core.media import rendition_urls
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEEN_TTL = 48 * 3600
+# How long one queued rebuild holds off others while the tray is missing
+REBUILD_CLAIM_TTL = 300
+
+
+class StoryTray:
+    """
+    Active stories kept in Redis for building the story tray.
+
+    Each author has a sorted set ``stories:{author_id}`` of active story ids
+    scored by their expiry timestamp, with compact story data in the hash
+    ``stories:{author_id}:data``. Each viewer has ``story_seen:{user_id}``,
+    also scored by expiry. A tray is one pipelined read of those keys for
+    every followed author; expired entries are filtered by score and the
+    keys expire on their own once the last story does.
+    """
+    BUILT_KEY = 'stories:built'
+    REBUILDING_KEY = 'stories:rebuilding'
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def author_key(author_id):
+        return f'stories:{author_id}'
+
+    @staticmethod
+    def data_key(author_id):
+        return f'stories:{author_id}:data'
+
+    @staticmethod
+    def seen_key(user_id):
+        return f'story_seen:{user_id}'
+
+    @staticmethod
+    def story_data(story):
+        """Viewer-independent data shown in the tray"""
+        return {
+            'id': story.id,
+            'media_type': story.media_type,
+            'media_file': story.media_file.name,
+            'renditions': story.renditions,
+            'placeholder': story.placeholder,
+            'caption': story.caption,
+            'created_at': story.created_at.isoformat(),
+            'expires_at': story.expires_at.isoformat(),
+        }
+
+    @classmethod
+    def _add(cls, pipe, story):
+        expires_at = int(story.expires_at.timestamp())
+        author_key, data_key = cls.author_key(story.user_id), cls.data_key(story.user_id)
+        pipe.zadd(author_key, {story.id: expires_at})
+        pipe.hset(data_key, story.id, json.dumps(cls.story_data(story)))
+        # Keep the keys alive until the author's last story expires
+        for key in (author_key, data_key):
+            pipe.expireat(key, expires_at, nx=True)
+            pipe.expireat(key, expires_at, gt=True)
+
+    @classmethod
+    def add(cls, story):
+        """Add or refresh an active story"""
+        pipe = cls._conn().pipeline(transaction=False)
+        cls._add(pipe, story)
+        pipe.execute()
+
+    @classmethod
+    def remove(cls, story):
+        pipe = cls._conn().pipeline(transaction=False)
+        pipe.zrem(cls.author_key(story.user_id), story.id)
+        pipe.hdel(cls.data_key(story.user_id), story.id)
+        pipe.execute()
+
+    @classmethod
+    def mark_seen(cls, user_id, story):
+        key = cls.seen_key(user_id)
+        pipe = cls._conn().pipeline(transaction=False)
+        pipe.zadd(key, {story.id: int(story.expires_at.timestamp())})
+        pipe.expire(key, SEEN_TTL)
+        pipe.execute()
+
+    @classmethod
+    def seen(cls, user_id, story_ids):
+        """Return the subset of ``story_ids`` the user has seen"""
+        story_ids = list(story_ids)
+        if not story_ids:
+            return set()
+        scores = cls._conn().zmscore(cls.seen_key(user_id), story_ids)
+        return {story_id for story_id, score in zip(story_ids, scores) if score is not None}
+
+    @classmethod
+    def is_built(cls):
+        return bool(cls._conn().exists(cls.BUILT_KEY))
+
+    @classmethod
+    def claim_rebuild(cls):
+        """Return True for the one caller that should queue a rebuild"""
+        return bool(cls._conn().set(cls.REBUILDING_KEY, 1, nx=True, ex=REBUILD_CLAIM_TTL))
+
+    @classmethod
+    def rebuild(cls, stories, views):
+        """
+        Load every active story and the views of them, e.g. after Redis
+        lost its data. ``views`` are ``(user_id, story)`` pairs.
+        """
+        pipe = cls._conn().pipeline(transaction=False)
+        for story in stories:
+            cls._add(pipe, story)
+        for user_id, story in views:
+            key = cls.seen_key(user_id)
+            pipe.zadd(key, {story.id: int(story.expires_at.timestamp())})
+            pipe.expire(key, SEEN_TTL)
+        pipe.set(cls.BUILT_KEY, 1)
+        pipe.delete(cls.REBUILDING_KEY)
+        pipe.execute()
+
+    @classmethod
+    def get_tray(cls, user_id, authors):
+        """
+        Return ``{author_id: [(story data, seen)]}`` for the given authors,
+        oldest story first, with one round trip to Redis.
+        """
+        author_ids = list(authors)
+        now = int(timezone.now().timestamp())
+        pipe = cls._conn().pipeline(transaction=False)
+        pipe.zrangebyscore(cls.seen_key(user_id), now, '+inf')
+        for author_id in author_ids:
+            pipe.zrangebyscore(cls.author_key(author_id), now, '+inf')
+            pipe.hgetall(cls.data_key(author_id))
+        results = pipe.execute()
+
+        seen = {int(story_id) for story_id in results[0]}
+        tray = {}
+        for index, author_id in enumerate(author_ids):
+            story_ids, data = results[1 + index * 2], results[2 + index * 2]
+            stories = [
+                json.loads(data[story_id])
+                for story_id in story_ids if story_id in data
+            ]
+            if stories:
+                tray[author_id] = [(story, story['id'] in seen) for story in stories]
+        return tray
+
+
+def tray_groups(tray, authors, request):
+    """
+    Shape a tray into compact per-author groups: authors with unseen
+    stories first, then by their most recent story.
+    """
+    groups = []
+    for author_id, stories in tray.items():
+        username, profile_picture = authors[author_id]
+        groups.append({
+            'user': {
+                'id': author_id,
+                'username': username,
+                'profile_picture': request.build_absolute_uri(
+                    default_storage.url(profile_picture)
+                ) if profile_picture else None,
+            },
+            'has_unseen': not all(seen for _, seen in stories),
+            'latest_at': stories[-1][0]['created_at'],
+            'stories': [
+                dict(
+                    story,
+                    media_file=request.build_absolute_uri(default_storage.url(story['media_file'])),
+                    renditions=rendition_urls(story['renditions'], request),
+                    is_viewed=seen,
+                )
+                for story, seen in stories
+            ],
+        })
+    groups.sort(key=lambda group: group['latest_at'], reverse=True)
+    groups.sort(key=lambda group: not group['has_unseen'])
+    return groups
@@ -0,0 +1,148 @@
+from datetime import datetime, timezone as dt_timezone
+from django.db.models import F
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+from apps.accounts.models import User
+from apps.core.locks import redis_lock
+from apps.core.pagination import rank_after
+from .counters import story_views
+from .models import Story, StoryView
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Grace period for reading viewers after a story expires
+VIEWERS_TTL_GRACE = 3600
+
+# Record a first view: add the viewer, queue the row and buffer the count
+RECORD_VIEW_SCRIPT = """
+if redis.call('ZADD', KEYS[1], 'NX', ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('EXPIREAT', KEYS[1], ARGV[3])
+redis.call('RPUSH', KEYS[2], ARGV[4])
+redis.call('HINCRBY', KEYS[3], ARGV[5], 1)
+return 1
+"""
+
+
+class StoryViewLog:
+    """
+    Story views recorded in Redis and persisted in batches.
+
+    Each story has a sorted set ``story_viewers:{story_id}`` of viewer ids
+    scored by view time, so repeat views are dropped and recent viewers can
+    be listed without the database. A first view also appends
+    ``story_id:user_id:timestamp`` to ``story_views:pending`` and buffers
+    the ``views_count`` delta; ``flush`` turns the pending list into
+    StoryView rows with ``bulk_create`` and applies the counts with ``F()``.
+    """
+    PENDING_KEY = 'story_views:pending'
+
+    @staticmethod
+    def _conn():
+        return get_redis_connection("default")
+
+    @staticmethod
+    def viewers_key(story_id):
+        return f'story_viewers:{story_id}'
+
+    @classmethod
+    def record(cls, story, user_id, viewed_at):
+        """Record a view; returns True for the viewer's first view"""
+        try:
+            return bool(cls._conn().eval(
+                RECORD_VIEW_SCRIPT, 3,
+                cls.viewers_key(story.id), cls.PENDING_KEY, story_views.key,
+                viewed_at.timestamp(), user_id,
+                int(story.expires_at.timestamp()) + VIEWERS_TTL_GRACE,
+                f'{story.id}:{user_id}:{viewed_at.timestamp()}', story.id
+            ))
+        except Exception as e:
+            logger.error(f"Story view log unavailable, writing through: {e}")
+            _, created = StoryView.objects.get_or_create(
+                user_id=user_id, story=story, defaults={'viewed_at': viewed_at}
+            )
+            if created:
+                Story.objects.filter(pk=story.pk).update(views_count=F('views_count') + 1)
+            return created
+
+    @classmethod
+    def exists(cls, story_id):
+        return bool(cls._conn().exists(cls.viewers_key(story_id)))
+
+    @classmethod
+    def get_viewers(cls, story_id, position=None, limit=20):
+        """Return ``(user_id, viewed_at timestamp)`` pairs, most recent first"""
+        if position is not None:
+            position = (float(position[0]), int(position[1]))
+        max_score = '+inf' if position is None else position[0]
+        rows = cls._conn().zrevrangebyscore(
+            cls.viewers_key(story_id), max_score, '-inf',
+            start=0, num=limit * 2 + 1, withscores=True
+        )
+        entries = [(int(member), score) for member, score in rows]
+        entries.sort(key=lambda entry: (entry[1], entry[0]), reverse=True)
+        return rank_after(entries, position, limit)
+
+    @classmethod
+    def flush(cls, batch_size=1000):
+        """
+        Persist pending views; returns the number of views flushed. Flushes
+        never overlap, and rows are created with ``ignore_conflicts``, so a
+        batch retried after a failure is not recorded twice.
+        """
+        with redis_lock(cls.PENDING_KEY) as locked:
+            if not locked:
+                return 0
+            flushed = cls._flush(batch_size)
+        story_views.flush()
+        return flushed
+
+    @classmethod
+    def _flush(cls, batch_size):
+        conn = cls._conn()
+        flushing_key = f'{cls.PENDING_KEY}:flushing'
+        if not conn.exists(flushing_key):
+            try:
+                conn.rename(cls.PENDING_KEY, flushing_key)
+            except ResponseError:
+                # Nothing recorded since the last flush
+                return 0
+
+        flushed = 0
+        while True:
+            entries = conn.lrange(flushing_key, 0, batch_size - 1)
+            if not entries:
+                break
+            views = [parse_entry(entry) for entry in entries]
+            # Stories or users deleted since the view would violate the foreign keys
+            story_ids = set(Story.objects.filter(
+                id__in={story_id for story_id, _, _ in views}
+            ).values_list('id', flat=True))
+            user_ids = set(User.objects.filter(
+                id__in={user_id for _, user_id, _ in views}
+            ).values_list('id', flat=True))
+            StoryView.objects.bulk_create([
+                StoryView(story_id=story_id, user_id=user_id, viewed_at=timestamp)
+                for story_id, user_id, timestamp in views
+                if story_id in story_ids and user_id in user_ids
+            ], ignore_conflicts=True)
+            conn.ltrim(flushing_key, len(entries), -1)
+            flushed += len(entries)
+
+        conn.delete(flushing_key)
+        return flushed
+
+
+def viewed_at(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def parse_entry(entry):
+    """``(story_id, user_id, viewed_at)`` from a pending entry"""
+    story_id, user_id, *timestamp = entry.decode().split(':')
+    # Entries queued before views carried their time fall back to now
+    when = viewed_at(float(timestamp[0])) if timestamp else timezone.now()
+    return int(story_id), int(user_id), when
@@ -10,7 +10,14 @@ from .serializers import (
     StoryCreateSerializer, 
     StoryViewSerializer
 )
-from apps.accounts.models import Follow
+from .tasks import process_story_upload, rebuild_story_tray
+from .tray import StoryTray, tray_groups
+from .view_tracking import StoryViewLog, viewed_at
+from apps.accounts.models import Follow, User
+from apps.core.pagination import KeysetPagination, cursor_datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 class StoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -33,35 +40,54 @@ class StoryViewSet(viewsets.ModelViewSet):
         return StorySerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        story = serializer.save(user=self.request.user)
+        try:
+            StoryTray.add(story)
+        except Exception as e:
+            logger.error(f"Error adding story to tray: {e}")
+        try:
+            process_story_upload.delay(story.id)
+        except Exception as e:
+            logger.error(f"Error queueing story processing: {e}")
 
     @action(detail=False, methods=['get'])
     def feed(self, request):
-        """Get stories from users that the current user follows"""
-        following_users = Follow.objects.filter(
-            follower=request.user
-        ).values_list('following', flat=True)
-        
-        # Get stories from followed users that haven't been viewed yet
+        """Story tray: active stories of followed users, grouped by author"""
+        authors = {
+            author_id: (username, profile_picture)
+            for author_id, username, profile_picture in Follow.objects.filter(
+                follower=request.user
+            ).values_list('following_id', 'following__username', 'following__profile_picture')
+        }
+        
+        try:
+            if StoryTray.is_built():
+                tray = StoryTray.get_tray(request.user.id, authors)
+            else:
+                if StoryTray.claim_rebuild():
+                    rebuild_story_tray.delay()
+                tray = self._tray_from_db(request.user, authors)
+        except Exception as e:
+            logger.error(f"Story tray error: {e}")
+            tray = self._tray_from_db(request.user, authors)
+        
+        return Response({'results': tray_groups(tray, authors, request)})
+
+    def _tray_from_db(self, user, authors):
         stories = Story.objects.filter(
-            user__in=following_users,
+            user_id__in=authors,
             expires_at__gt=timezone.now()
-        ).exclude(
-            views__user=request.user
-        ).select_related('user').order_by('user', '-created_at')
+        ).order_by('created_at', 'id')
+        viewed = set(StoryView.objects.filter(
+            user=user, story__in=stories
+        ).values_list('story_id', flat=True))
         
-        # Group stories by user
-        stories_by_user = {}
+        tray = {}
         for story in stories:
-            if story.user.id not in stories_by_user:
-                stories_by_user[story.user.id] = []
-            stories_by_user[story.user.id].append(story)
-        
-        serializer = self.get_serializer(stories, many=True)
-        return Response({
-            'stories_by_user': stories_by_user,
-            'stories': serializer.data
-        })
+            tray.setdefault(story.user_id, []).append(
+                (StoryTray.story_data(story), story.id in viewed)
+            )
+        return tray
 
     @action(detail=False, methods=['get'])
     def my_stories(self, request):
@@ -85,14 +111,14 @@ class StoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        view, created = StoryView.objects.get_or_create(
-            user=request.user, 
-            story=story
-        )
+        created = StoryViewLog.record(story, request.user.id, timezone.now())
+        
+        try:
+            StoryTray.mark_seen(request.user.id, story)
+        except Exception as e:
+            logger.error(f"Error marking story seen: {e}")
         
         if created:
-            story.views_count += 1
-            story.save(update_fields=['views_count'])
             return Response({'message': 'Story viewed'}, status=status.HTTP_201_CREATED)
         
         return Response({'message': 'Already viewed'})
@@ -108,15 +134,43 @@ class StoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        views = StoryView.objects.filter(story=story).select_related('user')
-        
-        page = self.paginate_queryset(views)
-        if page is not None:
-            serializer = StoryViewSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = StoryViewSerializer(views, many=True)
-        return Response(serializer.data)
+        # Recent viewers come from Redis; the database is the fallback
+        rows = {}
+        try:
+            use_log = StoryViewLog.exists(story.id)
+        except Exception as e:
+            logger.error(f"Story view log error: {e}")
+            use_log = False
+
+        def fetch(position, limit):
+            if use_log:
+                entries = StoryViewLog.get_viewers(story.id, position, limit)
+            else:
+                entries = self._viewers_from_db(story, position, limit)
+            rows.update(entries)
+            return entries
+
+        paginator = KeysetPagination()
+        user_ids = paginator.paginate_positions(fetch, request)
+        users = User.objects.in_bulk(user_ids)
+        views = [
+            StoryView(user=users[user_id], story=story, viewed_at=viewed_at(rows[user_id]))
+            for user_id in user_ids if user_id in users
+        ]
+        serializer = StoryViewSerializer(views, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    def _viewers_from_db(self, story, position, limit):
+        views = StoryView.objects.filter(story=story).order_by('-viewed_at', '-user_id')
+        if position is not None:
+            value = cursor_datetime(position[0])
+            views = views.filter(
+                Q(viewed_at__lt=value) | Q(viewed_at=value, user_id__lt=position[1])
+            )
+        return [
+            (user_id, timestamp.timestamp())
+            for user_id, timestamp in views.values_list('user_id', 'viewed_at')[:limit]
+        ]
 
     def destroy(self, request, *args, **kwargs):
         story = self.get_object()
@@ -127,4 +181,8 @@ class StoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        try:
+            StoryTray.remove(story)
+        except Exception as e:
+            logger.error(f"Error removing story from tray: {e}")
         return super().destroy(request, *args, **kwargs)
\ No newline at end of file
@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Only the notification stream (``/api/notifications/stream/``) is served
+from it, by the notification_stream service; the API runs under WSGI.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
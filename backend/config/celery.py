@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_shutdown, worker_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -8,6 +9,14 @@ app = Celery('instagram')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_event_producer(**kwargs):
+    # Prefork children exit without running atexit hooks, so buffered
+    # Kafka events are flushed explicitly
+    from apps.core.kafka_producer import event_producer
+    event_producer.flush()
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
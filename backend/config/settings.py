@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     'django_prometheus',
     
     # Local apps
+    'apps.core',
     'apps.accounts',
     'apps.posts',
     'apps.comments',
@@ -166,10 +167,66 @@ CACHES = {
     },
 }
 
+# Per-process near cache in front of Redis for hot keys; invalidated over pub/sub
+NEAR_CACHE_ENABLED = config('NEAR_CACHE_ENABLED', default=True, cast=bool)
+NEAR_CACHE_MAX_ENTRIES = config('NEAR_CACHE_MAX_ENTRIES', default=10000, cast=int)
+NEAR_CACHE_TTL = config('NEAR_CACHE_TTL', default=10, cast=int)
+NEAR_CACHE_PREFIXES = ['post:', 'trending_posts', 'user_profile:', 'user_feed:']
+
+# Cache fills: one worker recomputes a missing key while the others wait for it,
+# and entries are refreshed early with a probability that grows near expiry (XFetch)
+CACHE_FILL_LOCK_TIMEOUT = config('CACHE_FILL_LOCK_TIMEOUT', default=10, cast=int)
+CACHE_FILL_WAIT = config('CACHE_FILL_WAIT', default=1.0, cast=float)
+CACHE_FILL_POLL_INTERVAL = config('CACHE_FILL_POLL_INTERVAL', default=0.05, cast=float)
+CACHE_XFETCH_BETA = config('CACHE_XFETCH_BETA', default=1.0, cast=float)
+CACHE_REFRESH_WORKERS = config('CACHE_REFRESH_WORKERS', default=4, cast=int)
+# Lifetime of cache_result tag versions; never shorter than the entries under them
+CACHE_TAG_TTL = config('CACHE_TAG_TTL', default=86400, cast=int)
+
 # Session Configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'sessions'
 
+# Home feed timelines
+FEED_TIMELINE_SIZE = config('FEED_TIMELINE_SIZE', default=800, cast=int)
+FEED_TIMELINE_TTL = config('FEED_TIMELINE_TTL', default=7 * 86400, cast=int)
+FEED_FANOUT_FOLLOWER_LIMIT = config('FEED_FANOUT_FOLLOWER_LIMIT', default=10000, cast=int)
+
+# Viewer state: mirror of each viewer's likes on recent posts
+RECENT_LIKES_ENABLED = config('RECENT_LIKES_ENABLED', default=True, cast=bool)
+RECENT_LIKES_WINDOW_DAYS = config('RECENT_LIKES_WINDOW_DAYS', default=7, cast=int)
+RECENT_LIKES_TTL = config('RECENT_LIKES_TTL', default=86400, cast=int)
+
+# Trending posts
+TRENDING_WINDOW_HOURS = config('TRENDING_WINDOW_HOURS', default=24, cast=int)
+TRENDING_BUCKET_SECONDS = config('TRENDING_BUCKET_SECONDS', default=3600, cast=int)
+TRENDING_HALF_LIFE_HOURS = config('TRENDING_HALF_LIFE_HOURS', default=6, cast=float)
+TRENDING_POSTS_LIMIT = config('TRENDING_POSTS_LIMIT', default=100, cast=int)
+TRENDING_CACHE_TIMEOUT = config('TRENDING_CACHE_TIMEOUT', default=300, cast=int)
+
+# Explore candidate pool
+EXPLORE_POOL_SIZE = config('EXPLORE_POOL_SIZE', default=24000, cast=int)
+EXPLORE_POOL_DAYS = config('EXPLORE_POOL_DAYS', default=7, cast=int)
+EXPLORE_SCORE_DECAY_SECONDS = config('EXPLORE_SCORE_DECAY_SECONDS', default=45000, cast=int)
+
+# Notification groups ("alice and 41 others liked your post")
+NOTIFICATION_GROUP_WINDOW = config('NOTIFICATION_GROUP_WINDOW', default=86400, cast=int)
+NOTIFICATION_RECENT_ACTORS = config('NOTIFICATION_RECENT_ACTORS', default=3, cast=int)
+NOTIFICATION_UNREAD_TTL = config('NOTIFICATION_UNREAD_TTL', default=3600, cast=int)
+
+# Notification push stream (server-sent events, ASGI only)
+NOTIFICATION_STREAM_HEARTBEAT = config('NOTIFICATION_STREAM_HEARTBEAT', default=15, cast=int)
+NOTIFICATION_STREAM_MAX_SECONDS = config('NOTIFICATION_STREAM_MAX_SECONDS', default=3600, cast=int)
+NOTIFICATION_STREAM_RETRY_MS = config('NOTIFICATION_STREAM_RETRY_MS', default=3000, cast=int)
+
+# Chunked purges (expired stories, old notifications)
+PURGE_BATCH_SIZE = config('PURGE_BATCH_SIZE', default=1000, cast=int)
+PURGE_SLEEP_SECONDS = config('PURGE_SLEEP_SECONDS', default=0.1, cast=float)
+PURGE_MAX_SECONDS = config('PURGE_MAX_SECONDS', default=300, cast=int)
+
+# Batch jobs push their metrics here; empty disables pushing
+PROMETHEUS_PUSHGATEWAY = config('PROMETHEUS_PUSHGATEWAY', default='')
+
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://redis:6379/1')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://redis:6379/2')
@@ -189,9 +246,33 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.stories.tasks.delete_expired_stories',
         'schedule': 3600.0,  # Run every hour
     },
+    'flush-story-views': {
+        'task': 'apps.stories.tasks.flush_story_views',
+        'schedule': 10.0,  # Run every 10 seconds
+    },
+    'flush-like-counters': {
+        'task': 'apps.posts.tasks.flush_like_counters',
+        'schedule': 10.0,  # Run every 10 seconds
+    },
     'update-trending-posts': {
         'task': 'apps.posts.tasks.update_trending_posts',
-        'schedule': 1800.0,  # Run every 30 minutes
+        'schedule': 60.0,  # Run every minute
+    },
+    'reconcile-user-counters': {
+        'task': 'apps.accounts.tasks.reconcile_user_counters',
+        'schedule': 86400.0,  # Run daily
+    },
+    'refresh-explore-pool': {
+        'task': 'apps.posts.tasks.refresh_explore_pool',
+        'schedule': 300.0,  # Run every 5 minutes
+    },
+    'cleanup-upload-sessions': {
+        'task': 'apps.core.tasks.cleanup_upload_sessions',
+        'schedule': 3600.0,  # Run every hour
+    },
+    'flush-search-index': {
+        'task': 'apps.core.tasks.flush_search_index',
+        'schedule': 5.0,  # Run every 5 seconds
     },
     'cleanup-old-notifications': {
         'task': 'apps.notifications.tasks.cleanup_old_notifications',
@@ -199,6 +280,10 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 
+# Buffers flushed by the tasks above are claimed under a Redis lock, so
+# overlapping runs never apply the same batch twice
+FLUSH_LOCK_TIMEOUT = config('FLUSH_LOCK_TIMEOUT', default=300, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -238,8 +323,49 @@ ELASTICSEARCH_DSL = {
     },
 }
 
+# Model changes are queued in Redis and indexed in bulk by flush_search_index
+ELASTICSEARCH_DSL_SIGNAL_PROCESSOR = 'apps.core.search_indexing.QueuedSignalProcessor'
+SEARCH_INDEX_BATCH_SIZE = config('SEARCH_INDEX_BATCH_SIZE', default=500, cast=int)
+
 # Kafka Configuration
 KAFKA_BOOTSTRAP_SERVERS = config('KAFKA_BOOTSTRAP_SERVERS', default='kafka:9092').split(',')
+# Broker protocol version; set explicitly so clients never probe the broker on creation
+KAFKA_API_VERSION = tuple(int(part) for part in config('KAFKA_API_VERSION', default='2.5.0').split('.'))
+KAFKA_PRODUCER_LINGER_MS = config('KAFKA_PRODUCER_LINGER_MS', default=10, cast=int)
+KAFKA_PRODUCER_COMPRESSION = config('KAFKA_PRODUCER_COMPRESSION', default='gzip')
+KAFKA_PRODUCER_BUFFER_MEMORY = config('KAFKA_PRODUCER_BUFFER_MEMORY', default=16 * 1024 * 1024, cast=int)
+# Longest a request may wait on a full buffer or missing metadata
+KAFKA_PRODUCER_MAX_BLOCK_MS = config('KAFKA_PRODUCER_MAX_BLOCK_MS', default=100, cast=int)
+KAFKA_PRODUCER_FLUSH_TIMEOUT = config('KAFKA_PRODUCER_FLUSH_TIMEOUT', default=10, cast=int)
+KAFKA_PRODUCER_RETRY_SECONDS = config('KAFKA_PRODUCER_RETRY_SECONDS', default=30, cast=int)
+
+# Batch consumers, run with `manage.py consume <name>`
+KAFKA_CONSUMERS = {
+    'notifications': {
+        'topics': ['notifications'],
+        'group_id': 'notification-group',
+        'handler': 'apps.notifications.kafka_handlers.handle_notification_events',
+    },
+}
+KAFKA_CONSUMER_BATCH_SIZE = config('KAFKA_CONSUMER_BATCH_SIZE', default=500, cast=int)
+KAFKA_CONSUMER_POLL_TIMEOUT_MS = config('KAFKA_CONSUMER_POLL_TIMEOUT_MS', default=1000, cast=int)
+KAFKA_CONSUMER_MAX_RETRIES = config('KAFKA_CONSUMER_MAX_RETRIES', default=3, cast=int)
+KAFKA_CONSUMER_RETRY_BACKOFF = config('KAFKA_CONSUMER_RETRY_BACKOFF', default=1.0, cast=float)
+KAFKA_CONSUMER_MAX_BACKOFF = config('KAFKA_CONSUMER_MAX_BACKOFF', default=60.0, cast=float)
+KAFKA_CONSUMER_LAG_INTERVAL = config('KAFKA_CONSUMER_LAG_INTERVAL', default=15, cast=int)
+KAFKA_CONSUMER_METRICS_PORT = config('KAFKA_CONSUMER_METRICS_PORT', default=9310, cast=int)
+
+# Transactional outbox, drained by `manage.py relay_outbox`.
+# Changing OUTBOX_SHARDS reorders pending events; drain the outbox first.
+OUTBOX_SHARDS = config('OUTBOX_SHARDS', default=16, cast=int)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=500, cast=int)
+OUTBOX_SEND_TIMEOUT = config('OUTBOX_SEND_TIMEOUT', default=10, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=10, cast=int)
+OUTBOX_RETRY_BACKOFF = config('OUTBOX_RETRY_BACKOFF', default=1, cast=int)
+OUTBOX_MAX_BACKOFF = config('OUTBOX_MAX_BACKOFF', default=300, cast=int)
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=0.5, cast=float)
+OUTBOX_METRICS_INTERVAL = config('OUTBOX_METRICS_INTERVAL', default=15, cast=int)
+OUTBOX_METRICS_PORT = config('OUTBOX_METRICS_PORT', default=9320, cast=int)
 
 
 # Internationalization
@@ -264,6 +390,19 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Image renditions generated by process_post_media / process_story_upload
+MEDIA_RENDITION_WIDTHS = [
+    int(width) for width in config('MEDIA_RENDITION_WIDTHS', default='320,640,1080').split(',')
+]
+MEDIA_RENDITION_QUALITY = config('MEDIA_RENDITION_QUALITY', default=80, cast=int)
+MEDIA_PROCESS_WORKERS = config('MEDIA_PROCESS_WORKERS', default=2, cast=int)
+
+# Chunked uploads are staged here (shared between web hosts) until completed
+UPLOAD_TEMP_DIR = config('UPLOAD_TEMP_DIR', default=str(BASE_DIR / 'uploads'))
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=50 * 1024 * 1024, cast=int)
+UPLOAD_MAX_CHUNK_SIZE = config('UPLOAD_MAX_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)
+UPLOAD_SESSION_TTL_HOURS = config('UPLOAD_SESSION_TTL_HOURS', default=24, cast=int)
+
 # For AWS S3 (Production)
 USE_S3 = config('USE_S3', default=False, cast=bool)
 
@@ -45,7 +45,7 @@ docker-compose -f docker-compose.prod.yml exec -T backend1 python manage.py coll
 
 # Create Elasticsearch indices
 echo -e "${YELLOW}Creating Elasticsearch indices...${NC}"
-docker-compose -f docker-compose.prod.yml exec -T backend1 python manage.py search_index --rebuild -f
+docker-compose -f docker-compose.prod.yml exec -T backend1 python manage.py reindex
 
 # Check health
 echo -e "${YELLOW}Checking application health...${NC}"